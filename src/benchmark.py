@@ -0,0 +1,525 @@
+"""
+Benchmark do pacote colheita: gera dados sintéticos de colheita (determinísticos,
+a partir de uma semente) e mede o tempo e o pico de memória das rotinas principais,
+gravando os resultados em JSON para comparar execuções.
+
+Uso:
+    python benchmark.py --tamanhos 1e3 1e4 1e5 --saida benchmark.json
+
+A sincronização com o Oracle é medida contra um substituto local do oracledb feito
+sobre SQLite (ver _oracledb_sqlite()), então o benchmark não precisa de servidor.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from typing import Any, Callable, Dict, List
+
+# =========================
+# SUBSTITUTO DO ORACLEDB (SQLite)
+# =========================
+# Implementa só o que o pacote colheita usa do python-oracledb (connect,
+# create_pool, create_pool_async, cursores com executemany/batcherrors e fetchmany),
+# traduzindo o SQL do Oracle para o SQLite. Serve para medir o custo do lado do
+# Python, não o do servidor.
+
+
+def _traduzir_sql(sql: str) -> str:
+    """Traduz o SQL do Oracle usado pelo pacote colheita para o dialeto do SQLite."""
+    merge = re.search(
+        r"MERGE INTO (\w+) \w+\s+USING (\w+) \w+.*"
+        r"WHEN NOT MATCHED THEN INSERT \(([^)]*)\)",
+        sql,
+        re.S,
+    )
+    if merge:
+        tabela, stage, colunas = merge.groups()
+        # sem WHEN MATCHED, o MERGE só insere as linhas que faltam
+        acao = "REPLACE" if "WHEN MATCHED" in sql else "IGNORE"
+        return (
+            f"INSERT OR {acao} INTO {tabela} ({colunas}) SELECT {colunas} FROM {stage}"
+        )
+    trocas = (
+        (r"CREATE GLOBAL TEMPORARY TABLE", "CREATE TABLE"),
+        (r"ON COMMIT DELETE ROWS", ""),
+        (r"NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY", "INTEGER PRIMARY KEY"),
+        (r"VARCHAR2\(\d+\)", "TEXT"),
+        (r"NUMBER\(\d+,\d+\)", "REAL"),
+        (r"\bNUMBER\b", "INTEGER"),
+        (r"\s+FROM dual", ""),
+        # o oracledb liga uma lista de parâmetros pela ordem em que aparecem no SQL
+        # (não pelo número), como o "?" do SQLite
+        (r":\d+", "?"),
+    )
+    for padrao, troca in trocas:
+        sql = re.sub(padrao, troca, sql, flags=re.I)
+    return sql
+
+
+def _oracledb_sqlite(caminho_db: str) -> types.ModuleType:
+    """Cria o módulo substituto do oracledb, gravando no arquivo SQLite caminho_db."""
+    mod = types.ModuleType("oracledb")
+    mod.__doc__ = "Substituto do oracledb sobre SQLite (somente para o benchmark)."
+    mod.round_trips = 0
+
+    class DatabaseError(Exception):
+        pass
+
+    class ErroLote:
+        def __init__(self, offset: int, message: str):
+            self.offset, self.message = offset, message
+
+    def _data_oracle(texto: bytes) -> datetime.datetime:
+        """Colunas DATE voltam como datetime, como no python-oracledb."""
+        return datetime.datetime.fromisoformat(texto.decode())
+
+    sqlite3.register_converter("DATE", _data_oracle)
+
+    def _valores(params):
+        """Datas são gravadas como texto YYYY-MM-DD (ver _data_oracle())."""
+        conv = lambda v: v.isoformat() if isinstance(v, datetime.date) else v
+        if isinstance(params, dict):
+            return {k: conv(v) for k, v in params.items()}
+        return [conv(v) for v in params or ()]
+
+    class Cursor:
+        def __init__(self, con: "Connection"):
+            self._con, self._cur = con, con._raw.cursor()
+            self._erros: List[ErroLote] = []
+            self.arraysize, self.prefetchrows = 100, 2
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._cur.close()
+
+        def __iter__(self):
+            return iter(self._cur)
+
+        @property
+        def rowcount(self) -> int:
+            return self._cur.rowcount
+
+        def execute(self, sql: str, params=None):
+            mod.round_trips += 1
+            try:
+                self._cur.execute(_traduzir_sql(sql), _valores(params))
+            except sqlite3.Error as e:
+                if "already exists" in str(e):
+                    raise DatabaseError("ORA-00955: name is already used") from None
+                raise DatabaseError(str(e)) from None
+
+        def executemany(self, sql: str, linhas: list, batcherrors: bool = False):
+            mod.round_trips += 1
+            sql, self._erros = _traduzir_sql(sql), []
+            for i, linha in enumerate(linhas):
+                try:
+                    self._cur.execute(sql, _valores(linha))
+                except sqlite3.Error as e:
+                    if not batcherrors:
+                        raise DatabaseError(str(e)) from None
+                    # chave duplicada com o código do Oracle, como no driver
+                    codigo = "ORA-00001" if "UNIQUE" in str(e) else "ORA-20000"
+                    self._erros.append(ErroLote(i, f"{codigo}: {e}"))
+
+        def getbatcherrors(self) -> List[ErroLote]:
+            return self._erros
+
+        def fetchone(self):
+            return self._cur.fetchone()
+
+        def fetchmany(self, n: int | None = None):
+            mod.round_trips += 1
+            return self._cur.fetchmany(n or self.arraysize)
+
+        def fetchall(self):
+            return self._cur.fetchall()
+
+    class Connection:
+        def __init__(self, pool=None):
+            # as conexões do pool passam de uma thread para outra (modo paralelo)
+            self._raw = sqlite3.connect(
+                caminho_db,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                check_same_thread=False,
+            )
+            self._raw.execute("PRAGMA foreign_keys = ON")
+            self._pool = pool
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.close()
+
+        def cursor(self) -> Cursor:
+            return Cursor(self)
+
+        def commit(self):
+            mod.round_trips += 1
+            # tabelas temporárias do Oracle (ON COMMIT DELETE ROWS)
+            for stage in ("talhoes_stage", "operacoes_stage"):
+                with contextlib.suppress(sqlite3.Error):
+                    self._raw.execute(f"DELETE FROM {stage}")
+            self._raw.commit()
+
+        def rollback(self):
+            self._raw.rollback()
+
+        def ping(self):
+            mod.round_trips += 1
+
+        def close(self):
+            if self._pool is not None:
+                self._pool._livres.append(self)
+            else:
+                self._raw.close()
+
+    class Pool:
+        def __init__(self):
+            self._livres: List[Connection] = []
+
+        def acquire(self) -> Connection:
+            return self._livres.pop() if self._livres else Connection(self)
+
+        def close(self, force: bool = False):
+            for con in self._livres:
+                con._raw.close()
+            self._livres.clear()
+
+    # API asyncio (modo assíncrono): as mesmas conexões, com métodos aguardáveis
+    class CursorAsync:
+        def __init__(self, cur: Cursor):
+            self._cur = cur
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._cur.__exit__(*exc)
+
+        async def execute(self, sql: str, params=None):
+            self._cur.execute(sql, params)
+
+        async def executemany(self, sql: str, linhas: list, batcherrors=False):
+            self._cur.executemany(sql, linhas, batcherrors)
+
+        def getbatcherrors(self) -> List[ErroLote]:
+            return self._cur.getbatcherrors()
+
+        async def fetchall(self):
+            return self._cur.fetchall()
+
+    class ConnectionAsync:
+        def __init__(self, con: Connection):
+            self._con = con
+
+        def cursor(self) -> CursorAsync:
+            return CursorAsync(self._con.cursor())
+
+        async def commit(self):
+            self._con.commit()
+
+        async def rollback(self):
+            self._con.rollback()
+
+    class AcquireAsync:
+        """acquire() do pool assíncrono: aguardável ou usado com "async with"."""
+
+        def __init__(self, pool: "PoolAsync"):
+            self._pool, self._con = pool, None
+
+        def __await__(self):
+            return self._pool._acquire().__await__()
+
+        async def __aenter__(self) -> ConnectionAsync:
+            self._con = await self._pool._acquire()
+            return self._con
+
+        async def __aexit__(self, *exc):
+            await self._pool.release(self._con)
+
+    class PoolAsync:
+        def __init__(self):
+            self._pool = Pool()
+
+        def acquire(self) -> AcquireAsync:
+            return AcquireAsync(self)
+
+        async def _acquire(self) -> ConnectionAsync:
+            return ConnectionAsync(self._pool.acquire())
+
+        async def release(self, con: ConnectionAsync):
+            con._con.close()
+
+        async def close(self, force: bool = False):
+            self._pool.close(force)
+
+    mod.DatabaseError = mod.Error = DatabaseError
+    mod.connect = lambda *a, **kw: Connection()
+    mod.create_pool = lambda *a, **kw: Pool()
+    mod.create_pool_async = lambda *a, **kw: PoolAsync()
+    return mod
+
+
+# o pacote colheita só importa o oracledb quando o Oracle é usado
+# (_driver_oracle()): o substituto já fica em sys.modules e é ele que o import
+# encontra. O diretório de trabalho é apagado ao sair (finalizador do
+# TemporaryDirectory).
+_TRABALHO = tempfile.TemporaryDirectory(prefix="bench_colheita_")
+_DIR_TRABALHO = _TRABALHO.name
+sys.modules["oracledb"] = _oracledb_sqlite(os.path.join(_DIR_TRABALHO, "oracle.db"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from colheita import menu, relatorios  # noqa: E402
+from colheita.analises import analisar_operacoes  # noqa: E402
+from colheita.arquivos import carregar_json, salvar_json  # noqa: E402
+from colheita.estruturas import OperacoesColunares, db_mem, novo_journal  # noqa: E402
+from colheita.metricas import metricas  # noqa: E402
+from colheita.oracle import (  # noqa: E402
+    _driver_oracle,
+    oracle_conn,
+    oracle_fechar_pool,
+)
+from colheita.sincronizacao import sincronizar_mem_para_oracle  # noqa: E402
+
+# o benchmark não deve limpar o terminal a cada listagem ou relatório
+menu.limpar_console = relatorios.limpar_console = lambda: None
+
+
+# =========================
+# GERADOR DE DADOS
+# =========================
+INICIO_SAFRA = datetime.date(2024, 4, 1)
+DIAS_SAFRA = 240
+
+
+def talhoes_para(n_ops: int) -> int:
+    """Quantidade realista de talhões para n_ops operações (~500 por talhão)."""
+    return min(max(n_ops // 500, 5), 20000)
+
+
+def gerar_dados(
+    n_ops: int, n_talhoes: int | None = None, semente: int = 42
+) -> Dict[str, Any]:
+    """
+    Gera um db no formato de db_mem com n_ops operações distribuídas entre n_talhoes
+    talhões, ao longo de uma safra, em ordem de data. A mesma semente gera sempre os
+    mesmos dados. Tudo fica marcado como novo no diário, como antes do primeiro envio.
+    """
+    rng = random.Random(semente)
+    n_talhoes = n_talhoes or talhoes_para(n_ops)
+    talhoes = {
+        str(i): {
+            "id_talhao": i,
+            "nome": f"Talhão {i:05d}",
+            "area_ha": round(rng.lognormvariate(3.0, 0.6) + 1.0, 2),
+        }
+        for i in range(1, n_talhoes + 1)
+    }
+    ops = OperacoesColunares()
+    for i in range(n_ops):
+        perda = round(min(rng.gammavariate(2.0, 2.5), 100.0), 2)
+        dia = INICIO_SAFRA + datetime.timedelta(days=i * DIAS_SAFRA // n_ops)
+        ops.append(
+            {
+                "id_op": i + 1,
+                "id_talhao": rng.randint(1, n_talhoes),
+                "data": dia.isoformat(),
+                "peso_t_colhido": round(rng.uniform(20.0, 60.0), 2),
+                "perda_percent": perda,
+            }
+        )
+    journal = novo_journal()
+    journal["talhoes"] = {k: "novo" for k in talhoes}
+    journal["operacoes"] = {str(i): "novo" for i in range(1, n_ops + 1)}
+    return {
+        "talhoes": talhoes,
+        "operacoes": ops,
+        "journal": journal,
+        "sequencias": {"talhao": n_talhoes, "op": n_ops},
+        "limiares_alerta": ops.limiares,
+    }
+
+
+# =========================
+# MEDIÇÃO
+# =========================
+
+
+@contextlib.contextmanager
+def _silencioso():
+    """Descarta a saída do bloco (o custo de montar o texto continua sendo medido)."""
+    with open(os.devnull, "w", encoding="utf-8") as nulo:
+        with contextlib.redirect_stdout(nulo):
+            yield
+
+
+def medir(etapa: str, funcao: Callable[[], Any], **extras) -> Dict[str, Any]:
+    """Executa funcao uma vez e retorna o tempo e o pico de memória da etapa."""
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    with _silencioso():
+        funcao()
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] - base
+    resultado = {"etapa": etapa, "segundos": round(segundos, 6), "pico_bytes": pico}
+    resultado.update(extras)
+    print(f"  {etapa:<14} {segundos:10.3f}s  pico {pico / 2**20:9.1f} MiB")
+    return resultado
+
+
+def _preparar_oracle() -> None:
+    """Começa cada tamanho com as tabelas do substituto vazias."""
+    with oracle_conn() as con, con.cursor() as cur:
+        for tabela in ("operacoes", "talhoes"):
+            with contextlib.suppress(Exception):
+                cur.execute(f"DELETE FROM {tabela}")
+        con.commit()
+
+
+ETAPAS = (
+    "gerar",
+    "relatorio",
+    "salvar_json",
+    "carregar_json",
+    "listar",
+    "listar_pagina",
+    "analise",
+    "sync",
+)
+
+
+def executar(
+    tamanhos: List[int], etapas: List[str], semente: int
+) -> List[Dict[str, Any]]:
+    """Roda as etapas escolhidas para cada tamanho e retorna os resultados."""
+    os.environ.update(ORA_USER="bench", ORA_PASS="bench", ORA_DSN="sqlite")
+    caminho_json = os.path.join(_DIR_TRABALHO, "dados.json")
+    caminho_txt = os.path.join(_DIR_TRABALHO, "relatorio.txt")
+    resultados = []
+    for n in tamanhos:
+        print(f"\n{n} operações, {talhoes_para(n)} talhões")
+        dados = {}
+
+        def gerar():
+            dados.update(gerar_dados(n, semente=semente))
+
+        def carregar():
+            db = carregar_json(caminho_json)
+            OperacoesColunares.de_dicts(db["operacoes"])
+
+        def sincronizar():
+            _preparar_oracle()
+            db_mem.update(dados)
+            sincronizar_mem_para_oracle(modo="delta", progresso=None)
+
+        comuns = {"n_operacoes": n, "n_talhoes": talhoes_para(n)}
+        # os dados são sempre gerados; a etapa "gerar" só decide se entra no resultado
+        r = medir("gerar", gerar, **comuns)
+        if "gerar" in etapas:
+            resultados.append(r)
+        if "relatorio" in etapas:
+            r = medir(
+                "relatorio",
+                lambda: relatorios.exportar_relatorio_txt(dados, caminho_txt),
+                **comuns,
+            )
+            r["bytes"] = os.path.getsize(caminho_txt)
+            resultados.append(r)
+        if "salvar_json" in etapas or "carregar_json" in etapas:
+            r = medir("salvar_json", lambda: salvar_json(caminho_json, dados), **comuns)
+            r["bytes"] = os.path.getsize(caminho_json)
+            if "salvar_json" in etapas:
+                resultados.append(r)
+        if "carregar_json" in etapas:
+            resultados.append(medir("carregar_json", carregar, **comuns))
+        if "listar" in etapas or "listar_pagina" in etapas:
+            db_mem.update(dados)
+        if "listar" in etapas:
+            # com a saída redirecionada, todas as páginas são escritas
+            resultados.append(medir("listar", menu.listar_operacoes, **comuns))
+        if "listar_pagina" in etapas:
+            resultados.append(
+                medir(
+                    "listar_pagina", lambda: menu.listar_operacoes(pagina=1), **comuns
+                )
+            )
+        if "analise" in etapas:
+            resultados.append(
+                medir(
+                    "analise",
+                    lambda: analisar_operacoes(dados["operacoes"]),
+                    **comuns,
+                )
+            )
+        if "sync" in etapas:
+            antes = _driver_oracle().round_trips
+            r = medir("sync", sincronizar, **comuns)
+            r["round_trips"] = _driver_oracle().round_trips - antes
+            resultados.append(r)
+        oracle_fechar_pool()
+    return resultados
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark do pacote colheita com dados sintéticos de colheita."
+    )
+    parser.add_argument(
+        "--tamanhos",
+        nargs="+",
+        default=["1e3", "1e4", "1e5"],
+        help="quantidades de operações (ex.: 1e3 1e4 1e7; padrão: 1e3 1e4 1e5)",
+    )
+    parser.add_argument(
+        "--etapas",
+        nargs="+",
+        choices=ETAPAS,
+        default=list(ETAPAS),
+        help="etapas medidas (padrão: todas)",
+    )
+    parser.add_argument("--semente", type=int, default=42, help="semente do gerador")
+    parser.add_argument(
+        "--saida", default="benchmark.json", help="arquivo JSON com os resultados"
+    )
+    args = parser.parse_args(argv)
+    tamanhos = [int(float(t)) for t in args.tamanhos]
+
+    tracemalloc.start()
+    try:
+        resultados = executar(tamanhos, args.etapas, args.semente)
+    finally:
+        tracemalloc.stop()
+    relatorio = {
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semente": args.semente,
+        # o tracemalloc fica ligado em todas as etapas, então os tempos incluem o
+        # custo dele; compare execuções sempre feitas com o benchmark
+        "tracemalloc": True,
+        "resultados": resultados,
+        # métricas internas do pacote (conexões, lotes, arquivos) de toda a execução
+        "metricas": metricas.para_dict(),
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {os.path.abspath(args.saida)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
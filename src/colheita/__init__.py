@@ -0,0 +1,21 @@
+"""
+Gestão de colheita de cana: cadastro de talhões e operações em memória, arquivos
+de dados, análises, relatórios e sincronização com o Oracle (ou SQLite).
+
+Módulos, das camadas de baixo para as de cima:
+    subalgoritmos  leitura validada das entradas, tabelas, paginação
+    metricas       cronômetros e contadores por etapa
+    estruturas     operações em colunas, alertas, diário de mudanças, db_mem
+    validacao      regras dos campos, as mesmas do menu e da importação
+    arquivos       JSON, JSON Lines e snapshot binário
+    analises       percentis, produtividade e piores talhões
+    relatorios     relatorio.txt e relatórios por talhão
+    oracle         conexão, pool, tabelas e leituras do Oracle
+    backends       Oracle ou SQLite com a mesma interface, inserção em lotes
+    pull           atualização da memória a partir do banco
+    sincronizacao  envio da memória para o banco (delta, completa, merge...)
+    autosave       log dos cadastros gravado em grupo
+    importacao     importação em lote de CSV e JSON Lines
+    menu           menu interativo
+    cli            linha de comando
+"""
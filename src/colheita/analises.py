@@ -0,0 +1,431 @@
+"""
+Análises das operações: percentis de perda, produtividade por talhão e mês e os
+piores talhões, com sketches de quantis mescláveis (memória ou log JSON Lines).
+"""
+
+import datetime
+import functools
+import itertools
+import json
+import math
+import os
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List
+
+from .subalgoritmos import formatar_tabela
+from .metricas import metricas
+from .estruturas import OperacoesColunares, _ordinal
+from .arquivos import (
+    caminhos_jsonl,
+    carregar_json,
+    LIMIAR_PARALELO_BYTES,
+    TAMANHO_PEDACO,
+)
+
+# Percentis de perda (p50/p90/p99), produtividade por talhão e mês e os talhões com
+# maior perda, sem ordenar o histórico: cada grupo guarda um sketch de quantis de
+# tamanho limitado. Sketches do mesmo erro se mesclam somando contagens, então um
+# arquivo grande é analisado em pedaços (em paralelo) e os resultados são juntados.
+
+# erro relativo máximo dos percentis (0.01 = 1%) e baldes por sketch
+ERRO_SKETCH = float(os.environ.get("ANALISE_ERRO", "0.01"))
+MAX_BALDES_SKETCH = int(os.environ.get("ANALISE_MAX_BALDES", "512"))
+# percentis mostrados e quantos talhões entram na lista dos piores
+QUANTIS_ANALISE = (0.5, 0.9, 0.99)
+PIORES_TALHOES = 5
+# mês das operações com data em texto livre
+MES_SEM_DATA = "sem data"
+
+
+class SketchQuantis:
+    """
+    Resumo de quantis de tamanho limitado, no estilo do DDSketch: cada valor positivo
+    é contado num balde logarítmico (o balde i cobre (γ^(i-1), γ^i], com
+    γ = (1 + erro) / (1 - erro)), então os quantis saem com erro relativo de no
+    máximo "erro". Com mais de max_baldes baldes, os menores são juntados. Os
+    valores devem ser não negativos; os zeros têm contagem própria.
+    """
+
+    __slots__ = (
+        "erro",
+        "max_baldes",
+        "_fator",
+        "baldes",
+        "zeros",
+        "n",
+        "soma",
+        "minimo",
+        "maximo",
+    )
+
+    def __init__(self, erro: float = ERRO_SKETCH, max_baldes: int = MAX_BALDES_SKETCH):
+        self.erro = erro
+        self.max_baldes = max_baldes
+        # 1 / log(γ): o balde de x é ceil(log(x) * _fator)
+        self._fator = 1.0 / math.log((1 + erro) / (1 - erro))
+        self.baldes: Counter = Counter()
+        self.zeros = 0
+        self.n = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def adicionar(self, valores: Iterable[float]) -> None:
+        """Adiciona valores; os baldes são calculados e contados em C (map + Counter)."""
+        if not isinstance(valores, (array, list, tuple)):
+            valores = array("d", valores)
+        if not valores:
+            return
+        menor, maior = min(valores), max(valores)
+        if menor < 0:
+            raise ValueError("O sketch só aceita valores não negativos.")
+        self.n += len(valores)
+        self.soma += sum(valores)
+        self.minimo = min(self.minimo, menor)
+        self.maximo = max(self.maximo, maior)
+        positivos = list(filter(None, valores))  # 0.0 fica de fora
+        self.zeros += len(valores) - len(positivos)
+        self.baldes.update(
+            map(math.ceil, map(self._fator.__mul__, map(math.log, positivos)))
+        )
+        self._limitar()
+
+    def mesclar(self, outro: "SketchQuantis") -> "SketchQuantis":
+        """Soma outro sketch (do mesmo erro) a este e retorna este."""
+        if outro.erro != self.erro:
+            raise ValueError("Só é possível mesclar sketches com o mesmo erro.")
+        self.baldes.update(outro.baldes)
+        self.zeros += outro.zeros
+        self.n += outro.n
+        self.soma += outro.soma
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self._limitar()
+        return self
+
+    def _limitar(self) -> None:
+        """Junta os menores baldes no primeiro que sobra, até caber em max_baldes."""
+        excesso = len(self.baldes) - self.max_baldes
+        if excesso <= 0:
+            return
+        chaves = sorted(self.baldes)
+        self.baldes[chaves[excesso]] += sum(map(self.baldes.pop, chaves[:excesso]))
+
+    @property
+    def media(self) -> float:
+        return self.soma / self.n if self.n else 0.0
+
+    def quantil(self, q: float) -> float:
+        """Valor do quantil q (0 a 1), com erro relativo de até self.erro."""
+        if not self.n:
+            return 0.0
+        posicao = q * (self.n - 1)
+        acumulado = self.zeros
+        if posicao < acumulado:
+            return 0.0
+        gama = (1 + self.erro) / (1 - self.erro)
+        for i in sorted(self.baldes):
+            acumulado += self.baldes[i]
+            if acumulado > posicao:
+                # ponto do balde com o mesmo erro relativo para as duas bordas
+                valor = 2 * math.exp(i / self._fator) / (gama + 1)
+                return min(max(valor, self.minimo), self.maximo)
+        return self.maximo
+
+
+def _mes_de(dia: int) -> str:
+    """Mês (YYYY-MM) de uma data em ordinal; 0 é data em texto livre."""
+    if not dia:
+        return MES_SEM_DATA
+    return datetime.date.fromordinal(dia).isoformat()[:7]
+
+
+def _periodo_mes(mes: str) -> tuple[int, int]:
+    """Primeiro e último dia (ordinais) do mês YYYY-MM; (0, 0) para MES_SEM_DATA."""
+    if mes == MES_SEM_DATA:
+        return 0, 0
+    ano, m = int(mes[:4]), int(mes[5:])
+    proximo = datetime.date(ano + m // 12, m % 12 + 1, 1)
+    return datetime.date(ano, m, 1).toordinal(), proximo.toordinal() - 1
+
+
+class AnaliseColheita:
+    """
+    Resultado mesclável das análises: sketches das perdas geral, por talhão e por mês
+    (YYYY-MM) e, por talhão e mês, a quantidade de operações e as toneladas. A
+    memória depende do número de talhões e meses, não do de operações.
+    """
+
+    def __init__(self):
+        self.geral = SketchQuantis()
+        self.por_talhao: Dict[int, SketchQuantis] = {}
+        self.por_mes: Dict[str, SketchQuantis] = {}
+        # (id_talhao, mês) -> [operações, toneladas]
+        self.talhao_mes: Dict[tuple[int, str], list] = {}
+
+    def adicionar(
+        self,
+        id_talhoes: Iterable[int],
+        dias: Iterable[int],
+        pesos: Iterable[float],
+        perdas: Iterable[float],
+    ) -> None:
+        """
+        Adiciona um lote de operações dado em colunas paralelas (dias em ordinal, 0
+        para data em texto livre). As perdas são agrupadas e cada grupo vai para o
+        seu sketch de uma vez.
+        """
+        meses: Dict[int, str] = {}
+        perdas_talhao: Dict[int, List[float]] = {}
+        perdas_mes: Dict[str, List[float]] = {}
+        for id_t, dia, peso, perda in zip(id_talhoes, dias, pesos, perdas):
+            mes = meses.get(dia)
+            if mes is None:
+                mes = meses[dia] = _mes_de(dia)
+            perdas_talhao.setdefault(id_t, []).append(perda)
+            perdas_mes.setdefault(mes, []).append(perda)
+            totais = self.talhao_mes.get((id_t, mes))
+            if totais is None:
+                totais = self.talhao_mes[(id_t, mes)] = [0, 0.0]
+            totais[0] += 1
+            totais[1] += peso
+        for id_t, valores in perdas_talhao.items():
+            self.por_talhao.setdefault(id_t, SketchQuantis()).adicionar(valores)
+        for mes, valores in perdas_mes.items():
+            self.por_mes.setdefault(mes, SketchQuantis()).adicionar(valores)
+            self.geral.adicionar(valores)
+
+    @classmethod
+    def de_colunas(cls, ops: "OperacoesColunares") -> "AnaliseColheita":
+        """
+        Analisa o armazenamento em colunas pelos índices: as perdas de cada talhão e
+        de cada mês são lidas direto das colunas (map sobre as posições do índice),
+        sem montar dicionários. O sketch geral é a mescla dos sketches dos meses.
+        """
+        analise = cls()
+        c = ops.colunas
+        perdas, pesos = c["perda_percent"], c["peso_t_colhido"]
+        id_de = c["id_talhao"].__getitem__
+        for id_t in ops.agregados.por_talhao:
+            sketch = analise.por_talhao[id_t] = SketchQuantis()
+            sketch.adicionar(
+                array("d", map(perdas.__getitem__, ops.posicoes_talhao(id_t)))
+            )
+        for mes in sorted({_mes_de(dia) for dia in ops.agregados.por_dia}):
+            posicoes = ops.posicoes_periodo(*_periodo_mes(mes))
+            sketch = analise.por_mes[mes] = SketchQuantis()
+            sketch.adicionar(array("d", map(perdas.__getitem__, posicoes)))
+            analise.geral.mesclar(sketch)
+            # posições do mês ordenadas por talhão: cada talhão vira um trecho contíguo
+            for id_t, grupo in itertools.groupby(
+                sorted(posicoes, key=id_de), key=id_de
+            ):
+                grupo = list(grupo)
+                analise.talhao_mes[(id_t, mes)] = [
+                    len(grupo),
+                    sum(map(pesos.__getitem__, grupo)),
+                ]
+        return analise
+
+    def mesclar(self, outra: "AnaliseColheita") -> "AnaliseColheita":
+        """Junta a análise de outro pedaço de operações a esta e retorna esta."""
+        self.geral.mesclar(outra.geral)
+        for grupos, outros in (
+            (self.por_talhao, outra.por_talhao),
+            (self.por_mes, outra.por_mes),
+        ):
+            for chave, sketch in outros.items():
+                if chave in grupos:
+                    grupos[chave].mesclar(sketch)
+                else:
+                    grupos[chave] = sketch
+        for chave, (n, toneladas) in outra.talhao_mes.items():
+            totais = self.talhao_mes.setdefault(chave, [0, 0.0])
+            totais[0] += n
+            totais[1] += toneladas
+        return self
+
+    def produtividade(self, talhoes: Dict[str, Any]) -> Dict[tuple[int, str], float]:
+        """Produtividade (t/ha) de cada talhão em cada mês, usando area_ha."""
+        prod = {}
+        for (id_t, mes), (_, toneladas) in self.talhao_mes.items():
+            area = float(talhoes.get(str(id_t), {}).get("area_ha", 0.0))
+            if area > 0:
+                prod[(id_t, mes)] = toneladas / area
+        return prod
+
+    def piores_talhoes(self, n: int = PIORES_TALHOES, q: float = 0.9) -> List[int]:
+        """Os n talhões com a maior perda no quantil q (padrão: p90)."""
+        return sorted(
+            self.por_talhao, key=lambda id_t: -self.por_talhao[id_t].quantil(q)
+        )[:n]
+
+
+@functools.lru_cache(maxsize=4096)
+def _dia_analise(data) -> int:
+    """Ordinal da data (date, ordinal ou YYYY-MM-DD); 0 para data em texto livre."""
+    try:
+        return _ordinal(data) or 0
+    except ValueError:
+        return 0
+
+
+def _colunas_analise(
+    ops: Iterable[Dict[str, Any]],
+) -> tuple[List[int], List[int], List[float], List[float]]:
+    """Colunas (id_talhao, dia, peso, perda) de operações em dicionário."""
+    ids, dias, pesos, perdas = [], [], [], []
+    for op in ops:
+        ids.append(op.get("id_talhao"))
+        dias.append(_dia_analise(op.get("data", "")))
+        pesos.append(float(op.get("peso_t_colhido", 0.0)))
+        perdas.append(float(op.get("perda_percent", 0.0)))
+    return ids, dias, pesos, perdas
+
+
+@metricas.medido("analise")
+def analisar_operacoes(ops: Iterable[Dict[str, Any]]) -> AnaliseColheita:
+    """
+    Analisa as operações em memória: em colunas, pelos índices; numa lista de
+    dicionários (ou outro iterável), em lotes de TAMANHO_PEDACO operações.
+    """
+    if isinstance(ops, OperacoesColunares):
+        analise = AnaliseColheita.de_colunas(ops)
+    else:
+        analise = AnaliseColheita()
+        fonte = iter(ops)
+        for lote in iter(lambda: list(itertools.islice(fonte, TAMANHO_PEDACO)), []):
+            analise.adicionar(*_colunas_analise(lote))
+    metricas.contar("analise", analise.geral.n)
+    return analise
+
+
+def _analisar_pedaco(linhas: List[bytes]) -> AnaliseColheita:
+    """Analisa um pedaço de linhas do log JSON Lines (roda em um processo do pool)."""
+    analise = AnaliseColheita()
+    analise.adicionar(*_colunas_analise(map(json.loads, linhas)))
+    return analise
+
+
+@metricas.medido("analise.jsonl")
+def analisar_jsonl(base: str, processos: int | None = None) -> AnaliseColheita:
+    """
+    Analisa o log de operações do formato JSON Lines direto do arquivo, em pedaços
+    de TAMANHO_PEDACO linhas, sem carregá-lo na memória. Logs a partir de
+    LIMIAR_PARALELO_BYTES são analisados em paralelo por um pool de processos, com
+    no máximo dois pedaços por processo em espera, e as análises dos pedaços são
+    mescladas na ordem do arquivo.
+    """
+    caminho_cab, caminho_log = caminhos_jsonl(base)
+    confirmado = carregar_json(caminho_cab).get("log_operacoes", {"n": 0, "bytes": 0})
+    analise = AnaliseColheita()
+    if not confirmado["n"]:
+        return analise
+    with open(caminho_log, "rb") as f:
+        # só as linhas confirmadas pelo cabeçalho
+        linhas = itertools.islice(f, confirmado["n"])
+        pedacos = iter(lambda: list(itertools.islice(linhas, TAMANHO_PEDACO)), [])
+        if processos != 1 and confirmado["bytes"] >= LIMIAR_PARALELO_BYTES:
+            n_processos = processos or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=n_processos) as pool:
+                em_espera = deque()
+                for pedaco in pedacos:
+                    em_espera.append(pool.submit(_analisar_pedaco, pedaco))
+                    if len(em_espera) >= 2 * n_processos:
+                        analise.mesclar(em_espera.popleft().result())
+                for futuro in em_espera:
+                    analise.mesclar(futuro.result())
+        else:
+            for pedaco in pedacos:
+                analise.adicionar(*_colunas_analise(map(json.loads, pedaco)))
+    metricas.contar("analise.jsonl", analise.geral.n, n_bytes=confirmado["bytes"])
+    return analise
+
+
+def formatar_analise(analise: AnaliseColheita, talhoes: Dict[str, Any]) -> List[str]:
+    """
+    Monta as linhas de texto da seção de análises: percentis de perda geral e por
+    mês, os piores talhões e a produtividade por talhão e mês.
+    """
+    texto = ["ANÁLISE DE PERDAS E PRODUTIVIDADE", "-" * 70]
+    if not analise.geral.n:
+        texto.append("Nenhuma operação registrada.")
+        return texto
+    rotulos = tuple(f"p{round(q * 100)}" for q in QUANTIS_ANALISE)
+
+    def percentis(sketch: SketchQuantis) -> tuple[str, ...]:
+        return tuple(f"{sketch.quantil(q):.2f}" for q in QUANTIS_ANALISE)
+
+    def nome(id_t: int) -> str:
+        return talhoes.get(str(id_t), {}).get("nome", "?")
+
+    def area(id_t: int) -> float:
+        return float(talhoes.get(str(id_t), {}).get("area_ha", 0.0))
+
+    texto.append(
+        "Perda (%): "
+        + ", ".join(f"{r} {v}" for r, v in zip(rotulos, percentis(analise.geral)))
+        + f" (erro relativo de até {ERRO_SKETCH * 100:g}%)"
+    )
+    peso_mes: Dict[str, float] = {}
+    peso_talhao: Dict[int, float] = {}
+    for (id_t, mes), (_, toneladas) in analise.talhao_mes.items():
+        peso_mes[mes] = peso_mes.get(mes, 0.0) + toneladas
+        peso_talhao[id_t] = peso_talhao.get(id_t, 0.0) + toneladas
+
+    texto += ["", "Perda por mês (%)"]
+    texto += formatar_tabela(
+        ("Mês", "Operações", "Peso(t)", *rotulos),
+        [
+            (mes, str(sketch.n), f"{peso_mes.get(mes, 0.0):.2f}", *percentis(sketch))
+            for mes, sketch in sorted(analise.por_mes.items())
+        ],
+        "<>>" + ">" * len(rotulos),
+    )
+
+    texto += ["", f"Piores talhões (maior perda p90, até {PIORES_TALHOES})"]
+    texto += formatar_tabela(
+        ("ID", "Talhão", "Operações", "t/ha", *rotulos),
+        [
+            (
+                str(id_t),
+                nome(id_t),
+                str(analise.por_talhao[id_t].n),
+                (
+                    f"{peso_talhao.get(id_t, 0.0) / area(id_t):.2f}"
+                    if area(id_t) > 0
+                    else "-"
+                ),
+                *percentis(analise.por_talhao[id_t]),
+            )
+            for id_t in analise.piores_talhoes()
+        ],
+        "><>>" + ">" * len(rotulos),
+    )
+
+    produtividade = analise.produtividade(talhoes)
+    texto += ["", "Produtividade por talhão e mês"]
+    texto += formatar_tabela(
+        ("Mês", "ID", "Talhão", "Operações", "Peso(t)", "t/ha"),
+        [
+            (
+                mes,
+                str(id_t),
+                nome(id_t),
+                str(n),
+                f"{toneladas:.2f}",
+                (
+                    f"{produtividade[(id_t, mes)]:.2f}"
+                    if (id_t, mes) in produtividade
+                    else "-"
+                ),
+            )
+            for (id_t, mes), (n, toneladas) in sorted(
+                analise.talhao_mes.items(), key=lambda item: (item[0][1], item[0][0])
+            )
+        ],
+        "<><>>>",
+    )
+    return texto
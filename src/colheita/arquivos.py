@@ -0,0 +1,445 @@
+"""
+Arquivos de dados (Cap. 5): JSON, JSON Lines (log de operações só acrescentado) e
+snapshot binário aberto com mmap, além da escolha do formato e da carga dos dados
+lidos na memória.
+"""
+
+import datetime
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict
+
+from .subalgoritmos import _arquivo_atomico
+from .metricas import metricas
+from .estruturas import (
+    db_mem,
+    journal_de_carga,
+    novos_limiares_alerta,
+    OperacoesColunares,
+    sequencias_de_carga,
+)
+
+CAMINHO_JSON = "dados.json"
+
+
+def _json_padrao(obj):
+    """Converte para JSON os objetos que o módulo json não conhece."""
+    # as operações em colunas são gravadas como lista de dicionários, com as datas
+    # em ordinal
+    if isinstance(obj, OperacoesColunares):
+        return obj.para_registros()
+    if isinstance(obj, datetime.date):
+        return obj.toordinal()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+@metricas.medido("json.salvar")
+def salvar_json(caminho: str, dados: Dict[str, Any]) -> None:
+    """Salva os dados em um arquivo JSON formatado (escrita atômica)."""
+    with _arquivo_atomico(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2, default=_json_padrao)
+    metricas.contar(
+        "json.salvar", len(dados["operacoes"]), n_bytes=os.path.getsize(caminho)
+    )
+
+
+@metricas.medido("json.carregar")
+def carregar_json(caminho: str) -> Dict[str, Any]:
+    """Carrega os dados de um arquivo JSON, se existir. Se não, retorna estrutura vazia."""
+    if not os.path.exists(caminho):
+        return {"talhoes": {}, "operacoes": []}
+    metricas.contar("json.carregar", n_bytes=os.path.getsize(caminho))
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Formato JSON Lines: um cabeçalho pequeno (talhões, diário, sequências) em
+# <base>.talhoes.json e o log de operações em <base>.operacoes.jsonl, uma operação
+# por linha. Salvar só acrescenta ao log as operações novas; o cabeçalho é o ponto
+# de confirmação: ele guarda quantas linhas e quantos bytes do log são válidos, então
+# um acréscimo interrompido no meio é simplesmente ignorado (e sobrescrito depois).
+CAMINHO_JSONL = "dados"
+
+
+def caminhos_jsonl(base: str) -> tuple[str, str]:
+    """Retorna os caminhos do cabeçalho e do log de operações do formato JSON Lines."""
+    return f"{base}.talhoes.json", f"{base}.operacoes.jsonl"
+
+
+def _linha_jsonl(op: Dict[str, Any]) -> bytes:
+    return (json.dumps(op, ensure_ascii=False, default=_json_padrao) + "\n").encode(
+        "utf-8"
+    )
+
+
+@metricas.medido("jsonl.salvar")
+def salvar_jsonl(base: str, dados: Dict[str, Any]) -> int:
+    """
+    Salva os dados no formato JSON Lines. Se o log já tem as primeiras operações da
+    memória, só as novas são acrescentadas; senão o log é reescrito (de forma
+    atômica). Retorna quantas operações foram escritas no log.
+    """
+    caminho_cab, caminho_log = caminhos_jsonl(base)
+    ops = dados["operacoes"]
+    if not isinstance(ops, OperacoesColunares):
+        ops = OperacoesColunares.de_dicts(ops)
+    persist = ops.persistencia
+    anexar = (
+        persist is not None
+        and persist["caminho"] == os.path.abspath(caminho_log)
+        and persist["n"] <= len(ops)
+        and os.path.exists(caminho_log)
+    )
+    if anexar:
+        inicio = persist["n"]
+        inicio_bytes = persist["bytes"]
+        with open(caminho_log, "r+b") as f:
+            # descarta o que passou do último ponto confirmado e acrescenta o resto
+            f.seek(persist["bytes"])
+            f.truncate()
+            for pos in range(inicio, len(ops)):
+                f.write(_linha_jsonl(ops.para_registro(pos)))
+            f.flush()
+            os.fsync(f.fileno())
+            tamanho = f.tell()
+    else:
+        inicio = inicio_bytes = 0
+        with _arquivo_atomico(caminho_log, "wb") as f:
+            for pos in range(len(ops)):
+                f.write(_linha_jsonl(ops.para_registro(pos)))
+            tamanho = f.tell()
+
+    # cabeçalho: tudo menos as operações, mais o ponto de confirmação do log
+    cabecalho = {k: v for k, v in dados.items() if k != "operacoes"}
+    cabecalho["log_operacoes"] = {
+        "arquivo": os.path.basename(caminho_log),
+        "n": len(ops),
+        "bytes": tamanho,
+    }
+    with _arquivo_atomico(caminho_cab, "w", encoding="utf-8") as f:
+        json.dump(cabecalho, f, ensure_ascii=False, indent=2)
+    ops.persistencia = {
+        "caminho": os.path.abspath(caminho_log),
+        "n": len(ops),
+        "bytes": tamanho,
+    }
+    metricas.contar(
+        "jsonl.salvar",
+        len(ops) - inicio,
+        n_bytes=tamanho - inicio_bytes + os.path.getsize(caminho_cab),
+    )
+    return len(ops) - inicio
+
+
+@metricas.medido("jsonl.carregar")
+def carregar_jsonl(base: str, caminho_json_antigo: str | None = None) -> Dict[str, Any]:
+    """
+    Carrega os dados do formato JSON Lines, lendo o log operação por operação direto
+    para o armazenamento em colunas (sem carregar o arquivo inteiro na memória). Se
+    o cabeçalho não existir e caminho_json_antigo for informado, lê o JSON antigo
+    (migração). Se nada existir, retorna estrutura vazia.
+    """
+    caminho_cab, caminho_log = caminhos_jsonl(base)
+    if not os.path.exists(caminho_cab):
+        if caminho_json_antigo is not None:
+            return carregar_json(caminho_json_antigo)
+        return {"talhoes": {}, "operacoes": []}
+    with open(caminho_cab, "r", encoding="utf-8") as f:
+        db = json.load(f)
+    confirmado = db.pop("log_operacoes", {"n": 0, "bytes": 0})
+    ops = OperacoesColunares(db.get("limiares_alerta"))
+    if confirmado["n"]:
+        with open(caminho_log, "rb") as f:
+            # lê só as linhas confirmadas pelo cabeçalho
+            for linha in itertools.islice(f, confirmado["n"]):
+                ops.append(json.loads(linha))
+    ops.persistencia = {
+        "caminho": os.path.abspath(caminho_log),
+        "n": confirmado["n"],
+        "bytes": confirmado["bytes"],
+    }
+    db["operacoes"] = ops
+    metricas.contar(
+        "jsonl.carregar",
+        len(ops),
+        n_bytes=os.path.getsize(caminho_cab) + confirmado["bytes"],
+    )
+    return db
+
+
+# Snapshot binário: formato compacto para abrir rápido um histórico grande. O
+# arquivo (little-endian) tem:
+#   cabeçalho  "<4sHHQQQ": "CANA", versão, 0, nº de operações, nº de talhões,
+#              tamanho do bloco de metadados
+#   metadados  JSON (diário, sequências, datas em texto livre, campos extras)
+#   talhões    registros "<qdI" (id_talhao, area_ha, índice do nome) seguidos da
+#              tabela de nomes (cada nome distinto aparece uma única vez)
+#   colunas    as colunas das operações, uma após a outra, alinhadas em 8 bytes
+# Aberto com mmap, as colunas são lidas direto do arquivo mapeado, sem cópia.
+CAMINHO_SNAPSHOT = "dados.snap"
+SNAPSHOT_MAGICO = b"CANA"
+SNAPSHOT_VERSAO = 1
+SNAPSHOT_CABECALHO = struct.Struct("<4sHHQQQ")
+SNAPSHOT_TALHAO = struct.Struct("<qdI")
+SNAPSHOT_TAMANHO = struct.Struct("<I")
+# ordem das colunas no arquivo: as de 8 bytes primeiro, para manter o alinhamento
+SNAPSHOT_COLUNAS = (
+    "id_op",
+    "id_talhao",
+    "peso_t_colhido",
+    "perda_percent",
+    "data",
+    "alerta_perda",
+)
+
+
+def _bytes_le(coluna: array) -> bytes:
+    """Bytes de uma coluna em little-endian, qualquer que seja a máquina."""
+    if sys.byteorder == "little":
+        return coluna.tobytes()
+    copia = array(coluna.typecode, coluna)
+    copia.byteswap()
+    return copia.tobytes()
+
+
+def _alinhar(f, alinhamento: int = 8) -> None:
+    """Completa o arquivo com zeros até a próxima posição múltipla de alinhamento."""
+    f.write(b"\0" * (-f.tell() % alinhamento))
+
+
+@metricas.medido("snapshot.salvar")
+def salvar_snapshot(caminho: str, dados: Dict[str, Any]) -> None:
+    """Salva os dados no formato de snapshot binário (escrita atômica)."""
+    ops = dados["operacoes"]
+    if not isinstance(ops, OperacoesColunares):
+        ops = OperacoesColunares.de_dicts(ops)
+    talhoes = list(dados["talhoes"].values())
+    # tabela de nomes: cada nome distinto é gravado uma vez
+    nomes: Dict[str, int] = {}
+    for t in talhoes:
+        nomes.setdefault(t["nome"], len(nomes))
+    meta = {k: v for k, v in dados.items() if k not in ("talhoes", "operacoes")}
+    meta["datas_livres"] = {str(pos): t for pos, t in ops.datas_livres.items()}
+    # campos de talhão que não cabem no registro binário vão para os metadados
+    meta["talhoes_extras"] = {
+        str(t["id_talhao"]): extras
+        for t in talhoes
+        if (
+            extras := {
+                k: v for k, v in t.items() if k not in ("id_talhao", "nome", "area_ha")
+            }
+        )
+    }
+    bloco_meta = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+
+    with _arquivo_atomico(caminho, "wb") as f:
+        f.write(
+            SNAPSHOT_CABECALHO.pack(
+                SNAPSHOT_MAGICO,
+                SNAPSHOT_VERSAO,
+                0,
+                len(ops),
+                len(talhoes),
+                len(bloco_meta),
+            )
+        )
+        f.write(bloco_meta)
+        for t in talhoes:
+            f.write(
+                SNAPSHOT_TALHAO.pack(t["id_talhao"], t["area_ha"], nomes[t["nome"]])
+            )
+        f.write(SNAPSHOT_TAMANHO.pack(len(nomes)))
+        for nome in nomes:  # dicionários mantêm a ordem de inserção (= índice)
+            nome_b = nome.encode("utf-8")
+            f.write(SNAPSHOT_TAMANHO.pack(len(nome_b)))
+            f.write(nome_b)
+        for chave in SNAPSHOT_COLUNAS:
+            _alinhar(f)
+            f.write(_bytes_le(ops.colunas[chave]))
+    metricas.contar("snapshot.salvar", len(ops), n_bytes=os.path.getsize(caminho))
+
+
+class SnapshotBinario:
+    """
+    Snapshot binário aberto com mmap. As colunas são memoryviews sobre o arquivo
+    mapeado: somas, médias e leituras de linhas não copiam os dados. Use com "with"
+    (ou chame fechar()) para liberar o arquivo.
+    """
+
+    def __init__(self, caminho: str):
+        self._arquivo = open(caminho, "rb")
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mapa)
+        magico, versao, _, n_ops, n_talhoes, tam_meta = SNAPSHOT_CABECALHO.unpack_from(
+            self._buffer
+        )
+        if magico != SNAPSHOT_MAGICO or versao != SNAPSHOT_VERSAO:
+            self.fechar()
+            raise ValueError(f"{caminho} não é um snapshot válido")
+        pos = SNAPSHOT_CABECALHO.size
+        self.meta = json.loads(bytes(self._buffer[pos : pos + tam_meta]))
+        pos += tam_meta
+        registros = []
+        for _ in range(n_talhoes):
+            registros.append(SNAPSHOT_TALHAO.unpack_from(self._buffer, pos))
+            pos += SNAPSHOT_TALHAO.size
+        (n_nomes,) = SNAPSHOT_TAMANHO.unpack_from(self._buffer, pos)
+        pos += SNAPSHOT_TAMANHO.size
+        nomes = []
+        for _ in range(n_nomes):
+            (tam,) = SNAPSHOT_TAMANHO.unpack_from(self._buffer, pos)
+            pos += SNAPSHOT_TAMANHO.size
+            nomes.append(bytes(self._buffer[pos : pos + tam]).decode("utf-8"))
+            pos += tam
+        extras = self.meta.get("talhoes_extras", {})
+        self.talhoes = {
+            str(id_t): {
+                "id_talhao": id_t,
+                "nome": nomes[i_nome],
+                "area_ha": area,
+                **extras.get(str(id_t), {}),
+            }
+            for id_t, area, i_nome in registros
+        }
+        self.n = n_ops
+        # cada coluna é uma fatia do mapa convertida para o tipo da coluna
+        self.colunas: Dict[str, memoryview] = {}
+        for chave in SNAPSHOT_COLUNAS:
+            pos += -pos % 8
+            tipo = OperacoesColunares.TIPOS[chave]
+            tamanho = n_ops * array(tipo).itemsize
+            self.colunas[chave] = self._buffer[pos : pos + tamanho].cast(tipo)
+            pos += tamanho
+
+    def __enter__(self) -> "SnapshotBinario":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+    def fechar(self) -> None:
+        """Libera as visões do mapa, o mapa e o arquivo."""
+        for coluna in getattr(self, "colunas", {}).values():
+            coluna.release()
+        self.colunas = {}
+        self._buffer.release()
+        self._mapa.close()
+        self._arquivo.close()
+
+    def __len__(self) -> int:
+        return self.n
+
+    def soma(self, chave: str) -> float:
+        """Soma de uma coluna, lida direto do arquivo mapeado."""
+        return sum(self.colunas[chave])
+
+    def media(self, chave: str) -> float:
+        """Média de uma coluna (0.0 se não houver operações)."""
+        return self.soma(chave) / self.n if self.n else 0.0
+
+    def para_db(self) -> Dict[str, Any]:
+        """Converte o snapshot para a estrutura em memória (db), sem perdas."""
+        ops = OperacoesColunares(self.meta.get("limiares_alerta"))
+        for chave, coluna in self.colunas.items():
+            ops.colunas[chave].frombytes(coluna.tobytes())  # cópia em bloco
+            if sys.byteorder != "little":
+                ops.colunas[chave].byteswap()
+        ops.datas_livres = {
+            int(p): t for p, t in self.meta.get("datas_livres", {}).items()
+        }
+        ops.reconstruir_agregados()
+        ops.invalidar_indices()
+        db = {
+            k: v
+            for k, v in self.meta.items()
+            if k not in ("datas_livres", "talhoes_extras")
+        }
+        db["talhoes"] = self.talhoes
+        db["operacoes"] = ops
+        return db
+
+
+@metricas.medido("snapshot.carregar")
+def carregar_snapshot(caminho: str) -> Dict[str, Any]:
+    """Carrega um snapshot binário, se existir. Se não, retorna estrutura vazia."""
+    if not os.path.exists(caminho):
+        return {"talhoes": {}, "operacoes": []}
+    metricas.contar("snapshot.carregar", n_bytes=os.path.getsize(caminho))
+    with SnapshotBinario(caminho) as snap:
+        return snap.para_db()
+
+
+# formatos de arquivo de dados, na ordem do menu
+FORMATOS = {1: "json", 2: "jsonl", 3: "snap"}
+
+
+def salvar_dados(formato: str, dados: Dict[str, Any]) -> str:
+    """Salva os dados no formato escolhido e retorna a mensagem para o usuário."""
+    if formato == "json":
+        salvar_json(CAMINHO_JSON, dados)
+        return f"Salvo em {CAMINHO_JSON}."
+    if formato == "snap":
+        salvar_snapshot(CAMINHO_SNAPSHOT, dados)
+        return f"Salvo em {CAMINHO_SNAPSHOT}."
+    n = salvar_jsonl(CAMINHO_JSONL, dados)
+    arquivos = ", ".join(caminhos_jsonl(CAMINHO_JSONL))
+    return f"Salvo em {arquivos} ({n} operação(ões) gravada(s))."
+
+
+def carregar_dados(formato: str) -> Dict[str, Any]:
+    """Carrega os dados do arquivo do formato escolhido."""
+    if formato == "json":
+        return carregar_json(CAMINHO_JSON)  # carrega o JSON do arquivo
+    if formato == "snap":
+        return carregar_snapshot(CAMINHO_SNAPSHOT)
+    # sem arquivos JSON Lines, migra a partir do dados.json antigo
+    return carregar_jsonl(CAMINHO_JSONL, caminho_json_antigo=CAMINHO_JSON)
+
+
+def carregar_no_db_mem(db: Dict[str, Any]) -> bool:
+    """
+    Coloca na memória os dados lidos de um arquivo, completando o que falta em
+    arquivos antigos. Retorna False se os dados não tiverem o formato esperado.
+    """
+    # se os dados forem um dicionário e tiverem as chaves "talhoes" e "operacoes"
+    if not (isinstance(db, dict) and "talhoes" in db and "operacoes" in db):
+        return False
+    # arquivo antigo, sem diário de mudanças: marca tudo como novo
+    if "journal" not in db:
+        db["journal"] = journal_de_carga(db)
+    # arquivo antigo, sem limiares de alerta: os padrão, com os alertas (gravados
+    # como texto) reclassificados em lote depois da conversão
+    sem_limiares = "limiares_alerta" not in db
+    if sem_limiares:
+        db["limiares_alerta"] = novos_limiares_alerta()
+    # as operações passam para o armazenamento em colunas, com os limiares dos dados
+    if isinstance(db["operacoes"], OperacoesColunares):
+        db["operacoes"].limiares = db["limiares_alerta"]
+    else:
+        db["operacoes"] = OperacoesColunares.de_dicts(
+            db["operacoes"], db["limiares_alerta"]
+        )
+    if sem_limiares:
+        db["operacoes"].reclassificar_alertas(db["limiares_alerta"])
+    # arquivo antigo, sem sequências de IDs: calcula a partir dos dados
+    if "sequencias" not in db:
+        db["sequencias"] = sequencias_de_carga(db)
+    # arquivo antigo, sem marca d'água de atualização: a primeira lê tudo do Oracle
+    if "marca_pull" not in db:
+        db["marca_pull"] = {"talhao": 0, "op": 0, "ultimo_pull": None}
+    # insere os dados carregados do arquivo no dicionário em memória
+    db_mem.update(db)
+    return True
+
+
+# Arquivos grandes são validados em pedaços, em paralelo, por um pool de processos.
+
+# arquivos a partir deste tamanho são validados em paralelo
+LIMIAR_PARALELO_BYTES = 2 * 1024 * 1024
+# quantidade de linhas de cada pedaço enviado a um processo
+TAMANHO_PEDACO = 5000
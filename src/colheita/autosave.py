@@ -0,0 +1,301 @@
+"""
+Salvamento automático: log dos cadastros gravado em grupo por uma thread e
+reaplicado na próxima execução se o programa não salvou antes de terminar.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List
+
+from .subalgoritmos import _arquivo_atomico
+from .metricas import metricas
+from .estruturas import (
+    db_mem,
+    journal_marcar,
+    OperacoesColunares,
+    proximo_id,
+    reclassificar_alertas,
+    sequencias_de_carga,
+)
+from .arquivos import carregar_dados, carregar_no_db_mem, _linha_jsonl
+from .analises import _dia_analise
+
+# Opcional (AUTOSAVE=1): os talhões e operações cadastrados no menu vão para uma fila
+# e uma thread os grava em grupo no log AUTOSAVE_ARQUIVO, com uma escrita e um fsync
+# por grupo (group commit), a cada AUTOSAVE_LOTE registros ou AUTOSAVE_INTERVALO
+# segundos. O menu só põe o registro na fila e não espera o disco. A primeira linha
+# do log diz de qual arquivo de dados (formato) os registros partem (nenhum, se a
+# sessão começou vazia); salvar ou carregar pelo menu recomeça o log. Se o programa
+# cair, a próxima execução carrega esse arquivo e reaplica os registros do log.
+# Mudanças de limiares de alerta também vão para o log. O que a opção 9 traz do
+# banco não vai: a marca d'água da atualização só avança no arquivo de dados, então
+# depois de uma queda a próxima atualização traz essas linhas de novo.
+
+AUTOSAVE_ATIVO = os.environ.get("AUTOSAVE", "0") == "1"
+CAMINHO_AUTOSAVE = os.environ.get("AUTOSAVE_ARQUIVO", "autosave.jsonl")
+LOTE_AUTOSAVE = int(os.environ.get("AUTOSAVE_LOTE", "50"))
+INTERVALO_AUTOSAVE = float(os.environ.get("AUTOSAVE_INTERVALO", "2.0"))
+
+
+class Autosave:
+    """
+    Thread de salvamento automático. registrar() só põe o registro na fila; a thread
+    junta os registros e grava o grupo no log quando ele chega a "lote" registros ou
+    quando o primeiro registro do grupo já esperou "intervalo" segundos.
+    """
+
+    # marca na fila: grava o grupo atual sem esperar (ver descarregar())
+    _DESCARREGAR = object()
+
+    def __init__(
+        self,
+        caminho: str = CAMINHO_AUTOSAVE,
+        lote: int = LOTE_AUTOSAVE,
+        intervalo: float = INTERVALO_AUTOSAVE,
+    ):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo = intervalo
+        self.fila: queue.Queue = queue.Queue()
+        # último erro de gravação (o grupo fica guardado e vai no próximo)
+        self.erro: OSError | None = None
+        self._thread = threading.Thread(
+            target=self._executar, name="autosave", daemon=True
+        )
+        self._thread.start()
+
+    @staticmethod
+    def ler(caminho: str = CAMINHO_AUTOSAVE) -> tuple[str | None, List[Dict[str, Any]]]:
+        """
+        Lê o log: retorna o formato do arquivo de dados de base e os registros. Um
+        grupo interrompido no meio (última linha incompleta) é ignorado.
+        """
+        base, registros = None, []
+        if not os.path.exists(caminho):
+            return base, registros
+        with open(caminho, "rb") as f:
+            for linha in f:
+                try:
+                    item = json.loads(linha)
+                except json.JSONDecodeError:
+                    break
+                if "base" in item:
+                    base = item["base"]
+                else:
+                    registros.append(item)
+        return base, registros
+
+    def registrar(self, tipo: str, registro: Dict[str, Any]) -> None:
+        """
+        Põe um talhão, um talhão editado, uma operação ou os limiares de alerta
+        (tipo "talhoes", "talhao_alterado", "operacoes" ou "limiares") na fila.
+        """
+        self.fila.put({"tipo": tipo, "registro": dict(registro)})
+
+    def descarregar(self) -> None:
+        """Grava o que estiver na fila e espera a gravação terminar."""
+        if self._thread.is_alive():
+            self.fila.put(self._DESCARREGAR)
+            self.fila.join()
+
+    def reiniciar(
+        self, base: str | None, registros: List[Dict[str, Any]] | None = None
+    ) -> None:
+        """
+        Recomeça o log (de forma atômica) a partir do arquivo de dados do formato
+        base, mantendo só os registros informados (os que ainda não estão nele).
+        """
+        self.descarregar()
+        with _arquivo_atomico(self.caminho, "wb") as f:
+            f.write(_linha_jsonl({"base": base}))
+            for item in registros or ():
+                f.write(_linha_jsonl(item))
+
+    def parar(self) -> None:
+        """Grava o que estiver na fila e encerra a thread."""
+        if self._thread.is_alive():
+            self.fila.put(None)
+            self._thread.join()
+
+    def _gravar(self, grupo: List[Dict[str, Any]]) -> bool:
+        """Acrescenta o grupo ao log com uma escrita e um fsync."""
+        if not grupo:
+            return True
+        dados = b"".join(map(_linha_jsonl, grupo))
+        try:
+            with metricas.medir("autosave.grupo", len(grupo), n_bytes=len(dados)):
+                with open(self.caminho, "ab") as f:
+                    f.write(dados)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            self.erro = e
+            return False
+        self.erro = None
+        return True
+
+    def _executar(self) -> None:
+        grupo: List[Dict[str, Any]] = []
+        prazo = None  # quando o grupo atual tem de ser gravado
+        while True:
+            espera = None if prazo is None else max(0.0, prazo - time.monotonic())
+            try:
+                item = self.fila.get(timeout=espera)
+            except queue.Empty:  # o prazo do grupo venceu
+                if self._gravar(grupo):
+                    grupo, prazo = [], None
+                else:
+                    prazo = time.monotonic() + self.intervalo
+                continue
+            try:
+                if item is None:
+                    self._gravar(grupo)
+                    return
+                if item is not self._DESCARREGAR:
+                    grupo.append(item)
+                    if prazo is None:
+                        prazo = time.monotonic() + self.intervalo
+                if (
+                    item is self._DESCARREGAR
+                    or len(grupo) >= self.lote
+                    or time.monotonic() >= prazo
+                ) and self._gravar(grupo):
+                    grupo, prazo = [], None
+            finally:
+                self.fila.task_done()
+
+
+# salvamento automático em uso (None quando desligado)
+_autosave: Autosave | None = None
+
+
+def autosave_ativo() -> Autosave | None:
+    """Retorna o salvamento automático em uso, ou None se estiver desligado."""
+    return _autosave
+
+
+def _mesma_operacao(
+    ops: OperacoesColunares, pos: int, registro: Dict[str, Any]
+) -> bool:
+    """Diz se a operação da posição pos tem o mesmo conteúdo do registro do log."""
+    guardada = ops.para_registro(pos)
+    data = registro["data"]  # ordinal, YYYY-MM-DD ou texto livre
+    return (
+        guardada["id_talhao"] == registro["id_talhao"]
+        and guardada["data"] == (_dia_analise(data) or data)
+        and float(guardada["peso_t_colhido"]) == float(registro["peso_t_colhido"])
+        and float(guardada["perda_percent"]) == float(registro["perda_percent"])
+    )
+
+
+def aplicar_registros_autosave(
+    db: Dict[str, Any], registros: List[Dict[str, Any]]
+) -> tuple[int, int]:
+    """
+    Reaplica os registros do log nos dados, ignorando os que já estão neles (mesmo
+    ID e mesmo conteúdo). Um registro com o ID de outro talhão ou operação dos dados
+    (o log partiu de outro arquivo) recebe um ID novo, atualizado também no próprio
+    registro. Os reaplicados ficam pendentes de envio ao banco. Retorna quantos
+    talhões e quantas operações entraram.
+    """
+    ops = db["operacoes"]
+    posicoes = {id_op: pos for pos, id_op in enumerate(ops.colunas["id_op"])}
+    # IDs novos (para as colisões) só depois de todos os IDs dos dados e do log
+    for tipo, chave in (("talhao", "id_talhao"), ("op", "id_op")):
+        db["sequencias"][tipo] = max(
+            db["sequencias"][tipo],
+            sequencias_de_carga(db)[tipo],
+            max(
+                (i["registro"][chave] for i in registros if chave in i["registro"]),
+                default=0,
+            ),
+        )
+    novos_talhoes: Dict[int, int] = {}  # ID no log -> ID novo
+    n_talhoes = n_ops = 0
+    limiares = None
+    for item in registros:
+        registro = item["registro"]
+        if item["tipo"] == "limiares":
+            limiares = registro
+            continue
+        if item["tipo"] == "talhao_alterado":
+            # edição de um talhão dos dados ou de um recuperado acima
+            id_t = novos_talhoes.get(registro["id_talhao"], registro["id_talhao"])
+            registro["id_talhao"] = id_t
+            if str(id_t) in db["talhoes"]:
+                db["talhoes"][str(id_t)].update(registro)
+                journal_marcar(db, "talhoes", id_t, "alterado")
+            else:
+                db["talhoes"][str(id_t)] = registro
+                journal_marcar(db, "talhoes", id_t)
+                n_talhoes += 1
+            continue
+        if item["tipo"] == "talhoes":
+            existente = db["talhoes"].get(str(registro["id_talhao"]))
+            if existente is not None:
+                if (existente["nome"], float(existente["area_ha"])) == (
+                    registro["nome"],
+                    float(registro["area_ha"]),
+                ):
+                    continue
+                novo = proximo_id(db, "talhao")
+                print(
+                    f"⚠️ Talhão {registro['id_talhao']} do log já existe com outro "
+                    f"conteúdo; recuperado como talhão {novo}."
+                )
+                novos_talhoes[registro["id_talhao"]] = registro["id_talhao"] = novo
+            db["talhoes"][str(registro["id_talhao"])] = registro
+            journal_marcar(db, "talhoes", registro["id_talhao"])
+            n_talhoes += 1
+            continue
+        registro["id_talhao"] = novos_talhoes.get(
+            registro["id_talhao"], registro["id_talhao"]
+        )
+        pos = posicoes.get(registro["id_op"])
+        if pos is not None:
+            if _mesma_operacao(ops, pos, registro):
+                continue
+            novo = proximo_id(db, "op")
+            print(
+                f"⚠️ Operação {registro['id_op']} do log já existe com outro "
+                f"conteúdo; recuperada como operação {novo}."
+            )
+            registro["id_op"] = novo
+        posicoes[registro["id_op"]] = len(ops)
+        ops.append(registro)
+        journal_marcar(db, "operacoes", registro["id_op"])
+        n_ops += 1
+    # limiares alterados depois do arquivo de base: os últimos valem
+    if limiares is not None:
+        db["limiares_alerta"] = limiares
+        reclassificar_alertas(db)
+    return n_talhoes, n_ops
+
+
+def iniciar_autosave(caminho: str = CAMINHO_AUTOSAVE) -> Autosave:
+    """
+    Liga o salvamento automático. Se o log tiver registros (o programa não salvou
+    antes de terminar), carrega o arquivo de dados de base e os reaplica.
+    """
+    global _autosave
+    base, registros = Autosave.ler(caminho)
+    if registros:
+        if base is not None and not carregar_no_db_mem(carregar_dados(base)):
+            print(f"⚠️ Arquivo de dados ({base}) inválido; recuperando só o log.")
+        n_talhoes, n_ops = aplicar_registros_autosave(db_mem, registros)
+        print(
+            f"✅ Recuperado(s) {n_talhoes} talhão(ões) e {n_ops} operação(ões) do "
+            f"salvamento automático ({caminho}). Salve os dados (opção 6)."
+        )
+    elif not db_mem["talhoes"] and not len(db_mem["operacoes"]):
+        # nada foi carregado: o log parte de dados vazios, não do arquivo antigo
+        base = None
+    _autosave = Autosave(caminho)
+    # o log recomeça só com o que ainda não está no arquivo de dados
+    _autosave.reiniciar(base, registros)
+    atexit.register(_autosave.parar)
+    return _autosave
@@ -0,0 +1,726 @@
+"""
+Backends de armazenamento: a inserção em lotes com executemany, a classificação
+dos erros transitórios e os bancos onde a sincronização grava (Oracle ou SQLite),
+com a mesma interface.
+"""
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+from .metricas import metricas
+from .estruturas import db_mem
+from .oracle import (
+    _ler_operacoes,
+    ORA_ARRAYSIZE,
+    oracle_config_ok,
+    oracle_conn,
+    oracle_criar_tabelas,
+    oracle_enabled,
+    oracle_fechar_pool,
+    oracle_ler_operacoes,
+    oracle_ler_talhoes,
+)
+
+# tamanho padrão dos lotes enviados ao Oracle com executemany (ajustável com ORA_LOTE)
+TAMANHO_LOTE = int(os.environ.get("ORA_LOTE", "1000"))
+
+SQL_INSERIR_TALHAO = (
+    "INSERT INTO talhoes (id_talhao, nome, area_ha) VALUES (:1, :2, :3)"
+)
+# o id_op vai junto: é o mesmo da memória, para que a comparação e o MERGE pelos IDs
+# encontrem as mesmas linhas (a identidade da tabela só vale para inserts sem ID)
+SQL_INSERIR_OPERACAO = (
+    "INSERT INTO operacoes (id_op, id_talhao, data_op, peso_t_colhido, "
+    "perda_percent) VALUES (:1, :2, :3, :4, :5)"
+)
+
+
+def inserir_em_lotes(
+    con,
+    sql: str,
+    registros: List[list],
+    tamanho_lote: int,
+    confirmar: bool = True,
+    ao_confirmar: Callable[[int, int, List[tuple[int, str]]], None] | None = None,
+) -> tuple[int, List[tuple[int, str]]]:
+    """
+    Insere os registros com executemany, em lotes de tamanho_lote, com um commit por
+    lote (ou nenhum, se confirmar=False). Depois de cada commit, chama
+    ao_confirmar(inicio, fim, falhas do lote), se informado. Retorna a quantidade
+    inserida e a lista de falhas (posição, mensagem). Um erro transitório (conexão
+    caída) interrompe o envio e é propagado, para que a sincronização seja retomada;
+    um lote que falha inteiro por outro motivo vai para ao_confirmar com todas as
+    linhas como falhas.
+    """
+    inseridos = 0
+    falhas = []
+    with con.cursor() as cur:
+        # percorre os registros de tamanho_lote em tamanho_lote
+        for inicio in range(0, len(registros), tamanho_lote):
+            lote = registros[inicio : inicio + tamanho_lote]
+            try:
+                # batcherrors=True faz o Oracle seguir com o lote mesmo que uma linha
+                # falhe; as linhas com erro são consultadas depois com getbatcherrors()
+                with metricas.medir(
+                    "oracle.lote", len(lote), idas=2 if confirmar else 1
+                ):
+                    cur.executemany(sql, lote, batcherrors=True)
+                    erros = cur.getbatcherrors()
+                    if confirmar:
+                        con.commit()  # um commit por lote
+            # se o lote inteiro falhar (ex.: conexão caiu), marca todas as linhas dele
+            except Exception as e:
+                if confirmar:
+                    try:
+                        con.rollback()
+                    except Exception:
+                        pass
+                if _erro_transitorio(e):
+                    raise
+                falhas_lote = [(i, str(e)) for i in range(inicio, inicio + len(lote))]
+                falhas.extend(falhas_lote)
+                if confirmar and ao_confirmar is not None:
+                    ao_confirmar(inicio, inicio + len(lote), falhas_lote)
+                continue
+            # offset é a posição da linha com erro dentro do lote
+            falhas_lote = [(inicio + erro.offset, erro.message) for erro in erros]
+            falhas.extend(falhas_lote)
+            inseridos += len(lote) - len(erros)
+            if confirmar and ao_confirmar is not None:
+                ao_confirmar(inicio, inicio + len(lote), falhas_lote)
+    return inseridos, falhas
+
+
+def _relatar_lotes(
+    tipo: str,
+    rotulos: List[str],
+    inseridos: int,
+    falhas: List[tuple[int, str]],
+    segundos: float,
+) -> None:
+    """Mostra o resultado de uma inserção em lotes, com a vazão em linhas/s."""
+    for pos, msg in falhas:
+        print(f"❌ Falha ao inserir {rotulos[pos]}: {msg}")
+    vazao = inseridos / segundos if segundos > 0 else 0.0
+    print(
+        f"✅ {inseridos} {tipo} inserido(s), {len(falhas)} falha(s) "
+        f"em {segundos:.2f}s ({vazao:.0f} linhas/s)."
+    )
+
+
+# código do erro Oracle de chave única violada: o registro já existe no Oracle
+ORA_CHAVE_DUPLICADA = "ORA-00001"
+
+# os parâmetros vão na ordem em que aparecem no SQL (ver _valores_atualizacao())
+SQL_ATUALIZAR_TALHAO = "UPDATE talhoes SET nome = :1, area_ha = :2 WHERE id_talhao = :3"
+
+
+def _valores_atualizacao(talhao: Dict[str, Any]) -> list:
+    """Parâmetros de SQL_ATUALIZAR_TALHAO para um talhão: nome, area_ha, id_talhao."""
+    return [talhao["nome"], talhao["area_ha"], talhao["id_talhao"]]
+
+
+# trechos das mensagens de erros transitórios do Oracle (conexão caída, rede fora do
+# ar, servidor inalcançável): o lote não falhou por causa dos dados e pode ser reenviado
+ORA_ERROS_TRANSITORIOS = (
+    "DPY-1001",
+    "DPY-4011",
+    "ORA-03113",
+    "ORA-03114",
+    "ORA-03135",
+    "ORA-12170",
+    "ORA-12537",
+    "ORA-12541",
+    "ORA-12547",
+)
+
+
+def _erro_transitorio(erro: Exception) -> bool:
+    """Se o erro é transitório no backend ativo (vale tentar de novo)."""
+    msg = str(erro)
+    return any(trecho in msg for trecho in backend_ativo().ERROS_TRANSITORIOS)
+
+
+SQL_STAGE_TALHAO = (
+    "INSERT INTO talhoes_stage (id_talhao, nome, area_ha) VALUES (:1, :2, :3)"
+)
+SQL_STAGE_OPERACAO = (
+    "INSERT INTO operacoes_stage (id_op, id_talhao, data_op, peso_t_colhido, perda_percent) "
+    "VALUES (:1, :2, :3, :4, :5)"
+)
+
+# o MERGE compara as linhas já convertidas para os tipos do Oracle (NUMBER/DATE),
+# então não há comparação de floats no Python
+SQL_MERGE_TALHOES = """
+MERGE INTO talhoes t
+USING talhoes_stage s
+ON (t.id_talhao = s.id_talhao)
+WHEN MATCHED THEN UPDATE SET t.nome = s.nome, t.area_ha = s.area_ha
+WHEN NOT MATCHED THEN INSERT (id_talhao, nome, area_ha)
+  VALUES (s.id_talhao, s.nome, s.area_ha)
+"""
+
+# operações não são editadas na memória: o MERGE só insere as que faltam, e uma
+# operação com o mesmo id_op e outro conteúdo (de outro cliente) não é sobrescrita,
+# mas apontada por SQL_CONFLITOS_OPERACOES
+SQL_MERGE_OPERACOES = """
+MERGE INTO operacoes o
+USING operacoes_stage s
+ON (o.id_op = s.id_op)
+WHEN NOT MATCHED THEN INSERT (id_op, id_talhao, data_op, peso_t_colhido, perda_percent)
+  VALUES (s.id_op, s.id_talhao, s.data_op, s.peso_t_colhido, s.perda_percent)
+"""
+
+SQL_CONFLITOS_OPERACOES = """
+SELECT s.id_op
+FROM operacoes_stage s JOIN operacoes o ON o.id_op = s.id_op
+WHERE o.id_talhao <> s.id_talhao OR o.data_op <> s.data_op
+  OR o.peso_t_colhido <> s.peso_t_colhido OR o.perda_percent <> s.perda_percent
+"""
+
+
+def _sincronizar_merge(con, tamanho_lote: int) -> tuple[set, set]:
+    """
+    Sincronização por MERGE: carrega todas as linhas da memória nas tabelas
+    temporárias de staging e deixa o Oracle fazer o upsert com um MERGE por tabela,
+    usando id_talhao e id_op como identidade. Operações só são inseridas: as que já
+    existem com outro conteúdo são conflitos, contados como falhas. Das tabelas só
+    se lêem os IDs desses conflitos. Tudo acontece em uma transação, confirmada no
+    final. Retorna os IDs de talhões e de operações que falharam.
+    """
+    talhoes = list(db_mem["talhoes"].values())
+    ops = list(db_mem["operacoes"])
+
+    print("\nCarregando staging...")
+    inicio = time.perf_counter()
+    # carrega o staging em lotes, sem commit (o commit apagaria a tabela temporária)
+    _, falhas = inserir_em_lotes(
+        con,
+        SQL_STAGE_TALHAO,
+        [[t["id_talhao"], t["nome"], t["area_ha"]] for t in talhoes],
+        tamanho_lote,
+        confirmar=False,
+    )
+    falhas_t = {talhoes[pos]["id_talhao"] for pos, _ in falhas}
+    for pos, msg in falhas:
+        print(f"❌ Falha ao preparar talhão {talhoes[pos]['id_talhao']}: {msg}")
+    # operações de talhões que falharam ficam de fora (violariam a chave estrangeira)
+    adiadas = {op["id_op"] for op in ops if op["id_talhao"] in falhas_t}
+    ops = [op for op in ops if op["id_op"] not in adiadas]
+    _, falhas = inserir_em_lotes(
+        con,
+        SQL_STAGE_OPERACAO,
+        [
+            [
+                op["id_op"],
+                op["id_talhao"],
+                op["data"],
+                op["peso_t_colhido"],
+                op["perda_percent"],
+            ]
+            for op in ops
+        ],
+        tamanho_lote,
+        confirmar=False,
+    )
+    falhas_op = adiadas | {ops[pos]["id_op"] for pos, _ in falhas}
+    for pos, msg in falhas:
+        print(f"❌ Falha ao preparar operação {ops[pos]['id_op']}: {msg}")
+
+    print("Executando MERGE...")
+    try:
+        with metricas.medir("oracle.merge", idas=4), con.cursor() as cur:
+            cur.execute(SQL_CONFLITOS_OPERACOES)
+            conflitos = {row[0] for row in cur.fetchall()}
+            cur.execute(SQL_MERGE_TALHOES)
+            n_talhoes = cur.rowcount
+            cur.execute(SQL_MERGE_OPERACOES)
+            n_ops = cur.rowcount
+            con.commit()  # um único commit; também esvazia as tabelas de staging
+    # se o MERGE falhar, nada é gravado e tudo continua pendente
+    except Exception as e:
+        con.rollback()
+        print(f"❌ Falha no MERGE: {e}")
+        return {t["id_talhao"] for t in talhoes}, {op["id_op"] for op in ops}
+    segundos = time.perf_counter() - inicio
+    print(
+        f"✅ MERGE: {n_talhoes} talhão(ões) e {n_ops} operação(ões) gravados "
+        f"em {segundos:.2f}s."
+    )
+    for id_op in sorted(conflitos):
+        print(f"❌ Operação {id_op}: o ID já existe no banco com outro conteúdo.")
+    # os IDs vêm sempre da memória (sequências locais), então a identidade das
+    # tabelas não é usada e não precisa ser realinhada (nada de DDL por MERGE)
+    falhas_op |= conflitos
+    return falhas_t, falhas_op
+
+
+# =========================
+# BACKENDS DE ARMAZENAMENTO
+# =========================
+# A sincronização, a leitura e a atualização da memória conversam com o banco por um
+# backend: criar o esquema, ler talhões e operações (em fluxo, com filtros), enviar
+# em lotes (o SQL de cada dialeto) e gravar tudo com upsert. O backend Oracle usa as
+# funções oracle_*; o SQLite guarda o histórico num arquivo local, com o mesmo
+# código de sincronização. O backend é escolhido com BACKEND_DADOS (oracle/sqlite).
+
+
+class Backend:
+    """
+    Interface dos backends. Além dos métodos, cada backend define o SQL do seu
+    dialeto para os envios em lotes (SQL_INSERIR_TALHAO e SQL_INSERIR_OPERACAO, com
+    os parâmetros na ordem id_talhao, nome, area_ha / id_op, id_talhao, data, peso,
+    perda, e SQL_ATUALIZAR_TALHAO, na ordem nome, area_ha, id_talhao), o texto do
+    erro de chave duplicada e os trechos das mensagens de erros transitórios
+    (ERROS_TRANSITORIOS).
+    """
+
+    nome = ""
+    rotulo = ""
+    ERRO_CHAVE_DUPLICADA = ""
+    ERROS_TRANSITORIOS: tuple[str, ...] = ()
+    SQL_INSERIR_TALHAO = SQL_INSERIR_OPERACAO = SQL_ATUALIZAR_TALHAO = ""
+
+    def configurado(self) -> bool:
+        """Se o backend tem o que precisa para conectar (sem testar a conexão)."""
+        raise NotImplementedError
+
+    def configurar(self) -> bool:
+        """Pede ou confere a configuração e testa a conexão."""
+        raise NotImplementedError
+
+    def conexao(self):
+        """Empresta uma conexão; usada com "with", ela é devolvida no final."""
+        raise NotImplementedError
+
+    def fechar(self) -> None:
+        """Fecha as conexões abertas pelo backend."""
+        raise NotImplementedError
+
+    def criar_esquema(self, con=None) -> None:
+        """Cria tabelas e índices, se não existirem."""
+        raise NotImplementedError
+
+    def ler_talhoes(self, con=None, id_talhao_min: int | None = None, **opcoes):
+        """Gera os talhões do banco (ver oracle_ler_talhoes())."""
+        raise NotImplementedError
+
+    def ler_operacoes(self, con=None, **filtros):
+        """Gera as operações do banco (ver oracle_ler_operacoes())."""
+        raise NotImplementedError
+
+    def sincronizar_merge(self, con, tamanho_lote: int) -> tuple[set, set]:
+        """Grava todos os talhões e operações da memória com upsert pelos IDs."""
+        raise NotImplementedError
+
+
+class BackendOracle(Backend):
+    """Backend Oracle: repassa para as funções oracle_* e para o pool de conexões."""
+
+    nome = "oracle"
+    rotulo = "Oracle"
+    ERRO_CHAVE_DUPLICADA = ORA_CHAVE_DUPLICADA
+    ERROS_TRANSITORIOS = ORA_ERROS_TRANSITORIOS
+    SQL_INSERIR_TALHAO = SQL_INSERIR_TALHAO
+    SQL_INSERIR_OPERACAO = SQL_INSERIR_OPERACAO
+    SQL_ATUALIZAR_TALHAO = SQL_ATUALIZAR_TALHAO
+
+    def configurado(self) -> bool:
+        return oracle_enabled()
+
+    def configurar(self) -> bool:
+        return oracle_config_ok()
+
+    def conexao(self):
+        return oracle_conn()
+
+    def fechar(self) -> None:
+        oracle_fechar_pool()
+
+    def criar_esquema(self, con=None) -> None:
+        oracle_criar_tabelas(con)
+
+    def ler_talhoes(self, con=None, id_talhao_min: int | None = None, **opcoes):
+        return oracle_ler_talhoes(con, id_talhao_min, **opcoes)
+
+    def ler_operacoes(self, con=None, **filtros):
+        return oracle_ler_operacoes(con, **filtros)
+
+    def sincronizar_merge(self, con, tamanho_lote: int) -> tuple[set, set]:
+        return _sincronizar_merge(con, tamanho_lote)
+
+
+class _ErroLoteSQLite:
+    """Erro de uma linha de um lote, no formato dos erros de getbatcherrors()."""
+
+    __slots__ = ("offset", "message")
+
+    def __init__(self, offset: int, message: str):
+        self.offset = offset
+        self.message = message
+
+
+class _CursorSQLite:
+    """
+    Cursor do SQLite com a parte da interface do python-oracledb que a sincronização
+    usa: executemany(batcherrors=True)/getbatcherrors(), arraysize e prefetchrows.
+    """
+
+    def __init__(self, con: "_ConexaoSQLite"):
+        self._con = con
+        self._cur = con.bruta.cursor()
+        self._erros: List[_ErroLoteSQLite] = []
+        self.arraysize = ORA_ARRAYSIZE
+        self.prefetchrows = 0  # sem efeito no SQLite (não há ida ao servidor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    def execute(self, sql: str, params=()):
+        if not sql.lstrip().upper().startswith("SELECT"):
+            self._con.iniciar()
+        self._cur.execute(sql, params)
+
+    def executemany(self, sql: str, linhas: list, batcherrors: bool = False):
+        self._con.iniciar()
+        self._erros = []
+        if not batcherrors:
+            self._cur.executemany(sql, linhas)
+            return
+        # caminho rápido: o lote inteiro num executemany; se alguma linha falhar, o
+        # lote é desfeito até o savepoint e refeito linha a linha, guardando os erros
+        self._cur.execute("SAVEPOINT lote")
+        try:
+            self._cur.executemany(sql, linhas)
+        except sqlite3.Error:
+            self._cur.execute("ROLLBACK TO lote")
+            for i, linha in enumerate(linhas):
+                try:
+                    self._cur.execute(sql, linha)
+                except sqlite3.Error as e:
+                    self._erros.append(_ErroLoteSQLite(i, str(e)))
+        self._cur.execute("RELEASE lote")
+
+    def getbatcherrors(self) -> List[_ErroLoteSQLite]:
+        return self._erros
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, n: int | None = None):
+        return self._cur.fetchmany(n or self.arraysize)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+
+class _ConexaoSQLite:
+    """
+    Conexão do backend SQLite. As transações são explícitas: a primeira escrita abre
+    uma com BEGIN IMMEDIATE (a trava de escrita é pega logo, respeitando o
+    busy_timeout) e commit()/rollback() a encerram.
+    """
+
+    def __init__(self, backend: "BackendSQLite", bruta: sqlite3.Connection):
+        self._backend = backend
+        self.bruta = bruta
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iniciar(self) -> None:
+        if not self.bruta.in_transaction:
+            self.bruta.execute("BEGIN IMMEDIATE")
+
+    def cursor(self) -> _CursorSQLite:
+        return _CursorSQLite(self)
+
+    def commit(self) -> None:
+        if self.bruta.in_transaction:
+            self.bruta.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.bruta.in_transaction:
+            self.bruta.execute("ROLLBACK")
+
+    def ping(self) -> None:
+        self.bruta.execute("SELECT 1")
+
+    def close(self) -> None:
+        """Devolve a conexão ao backend (desfazendo o que não foi confirmado)."""
+        self.rollback()
+        self._backend._devolver(self.bruta)
+
+
+# DDLs do backend SQLite: INTEGER PRIMARY KEY gera o ID como a identidade do Oracle
+DDLS_SQLITE = (
+    """
+    CREATE TABLE IF NOT EXISTS talhoes (
+      id_talhao INTEGER PRIMARY KEY,
+      nome TEXT NOT NULL,
+      area_ha REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS operacoes (
+      id_op INTEGER PRIMARY KEY,
+      id_talhao INTEGER NOT NULL REFERENCES talhoes(id_talhao),
+      data_op TEXT NOT NULL,
+      peso_t_colhido REAL NOT NULL,
+      perda_percent REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_operacoes_talhao_data "
+    "ON operacoes (id_talhao, data_op)",
+)
+
+SQL_UPSERT_TALHAO_SQLITE = (
+    "INSERT INTO talhoes (id_talhao, nome, area_ha) VALUES (?1, ?2, ?3) "
+    "ON CONFLICT (id_talhao) DO UPDATE SET nome = excluded.nome, "
+    "area_ha = excluded.area_ha"
+)
+# operações só são inseridas (ver SQL_MERGE_OPERACOES): um id_op repetido é
+# conferido com esta consulta
+SQL_OPERACAO_SQLITE = (
+    "SELECT id_talhao, data_op, peso_t_colhido, perda_percent "
+    "FROM operacoes WHERE id_op = ?1"
+)
+
+# as datas são gravadas no SQLite como texto YYYY-MM-DD (data_op TEXT)
+sqlite3.register_adapter(datetime.date, datetime.date.isoformat)
+
+# arquivo do backend SQLite (ajustável com SQLITE_ARQUIVO)
+CAMINHO_SQLITE = os.environ.get("SQLITE_ARQUIVO", "colheita.db")
+
+
+class BackendSQLite(Backend):
+    """
+    Backend SQLite: um arquivo local em modo WAL (leituras não esperam a escrita),
+    com o índice (id_talhao, data_op). As conexões ficam guardadas para reuso, como
+    num pool, e podem ser usadas por threads diferentes (sincronização paralela).
+    """
+
+    nome = "sqlite"
+    rotulo = "SQLite"
+    ERRO_CHAVE_DUPLICADA = "UNIQUE constraint failed"
+    # trava de escrita ocupada além do busy_timeout ou falha de E/S
+    ERROS_TRANSITORIOS = ("database is locked", "disk I/O error")
+    SQL_INSERIR_TALHAO = (
+        "INSERT INTO talhoes (id_talhao, nome, area_ha) VALUES (?1, ?2, ?3)"
+    )
+    SQL_INSERIR_OPERACAO = (
+        "INSERT INTO operacoes (id_op, id_talhao, data_op, peso_t_colhido, "
+        "perda_percent) VALUES (?1, ?2, ?3, ?4, ?5)"
+    )
+    SQL_ATUALIZAR_TALHAO = (
+        "UPDATE talhoes SET nome = ?1, area_ha = ?2 WHERE id_talhao = ?3"
+    )
+
+    def __init__(self, caminho: str = CAMINHO_SQLITE):
+        self.caminho = caminho
+        self._livres: List[sqlite3.Connection] = []
+        self._trava = threading.Lock()
+
+    def _nova_conexao(self) -> sqlite3.Connection:
+        bruta = sqlite3.connect(
+            self.caminho, isolation_level=None, check_same_thread=False, timeout=30
+        )
+        bruta.execute("PRAGMA journal_mode = WAL")
+        # no modo WAL, NORMAL só perde as últimas transações numa queda de energia
+        bruta.execute("PRAGMA synchronous = NORMAL")
+        bruta.execute("PRAGMA foreign_keys = ON")
+        return bruta
+
+    def _devolver(self, bruta: sqlite3.Connection) -> None:
+        with self._trava:
+            self._livres.append(bruta)
+
+    def configurado(self) -> bool:
+        return True
+
+    def configurar(self) -> bool:
+        try:
+            with self.conexao() as con:
+                con.ping()
+            return True
+        except sqlite3.Error as e:
+            print(f"❌ Não foi possível abrir {self.caminho}: {e}")
+            return False
+
+    def conexao(self) -> _ConexaoSQLite:
+        with metricas.medir("sqlite.conexao"):
+            with self._trava:
+                bruta = self._livres.pop() if self._livres else None
+            return _ConexaoSQLite(self, bruta or self._nova_conexao())
+
+    def fechar(self) -> None:
+        with self._trava:
+            for bruta in self._livres:
+                bruta.close()
+            self._livres.clear()
+
+    @contextmanager
+    def _sessao(self, con=None):
+        if con is not None:
+            yield con
+        else:
+            with self.conexao() as nova:
+                yield nova
+
+    def criar_esquema(self, con=None) -> None:
+        try:
+            with self._sessao(con) as con, con.cursor() as cur:
+                for ddl in DDLS_SQLITE:
+                    cur.execute(ddl)
+                con.commit()
+            print("Tabelas conferidas/criadas.")
+        except sqlite3.Error as e:
+            print(f"[SQLite] Erro criando tabelas: {e}")
+
+    def ler_talhoes(self, con=None, id_talhao_min: int | None = None, **opcoes):
+        # o SQL de talhões é o mesmo do Oracle (binds nomeados valem nos dois)
+        with self._sessao(con) as con:
+            yield from oracle_ler_talhoes(con, id_talhao_min, **opcoes)
+
+    def ler_operacoes(
+        self,
+        con=None,
+        id_talhao: int | None = None,
+        data_ini=None,
+        data_fim=None,
+        id_op_min: int | None = None,
+        arraysize: int = ORA_ARRAYSIZE,
+        prefetchrows: int = 0,
+        lotes: bool = False,
+    ):
+        with self._sessao(con) as con:
+            yield from _ler_operacoes(
+                con,
+                datetime.date.fromisoformat,  # datas guardadas como texto YYYY-MM-DD
+                datetime.date.isoformat,
+                id_talhao,
+                data_ini,
+                data_fim,
+                id_op_min,
+                arraysize,
+                prefetchrows,
+                lotes,
+            )
+
+    def sincronizar_merge(self, con, tamanho_lote: int) -> tuple[set, set]:
+        """
+        Upsert direto (INSERT ... ON CONFLICT DO UPDATE) de todos os talhões e
+        inserção das operações da memória, pelos IDs, numa única transação. Uma
+        operação cujo id_op já está no banco com o mesmo conteúdo conta como
+        gravada; com outro conteúdo, é um conflito e conta como falha.
+        """
+        talhoes = list(db_mem["talhoes"].values())
+        ops = list(db_mem["operacoes"])
+        inicio = time.perf_counter()
+        _, falhas = inserir_em_lotes(
+            con,
+            SQL_UPSERT_TALHAO_SQLITE,
+            [[t["id_talhao"], t["nome"], t["area_ha"]] for t in talhoes],
+            tamanho_lote,
+            confirmar=False,
+        )
+        falhas_t = {talhoes[pos]["id_talhao"] for pos, _ in falhas}
+        for pos, msg in falhas:
+            print(f"❌ Falha gravando talhão {talhoes[pos]['id_talhao']}: {msg}")
+        # operações de talhões que falharam ficam de fora (chave estrangeira)
+        adiadas = {op["id_op"] for op in ops if op["id_talhao"] in falhas_t}
+        ops = [op for op in ops if op["id_op"] not in adiadas]
+        _, falhas = inserir_em_lotes(
+            con,
+            self.SQL_INSERIR_OPERACAO,
+            [
+                [
+                    op["id_op"],
+                    op["id_talhao"],
+                    op["data"],
+                    op["peso_t_colhido"],
+                    op["perda_percent"],
+                ]
+                for op in ops
+            ],
+            tamanho_lote,
+            confirmar=False,
+        )
+        falhas = self._sem_repetidas(con, ops, falhas)
+        falhas_op = adiadas | {ops[pos]["id_op"] for pos, _ in falhas}
+        for pos, msg in falhas:
+            print(f"❌ Falha gravando operação {ops[pos]['id_op']}: {msg}")
+        con.commit()
+        print(
+            f"✅ Upsert: {len(talhoes) - len(falhas_t)} talhão(ões) e "
+            f"{len(ops) - len(falhas)} operação(ões) gravados "
+            f"em {time.perf_counter() - inicio:.2f}s."
+        )
+        return falhas_t, falhas_op
+
+    def _sem_repetidas(
+        self, con, ops: List[Dict[str, Any]], falhas: List[tuple[int, str]]
+    ) -> List[tuple[int, str]]:
+        """
+        Tira das falhas as operações que já estavam no banco com o mesmo conteúdo;
+        as de mesmo id_op e outro conteúdo viram conflitos.
+        """
+        restantes = []
+        with con.cursor() as cur:
+            for pos, msg in falhas:
+                if self.ERRO_CHAVE_DUPLICADA in msg:
+                    op = ops[pos]
+                    cur.execute(SQL_OPERACAO_SQLITE, [op["id_op"]])
+                    if cur.fetchone() == (
+                        op["id_talhao"],
+                        str(op["data"]),  # data_op em texto YYYY-MM-DD
+                        op["peso_t_colhido"],
+                        op["perda_percent"],
+                    ):
+                        continue
+                    msg = "o ID já existe no banco com outro conteúdo."
+                restantes.append((pos, msg))
+        return restantes
+
+
+BACKENDS = {"oracle": BackendOracle, "sqlite": BackendSQLite}
+# backend usado pela sincronização e pela atualização (ajustável com BACKEND_DADOS)
+BACKEND_PADRAO = os.environ.get("BACKEND_DADOS", "oracle")
+_backend = None
+
+
+def backend_ativo() -> Backend:
+    """Retorna o backend em uso, criando o padrão (BACKEND_DADOS) na primeira vez."""
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[BACKEND_PADRAO]()
+    return _backend
+
+
+def escolher_backend(nome: str) -> Backend:
+    """Troca o backend em uso ("oracle" ou "sqlite"), fechando as conexões do atual."""
+    global _backend
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend inválido: {nome}")
+    if _backend is not None:
+        _backend.fechar()
+    _backend = BACKENDS[nome]()
+    return _backend
@@ -0,0 +1,180 @@
+"""
+Linha de comando (fora do menu interativo): importar, puxar, analisar e
+relatorios.
+"""
+
+import argparse
+import os
+import time
+from typing import List
+
+from .estruturas import db_mem
+from .arquivos import (
+    CAMINHO_JSONL,
+    caminhos_jsonl,
+    carregar_dados,
+    carregar_json,
+    carregar_no_db_mem,
+    FORMATOS,
+    salvar_dados,
+)
+from .analises import analisar_jsonl, analisar_operacoes, formatar_analise
+from .relatorios import DIRETORIO_RELATORIOS, exportar_relatorios_por_talhao
+from .backends import BACKEND_PADRAO, BACKENDS, escolher_backend
+from .pull import puxar_oracle_para_mem
+from .importacao import importar_operacoes, importar_talhoes, relatar_rejeitados
+
+
+def comando_importar(args: argparse.Namespace) -> int:
+    """Executa o comando "importar": carrega os dados, importa e salva."""
+    if not args.talhoes and not args.operacoes:
+        print("Informe --talhoes e/ou --operacoes.")
+        return 2
+    if not carregar_no_db_mem(carregar_dados(args.formato)):
+        print("Arquivo de dados inválido.")
+        return 1
+    inicio = time.perf_counter()
+    if args.talhoes:
+        relatar_rejeitados(args.talhoes, importar_talhoes(args.talhoes, args.processos))
+    if args.operacoes:
+        relatar_rejeitados(
+            args.operacoes, importar_operacoes(args.operacoes, args.processos)
+        )
+    print(salvar_dados(args.formato, db_mem))
+    print(f"Importação concluída em {time.perf_counter() - inicio:.2f}s.")
+    return 0
+
+
+def comando_puxar(args: argparse.Namespace) -> int:
+    """Executa o comando "puxar": carrega os dados, atualiza do banco e salva."""
+    if not carregar_no_db_mem(carregar_dados(args.formato)):
+        print("Arquivo de dados inválido.")
+        return 1
+    backend = escolher_backend(args.backend)
+    if not backend.configurado():
+        print("Defina ORA_DSN / ORA_USER / ORA_PASS nas variáveis de ambiente.")
+        return 2
+    try:
+        if not puxar_oracle_para_mem():
+            return 1
+    finally:
+        backend.fechar()
+    print(salvar_dados(args.formato, db_mem))
+    return 0
+
+
+def comando_analisar(args: argparse.Namespace) -> int:
+    """
+    Executa o comando "analisar": mostra as análises dos dados salvos. No formato
+    JSON Lines, o log é analisado direto do arquivo (ver analisar_jsonl()).
+    """
+    if args.formato == "jsonl" and os.path.exists(caminhos_jsonl(CAMINHO_JSONL)[0]):
+        talhoes = carregar_json(caminhos_jsonl(CAMINHO_JSONL)[0]).get("talhoes", {})
+        analise = analisar_jsonl(CAMINHO_JSONL, args.processos)
+    else:
+        if not carregar_no_db_mem(carregar_dados(args.formato)):
+            print("Arquivo de dados inválido.")
+            return 1
+        talhoes = db_mem["talhoes"]
+        analise = analisar_operacoes(db_mem["operacoes"])
+    print("\n".join(formatar_analise(analise, talhoes)))
+    return 0
+
+
+def comando_relatorios(args: argparse.Namespace) -> int:
+    """Executa o comando "relatorios": um relatório por talhão e o índice."""
+    if not carregar_no_db_mem(carregar_dados(args.formato)):
+        print("Arquivo de dados inválido.")
+        return 1
+    inicio = time.perf_counter()
+    indice = exportar_relatorios_por_talhao(db_mem, args.diretorio, args.processos)
+    print(f"Relatórios por talhão exportados; índice em: {os.path.abspath(indice)}")
+    print(f"Concluído em {time.perf_counter() - inicio:.2f}s.")
+    return 0
+
+
+def cli(argv: List[str]) -> int:
+    """Ponto de entrada da linha de comando (fora do menu interativo)."""
+    parser = argparse.ArgumentParser(
+        prog="app.py", description="Gestão de colheita de cana (linha de comando)."
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+    imp = sub.add_parser(
+        "importar", help="importa talhões e operações de arquivos CSV ou JSON Lines"
+    )
+    imp.add_argument(
+        "--talhoes", help="arquivo de talhões (nome, area_ha[, id_talhao])"
+    )
+    imp.add_argument(
+        "--operacoes",
+        help="arquivo de operações (id_talhao, data, peso_t_colhido, perda_percent)",
+    )
+    imp.add_argument(
+        "--formato",
+        choices=tuple(FORMATOS.values()),
+        default="json",
+        help="formato dos dados a atualizar (padrão: json)",
+    )
+    imp.add_argument(
+        "--processos",
+        type=int,
+        default=None,
+        help="processos de validação (padrão: CPUs)",
+    )
+    imp.set_defaults(executar=comando_importar)
+    pux = sub.add_parser(
+        "puxar", help="atualiza os dados com o que entrou no banco desde a última vez"
+    )
+    pux.add_argument(
+        "--formato",
+        choices=tuple(FORMATOS.values()),
+        default="json",
+        help="formato dos dados a atualizar (padrão: json)",
+    )
+    pux.add_argument(
+        "--backend",
+        choices=tuple(BACKENDS),
+        default=BACKEND_PADRAO,
+        help=f"banco de onde ler (padrão: {BACKEND_PADRAO})",
+    )
+    pux.set_defaults(executar=comando_puxar)
+    ana = sub.add_parser(
+        "analisar",
+        help="percentis de perda, produtividade por talhão e mês e piores talhões",
+    )
+    ana.add_argument(
+        "--formato",
+        choices=tuple(FORMATOS.values()),
+        default="json",
+        help="formato dos dados a analisar (padrão: json)",
+    )
+    ana.add_argument(
+        "--processos",
+        type=int,
+        default=None,
+        help="processos de análise do log JSON Lines (padrão: CPUs)",
+    )
+    ana.set_defaults(executar=comando_analisar)
+    rel = sub.add_parser(
+        "relatorios", help="um relatório por talhão, em paralelo, e um índice"
+    )
+    rel.add_argument(
+        "--formato",
+        choices=tuple(FORMATOS.values()),
+        default="json",
+        help="formato dos dados (padrão: json)",
+    )
+    rel.add_argument(
+        "--diretorio",
+        default=DIRETORIO_RELATORIOS,
+        help=f"diretório dos relatórios (padrão: {DIRETORIO_RELATORIOS})",
+    )
+    rel.add_argument(
+        "--processos",
+        type=int,
+        default=None,
+        help="processos que escrevem os relatórios (padrão: CPUs)",
+    )
+    rel.set_defaults(executar=comando_relatorios)
+    args = parser.parse_args(argv)
+    return args.executar(args)
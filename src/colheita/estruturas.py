@@ -0,0 +1,810 @@
+"""
+Estruturas de dados (Cap. 4): as operações em colunas (OperacoesColunares) com os
+agregados e os índices, os níveis e limiares de alerta de perda, o diário de
+mudanças, as sequências de IDs e os dados em memória (db_mem).
+"""
+
+import bisect
+import datetime
+import enum
+import functools
+import itertools
+import operator
+from array import array
+from typing import Any, Dict, Iterable, List
+
+from .metricas import metricas
+
+# Declara a estrutura de dados central do projeto, que é um dicionário de talhões e
+# colheitas, que armazenará os dados durante a execução do programa e servirá como
+# base para criar/carregar arquivo JSON e interagir com banco de dados da Oracle.
+# "talhoes" é um dicionário de dicionários e "operacoes" é uma lista de dicionários.
+# cada talhão e operação é um dicionário.
+# Exemplo:
+# {
+#   "talhoes": {
+#     "1": {"nome": "Talhão 1", "area_ha": 10.0},
+#     "2": {"nome": "Talhão 2", "area_ha": 15.0}
+#   },
+#   "operacoes": [
+#     {"id_talhao": 1, "data": "2023-01-01", "peso_t_colhido": 5.0, "perda_percent": 10.0},
+#     {"id_talhao": 2, "data": "2023-01-02", "peso_t_colhido": 7.0, "perda_percent": 5.0}
+#   ],
+#   "journal": {"talhoes": {"2": "novo"}, "operacoes": {"2": "novo"}, ...}
+# }
+# "journal" é o diário de mudanças: guarda o que ainda não foi enviado ao Oracle.
+# Em memória, "operacoes" é guardada em colunas (OperacoesColunares, abaixo), mas cada
+# operação continua sendo lida como um dicionário, no formato acima.
+
+
+class Agregado:
+    """
+    Totais de um grupo de operações (geral, um talhão ou um dia), mantidos a cada
+    operação adicionada ou removida: quantidade, toneladas, soma das perdas e os
+    extremos de peso e perda.
+    """
+
+    __slots__ = (
+        "n",
+        "total_peso",
+        "soma_perda",
+        "min_peso",
+        "max_peso",
+        "min_perda",
+        "max_perda",
+        "extremos_ok",
+    )
+
+    def __init__(self):
+        self.n = 0
+        self.total_peso = 0.0
+        self.soma_perda = 0.0
+        self.min_peso = self.max_peso = 0.0
+        self.min_perda = self.max_perda = 0.0
+        # fica False quando um extremo é removido e precisa ser recalculado
+        self.extremos_ok = True
+
+    def adicionar(self, peso: float, perda: float) -> None:
+        if self.n == 0:
+            self.min_peso = self.max_peso = peso
+            self.min_perda = self.max_perda = perda
+        else:
+            self.min_peso = min(self.min_peso, peso)
+            self.max_peso = max(self.max_peso, peso)
+            self.min_perda = min(self.min_perda, perda)
+            self.max_perda = max(self.max_perda, perda)
+        self.n += 1
+        self.total_peso += peso
+        self.soma_perda += perda
+
+    def remover(self, peso: float, perda: float) -> None:
+        self.n -= 1
+        self.total_peso -= peso
+        self.soma_perda -= perda
+        if self.n == 0:
+            self.__init__()
+        # remover um extremo obriga a recalcular os extremos do grupo
+        elif peso in (self.min_peso, self.max_peso) or perda in (
+            self.min_perda,
+            self.max_perda,
+        ):
+            self.extremos_ok = False
+
+    @property
+    def media_perda(self) -> float:
+        return self.soma_perda / self.n if self.n else 0.0
+
+
+class AgregadosOperacoes:
+    """Agregados geral, por talhão (id_talhao) e por dia (ordinal da data)."""
+
+    def __init__(self):
+        self.geral = Agregado()
+        self.por_talhao: Dict[int, Agregado] = {}
+        self.por_dia: Dict[int, Agregado] = {}
+
+    def adicionar(self, id_talhao: int, dia: int, peso: float, perda: float) -> None:
+        self.geral.adicionar(peso, perda)
+        self.por_talhao.setdefault(id_talhao, Agregado()).adicionar(peso, perda)
+        self.por_dia.setdefault(dia, Agregado()).adicionar(peso, perda)
+
+    def remover(self, id_talhao: int, dia: int, peso: float, perda: float) -> None:
+        self.geral.remover(peso, perda)
+        for grupos, chave in ((self.por_talhao, id_talhao), (self.por_dia, dia)):
+            grupos[chave].remover(peso, perda)
+            if grupos[chave].n == 0:  # grupo vazio sai do dicionário
+                del grupos[chave]
+
+
+class OperacaoView:
+    """
+    Visão de uma linha de OperacoesColunares. Funciona como o dicionário de uma
+    operação (op["peso_t_colhido"], op.get("data")), sem copiar os valores.
+    """
+
+    __slots__ = ("_store", "_pos")
+
+    def __init__(self, store: "OperacoesColunares", pos: int):
+        self._store = store
+        self._pos = pos
+
+    def __getitem__(self, chave: str):
+        return self._store.valor(self._pos, chave)
+
+    def get(self, chave: str, padrao=None):
+        try:
+            return self._store.valor(self._pos, chave)
+        except KeyError:
+            return padrao
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in OperacoesColunares.CHAVES
+
+    def keys(self):
+        return OperacoesColunares.CHAVES
+
+    def items(self):
+        return [(k, self[k]) for k in OperacoesColunares.CHAVES]
+
+    def __repr__(self) -> str:
+        return f"OperacaoView({dict(self.items())})"
+
+
+class OperacoesColunares:
+    """
+    Armazena as operações de colheita em colunas tipadas (array): IDs como inteiros,
+    datas como ordinais (datetime.date.toordinal), peso e perda como floats e o
+    alerta como um código pequeno. Cada linha ocupa cerca de 37 bytes, em vez de
+    centenas de bytes de um dicionário. Somas, médias e filtros percorrem as colunas
+    direto em C (sum, map, itertools.compress). O alerta é lido como NivelAlerta.
+    """
+
+    # chaves do dicionário de uma operação e tipo de cada coluna
+    CHAVES = (
+        "id_op",
+        "id_talhao",
+        "data",
+        "peso_t_colhido",
+        "perda_percent",
+        "alerta_perda",
+    )
+    TIPOS = {
+        "id_op": "q",
+        "id_talhao": "q",
+        "data": "i",
+        "peso_t_colhido": "d",
+        "perda_percent": "d",
+        "alerta_perda": "b",
+    }
+
+    def __init__(self, limiares: Dict[str, Any] | None = None):
+        self.colunas = {chave: array(tipo) for chave, tipo in self.TIPOS.items()}
+        # limiares usados para classificar as operações que chegam sem alerta (ver
+        # novos_limiares_alerta()); é o mesmo objeto que db["limiares_alerta"]
+        self.limiares = novos_limiares_alerta() if limiares is None else limiares
+        # totais mantidos a cada inclusão/remoção (consultados por resumo())
+        self.agregados = AgregadosOperacoes()
+        # índices secundários: posições por id_talhao (hash), posições ordenadas por
+        # data (com os ordinais em paralelo, para busca binária com bisect) e
+        # posições ordenadas por id_op (idem, com os IDs em paralelo)
+        self._indice_talhao: Dict[int, array] = {}
+        self._datas_ord = array("i")
+        self._datas_pos = array("q")
+        self._ids_ord = array("q")
+        self._ids_pos = array("q")
+        # ficam False quando uma remoção (ou data/ID fora de ordem) exige reconstrução
+        self._indice_talhao_ok = True
+        self._indice_datas_ok = True
+        self._indice_ids_ok = True
+        # log JSON Lines que já contém as primeiras linhas deste armazenamento:
+        # {"caminho": ..., "n": linhas gravadas, "bytes": tamanho confirmado}
+        self.persistencia: Dict[str, Any] | None = None
+        # datas que não estão no formato YYYY-MM-DD ficam guardadas como texto,
+        # por posição (a coluna "data" recebe 0), para não perder informação
+        self.datas_livres: Dict[int, str] = {}
+
+    # ---- conversão de/para o formato de dicionário ----
+
+    @classmethod
+    def de_dicts(
+        cls, ops: Iterable[Dict[str, Any]], limiares: Dict[str, Any] | None = None
+    ) -> "OperacoesColunares":
+        """Cria o armazenamento a partir de operações no formato de dicionário."""
+        store = cls(limiares)
+        for op in ops:
+            store.append(op)
+        return store
+
+    def append(self, op: Dict[str, Any]) -> None:
+        """Adiciona uma operação no formato de dicionário."""
+        c = self.colunas
+        pos = len(c["id_op"])
+        id_op = int(op["id_op"])
+        id_talhao = int(op["id_talhao"])
+        dia = self._data_para_ordinal(pos, op.get("data", ""))
+        peso = float(op.get("peso_t_colhido", 0.0))
+        perda = float(op.get("perda_percent", 0.0))
+        c["id_op"].append(id_op)
+        c["id_talhao"].append(id_talhao)
+        c["data"].append(dia)
+        c["peso_t_colhido"].append(peso)
+        c["perda_percent"].append(perda)
+        # o nível gravado (código) é mantido; sem ele (ou com o texto dos arquivos
+        # antigos), a operação é classificada com os limiares atuais
+        nivel = op.get("alerta_perda")
+        if not (isinstance(nivel, int) and 0 <= nivel < len(NIVEIS_ALERTA)):
+            nivel = codigo_alerta(perda, id_talhao, dia, self.limiares)
+        c["alerta_perda"].append(nivel)
+        self.agregados.adicionar(id_talhao, dia, peso, perda)
+        # atualiza os índices; datas em ordem (o caso comum) só vão para o fim
+        if self._indice_talhao_ok:
+            self._indice_talhao.setdefault(id_talhao, array("q")).append(pos)
+        if self._indice_datas_ok and (
+            not self._datas_ord or dia >= self._datas_ord[-1]
+        ):
+            self._datas_ord.append(dia)
+            self._datas_pos.append(pos)
+        else:
+            self._indice_datas_ok = False
+        if self._indice_ids_ok and (not self._ids_ord or id_op > self._ids_ord[-1]):
+            self._ids_ord.append(id_op)
+            self._ids_pos.append(pos)
+        else:
+            self._indice_ids_ok = False
+
+    def extend(self, ops: Iterable[Dict[str, Any]]) -> None:
+        """Adiciona várias operações no formato de dicionário."""
+        for op in ops:
+            self.append(op)
+
+    def remover(self, pos: int) -> None:
+        """Remove a operação da posição pos."""
+        c = self.colunas
+        self.agregados.remover(
+            c["id_talhao"][pos],
+            c["data"][pos],
+            c["peso_t_colhido"][pos],
+            c["perda_percent"][pos],
+        )
+        for coluna in c.values():
+            coluna.pop(pos)
+        # as posições mudaram: os índices serão reconstruídos na próxima consulta
+        self._indice_talhao_ok = self._indice_datas_ok = self._indice_ids_ok = False
+        # o log gravado não corresponde mais ao início das colunas
+        self.persistencia = None
+        if self.datas_livres:
+            # as posições depois da removida andam uma casa para trás
+            self.datas_livres = {
+                (p - 1 if p > pos else p): t
+                for p, t in self.datas_livres.items()
+                if p != pos
+            }
+
+    def renumerar(self, pos: int, id_op: int) -> None:
+        """Troca o id_op da operação da posição pos."""
+        self.colunas["id_op"][pos] = id_op
+        self._indice_ids_ok = False
+        # o log gravado guarda o ID antigo dessa linha
+        if self.persistencia is not None and pos < self.persistencia["n"]:
+            self.persistencia = None
+
+    def para_dict(self, pos: int) -> Dict[str, Any]:
+        """Retorna a operação da posição pos como dicionário."""
+        return {chave: self.valor(pos, chave) for chave in self.CHAVES}
+
+    def para_dicts(self) -> List[Dict[str, Any]]:
+        """Retorna todas as operações como lista de dicionários."""
+        return [self.para_dict(pos) for pos in range(len(self))]
+
+    def para_registro(self, pos: int) -> Dict[str, Any]:
+        """
+        Retorna a operação da posição pos no formato dos arquivos (JSON e JSON
+        Lines): a data em ordinal e o alerta em código, lidos direto das colunas. Só
+        as datas em texto livre de arquivos antigos continuam em texto.
+        """
+        registro = {chave: self.colunas[chave][pos] for chave in self.CHAVES}
+        if not registro["data"]:
+            registro["data"] = self.datas_livres.get(pos, "")
+        return registro
+
+    def para_registros(self) -> List[Dict[str, Any]]:
+        """Retorna todas as operações no formato dos arquivos (ver para_registro())."""
+        return [self.para_registro(pos) for pos in range(len(self))]
+
+    def _data_para_ordinal(self, pos: int, data) -> int:
+        """
+        Ordinal da data: aceita o próprio ordinal (formato dos arquivos), date ou
+        texto YYYY-MM-DD. Outro texto (de arquivos antigos) é guardado como está.
+        """
+        if isinstance(data, int):
+            return data
+        if isinstance(data, datetime.date):
+            return data.toordinal()
+        texto = str(data)
+        try:
+            data = datetime.date.fromisoformat(texto)
+            # só aceita exatamente YYYY-MM-DD, para a conversão de volta ser idêntica
+            if data.isoformat() == texto:
+                return data.toordinal()
+        except ValueError:
+            pass
+        self.datas_livres[pos] = texto
+        return 0
+
+    def valor(self, pos: int, chave: str):
+        """Lê o valor de uma chave (no formato do dicionário) na posição pos."""
+        if chave == "data":
+            ordinal = self.colunas["data"][pos]
+            if ordinal == 0:
+                return self.datas_livres.get(pos, "")
+            return datetime.date.fromordinal(ordinal)
+        if chave == "alerta_perda":
+            return NIVEIS_ALERTA[self.colunas["alerta_perda"][pos]]
+        return self.colunas[chave][pos]
+
+    # ---- comportamento de lista ----
+
+    def __len__(self) -> int:
+        return len(self.colunas["id_op"])
+
+    def __getitem__(self, pos: int) -> OperacaoView:
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("posição fora do intervalo")
+        return OperacaoView(self, pos)
+
+    def __iter__(self):
+        return (OperacaoView(self, pos) for pos in range(len(self)))
+
+    # ---- operações sobre colunas ----
+
+    def soma(self, chave: str) -> float:
+        """Soma de uma coluna numérica."""
+        return sum(self.colunas[chave])
+
+    def media(self, chave: str) -> float:
+        """Média de uma coluna numérica (0.0 se não houver operações)."""
+        return self.soma(chave) / len(self) if len(self) else 0.0
+
+    def filtrar(self, chave: str, igual=None, minimo=None, maximo=None) -> List[int]:
+        """
+        Retorna as posições cujo valor da coluna é igual a "igual" e/ou está entre
+        "minimo" e "maximo" (inclusive). Para "data", use ordinais.
+        """
+        coluna = self.colunas[chave]
+        # cada condição vira uma máscara calculada por map() sobre a coluna inteira
+        mascaras = [
+            map(comparar, coluna, itertools.repeat(alvo))
+            for comparar, alvo in (
+                (operator.eq, igual),
+                (operator.ge, minimo),
+                (operator.le, maximo),
+            )
+            if alvo is not None
+        ]
+        if not mascaras:
+            return list(range(len(coluna)))
+        mascara = mascaras[0] if len(mascaras) == 1 else map(all, zip(*mascaras))
+        return list(itertools.compress(range(len(coluna)), mascara))
+
+    def selecionar(self, posicoes: Iterable[int]) -> "OperacoesColunares":
+        """Retorna um novo armazenamento só com as posições informadas."""
+        novo = OperacoesColunares(self.limiares)
+        for pos in posicoes:
+            for chave, coluna in self.colunas.items():
+                novo.colunas[chave].append(coluna[pos])
+            if pos in self.datas_livres:
+                novo.datas_livres[len(novo) - 1] = self.datas_livres[pos]
+        novo.reconstruir_agregados()
+        novo.invalidar_indices()
+        return novo
+
+    # ---- índices e consultas ----
+
+    def invalidar_indices(self) -> None:
+        """Marca os índices para reconstrução (colunas preenchidas diretamente)."""
+        self._indice_talhao_ok = self._indice_datas_ok = self._indice_ids_ok = False
+
+    def _garantir_indices(self) -> None:
+        """Reconstrói os índices que estiverem desatualizados."""
+        if not self._indice_talhao_ok:
+            self._indice_talhao = {}
+            for pos, id_talhao in enumerate(self.colunas["id_talhao"]):
+                self._indice_talhao.setdefault(id_talhao, array("q")).append(pos)
+            self._indice_talhao_ok = True
+        if not self._indice_datas_ok:
+            datas = self.colunas["data"]
+            # sorted é estável: no mesmo dia, a ordem de registro é mantida
+            ordem = sorted(range(len(datas)), key=datas.__getitem__)
+            self._datas_pos = array("q", ordem)
+            self._datas_ord = array("i", (datas[p] for p in ordem))
+            self._indice_datas_ok = True
+        if not self._indice_ids_ok:
+            ids = self.colunas["id_op"]
+            ordem = sorted(range(len(ids)), key=ids.__getitem__)
+            self._ids_pos = array("q", ordem)
+            self._ids_ord = array("q", (ids[p] for p in ordem))
+            self._indice_ids_ok = True
+
+    def posicoes_talhao(self, id_talhao: int) -> array:
+        """Posições das operações de um talhão, em ordem de registro (O(1))."""
+        self._garantir_indices()
+        return self._indice_talhao.get(id_talhao, array("q"))
+
+    def posicoes_periodo(self, data_ini: int | None, data_fim: int | None) -> array:
+        """
+        Posições das operações entre os ordinais data_ini e data_fim (inclusive),
+        ordenadas por data, por busca binária no índice de datas (O(log n + k)).
+        """
+        self._garantir_indices()
+        ini = 0 if data_ini is None else bisect.bisect_left(self._datas_ord, data_ini)
+        fim = (
+            len(self._datas_ord)
+            if data_fim is None
+            else bisect.bisect_right(self._datas_ord, data_fim)
+        )
+        return self._datas_pos[ini:fim]
+
+    def posicoes_ids(self, ids: Iterable[int]) -> List[int]:
+        """
+        Posições das operações com os id_op informados, na ordem dos IDs, por busca
+        binária no índice de IDs (O(k log n)). IDs que não estão na memória são
+        ignorados.
+        """
+        self._garantir_indices()
+        ordenados, posicoes = self._ids_ord, []
+        for id_op in ids:
+            i = bisect.bisect_left(ordenados, id_op)
+            if i < len(ordenados) and ordenados[i] == id_op:
+                posicoes.append(self._ids_pos[i])
+        return posicoes
+
+    def consultar(
+        self,
+        id_talhao: int | None = None,
+        data_ini: int | None = None,
+        data_fim: int | None = None,
+    ) -> List[int]:
+        """
+        Posições (em ordem de registro) das operações que atendem aos filtros. Usa o
+        índice mais seletivo e confere o outro filtro só nas posições candidatas.
+        """
+        por_data = data_ini is not None or data_fim is not None
+        if id_talhao is None and not por_data:
+            return list(range(len(self)))
+        if id_talhao is None:
+            return sorted(self.posicoes_periodo(data_ini, data_fim))
+        candidatas = self.posicoes_talhao(id_talhao)
+        if not por_data:
+            return list(candidatas)
+        datas = self.colunas["data"]
+        ini = data_ini if data_ini is not None else -1
+        fim = data_fim if data_fim is not None else 2**31 - 1
+        return [p for p in candidatas if ini <= datas[p] <= fim]
+
+    # ---- alertas ----
+
+    def reclassificar_alertas(self, limiares: Dict[str, Any]) -> int:
+        """
+        Recalcula a coluna de alertas com os limiares (ver novos_limiares_alerta()),
+        que passam a ser os do armazenamento:
+        uma passada sobre a coluna de perda com os limiares padrão, feita em C
+        (map + bisect), e depois só as posições das safras e talhões com limiares
+        próprios, achadas pelos índices. Retorna quantas operações mudaram de nível.
+        """
+        perdas = self.colunas["perda_percent"]
+        niveis = array(
+            "b", map(functools.partial(bisect.bisect_right, limiares["padrao"]), perdas)
+        )
+
+        def aplicar(posicoes: Iterable[int], limites: List[float]) -> None:
+            classificar = functools.partial(bisect.bisect_right, limites)
+            for pos, nivel in zip(
+                posicoes, map(classificar, map(perdas.__getitem__, posicoes))
+            ):
+                niveis[pos] = nivel
+
+        for safra, limites in limiares["safras"].items():
+            aplicar(self.posicoes_periodo(*periodo_safra(int(safra))), limites)
+        # os limiares do talhão valem sobre os da safra
+        for id_talhao, limites in limiares["talhoes"].items():
+            aplicar(self.posicoes_talhao(int(id_talhao)), limites)
+        mudaram = sum(map(operator.ne, niveis, self.colunas["alerta_perda"]))
+        self.colunas["alerta_perda"] = niveis
+        self.limiares = limiares
+        if mudaram:
+            # o log gravado guarda os níveis antigos: tem de ser reescrito
+            self.persistencia = None
+        return mudaram
+
+    # ---- agregados ----
+
+    def reconstruir_agregados(self) -> None:
+        """Recalcula todos os agregados a partir das colunas."""
+        c = self.colunas
+        self.agregados = AgregadosOperacoes()
+        for linha in zip(
+            c["id_talhao"], c["data"], c["peso_t_colhido"], c["perda_percent"]
+        ):
+            self.agregados.adicionar(*linha)
+
+    def resumo(self, id_talhao: int | None = None, dia: int | None = None) -> Agregado:
+        """
+        Retorna os totais gerais, de um talhão ou de um dia (ordinal), sem percorrer as
+        operações. Só quando um extremo (mínimo/máximo) foi removido o grupo é
+        recalculado.
+        """
+        if id_talhao is not None:
+            agregado = self.agregados.por_talhao.get(id_talhao, Agregado())
+            chave = "id_talhao"
+            alvo = id_talhao
+        elif dia is not None:
+            agregado = self.agregados.por_dia.get(dia, Agregado())
+            chave = "data"
+            alvo = dia
+        else:
+            agregado = self.agregados.geral
+            chave = alvo = None
+        if not agregado.extremos_ok:
+            posicoes = self.filtrar(chave, igual=alvo) if chave else range(len(self))
+            pesos = [self.colunas["peso_t_colhido"][p] for p in posicoes]
+            perdas = [self.colunas["perda_percent"][p] for p in posicoes]
+            agregado.min_peso, agregado.max_peso = min(pesos), max(pesos)
+            agregado.min_perda, agregado.max_perda = min(perdas), max(perdas)
+            agregado.extremos_ok = True
+        return agregado
+
+    def produtividade(self, talhoes: Dict[str, Any]) -> Dict[int, float]:
+        """Produtividade (t/ha) de cada talhão com operações, usando area_ha."""
+        prod = {}
+        for id_talhao, agregado in self.agregados.por_talhao.items():
+            area = float(talhoes.get(str(id_talhao), {}).get("area_ha", 0.0))
+            if area > 0:
+                prod[id_talhao] = agregado.total_peso / area
+        return prod
+
+
+# texto de cada nível de alerta (o código do nível é o índice da tupla)
+TEXTOS_ALERTA = (
+    "BAIXA (dentro do esperado)",
+    "MÉDIA (rever umidade e terreno, checar facas)",
+    "ALTA (investigar regulagem da colhedora, velocidade de avanço, altura de corte)",
+)
+
+
+class NivelAlerta(enum.IntEnum):
+    """
+    Nível de alerta de perda. Só o código (0, 1 ou 2) é guardado, na memória e nos
+    arquivos; o texto é obtido na exibição.
+    """
+
+    BAIXA = 0
+    MEDIA = 1
+    ALTA = 2
+
+    @property
+    def texto(self) -> str:
+        return TEXTOS_ALERTA[self]
+
+
+# níveis por código, para converter sem a busca do construtor do enum
+NIVEIS_ALERTA = tuple(NivelAlerta)
+
+# limiares padrão (%): a perda a partir da qual o alerta é médio e alto
+LIMIARES_PADRAO = [8.0, 15.0]
+# mês em que a safra começa (a safra 2024 vai de abril/2024 a março/2025)
+MES_INICIO_SAFRA = 4
+
+
+def novos_limiares_alerta() -> Dict[str, Any]:
+    """
+    Cria a configuração de limiares de alerta: "padrao" vale para todas as
+    operações, "safras" (ano de início da safra -> limiares) e "talhoes" (id_talhao
+    -> limiares) têm precedência, nessa ordem crescente. Limiares são [média, alta].
+    """
+    return {"padrao": list(LIMIARES_PADRAO), "safras": {}, "talhoes": {}}
+
+
+def safra_de(dia: int) -> int:
+    """Ano de início da safra da data (ordinal)."""
+    data = datetime.date.fromordinal(dia)
+    return data.year if data.month >= MES_INICIO_SAFRA else data.year - 1
+
+
+def periodo_safra(safra: int) -> tuple[int, int]:
+    """Primeiro e último dia (ordinais) da safra que começa no ano safra."""
+    inicio = datetime.date(safra, MES_INICIO_SAFRA, 1)
+    return (
+        inicio.toordinal(),
+        datetime.date(safra + 1, MES_INICIO_SAFRA, 1).toordinal() - 1,
+    )
+
+
+def limites_alerta(
+    limiares: Dict[str, Any], id_talhao: int | None = None, dia: int | None = None
+) -> List[float]:
+    """
+    Limiares [média, alta] que valem para uma operação do talhão id_talhao no dia
+    (ordinal): os do talhão, senão os da safra, senão os padrão.
+    """
+    if limiares["talhoes"] and id_talhao is not None:
+        if (limites := limiares["talhoes"].get(str(id_talhao))) is not None:
+            return limites
+    if limiares["safras"] and dia:
+        if (limites := limiares["safras"].get(str(safra_de(dia)))) is not None:
+            return limites
+    return limiares["padrao"]
+
+
+def codigo_alerta(
+    perda_percent: float,
+    id_talhao: int | None = None,
+    dia: int | None = None,
+    limiares: Dict[str, Any] | None = None,
+) -> NivelAlerta:
+    """
+    Retorna o nível de alerta da perda percentual, com os limiares que valem (os
+    padrão, se limiares for None).
+    """
+    if limiares is None:
+        limiares = novos_limiares_alerta()
+    # quantos limiares a perda alcança: 0 (baixa), 1 (média) ou 2 (alta)
+    return NIVEIS_ALERTA[
+        bisect.bisect_right(limites_alerta(limiares, id_talhao, dia), perda_percent)
+    ]
+
+
+def perda_alerta(
+    perda_percent: float,
+    id_talhao: int | None = None,
+    dia: int | None = None,
+    limiares: Dict[str, Any] | None = None,
+) -> str:
+    """Gera um alerta textual baseado na perda percentual."""
+    return codigo_alerta(perda_percent, id_talhao, dia, limiares).texto
+
+
+@metricas.medido("alertas.reclassificar")
+def reclassificar_alertas(db: Dict[str, Any] | None = None) -> int:
+    """
+    Reclassifica o alerta de todas as operações com os limiares atuais, numa
+    passada em lote sobre a coluna de perda. Retorna quantas mudaram de nível.
+    """
+    db = db_mem if db is None else db
+    ops = db["operacoes"]
+    mudaram = ops.reclassificar_alertas(db["limiares_alerta"])
+    metricas.contar("alertas.reclassificar", len(ops))
+    return mudaram
+
+
+def novo_journal(reconciliar: bool = False) -> Dict[str, Any]:
+    """
+    Cria um diário de mudanças vazio. "talhoes" e "operacoes" mapeiam o ID (como
+    string) para "novo" ou "alterado"; "ultima_sync" é a marca d'água da última
+    sincronização bem-sucedida; "reconciliar" pede uma comparação completa com o
+    Oracle na próxima sincronização (quando não se sabe o que já foi enviado).
+    """
+    return {
+        "talhoes": {},
+        "operacoes": {},
+        "ultima_sync": None,
+        "reconciliar": reconciliar,
+    }
+
+
+def novo_db() -> Dict[str, Any]:
+    """Cria a estrutura de dados vazia (ver o exemplo no início do capítulo)."""
+    limiares = novos_limiares_alerta()
+    return {
+        "talhoes": {},
+        # as operações classificam o alerta com os mesmos limiares de
+        # "limiares_alerta" (o armazenamento guarda o próprio objeto)
+        "operacoes": OperacoesColunares(limiares),
+        "journal": novo_journal(),
+        # último ID usado de talhões e de operações (ver proximo_id())
+        "sequencias": {"talhao": 0, "op": 0},
+        # marca d'água da atualização a partir do Oracle (ver puxar_oracle_para_mem())
+        "marca_pull": {"talhao": 0, "op": 0, "ultimo_pull": None},
+        # limiares dos níveis de alerta de perda (ver novos_limiares_alerta())
+        "limiares_alerta": limiares,
+    }
+
+
+db_mem = novo_db()
+
+
+def journal_marcar(
+    db: Dict[str, Any], tipo: str, id_: int, estado: str = "novo"
+) -> None:
+    """Marca um talhão ou operação (tipo "talhoes"/"operacoes") como pendente de envio."""
+    pendentes = db["journal"][tipo]
+    # um registro novo continua "novo" mesmo que seja alterado antes do envio
+    if pendentes.get(str(id_)) != "novo":
+        pendentes[str(id_)] = estado
+
+
+def journal_de_carga(db: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Monta o diário para dados carregados de um JSON sem diário: tudo é marcado como
+    novo e a próxima sincronização confere o Oracle antes de inserir.
+    """
+    journal = novo_journal(reconciliar=True)
+    for id_ in db["talhoes"]:
+        journal["talhoes"][str(id_)] = "novo"
+    for op in db["operacoes"]:
+        journal["operacoes"][str(op["id_op"])] = "novo"
+    return journal
+
+
+def sequencias_de_carga(db: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Calcula o último ID usado de talhões e de operações a partir dos dados (usado
+    uma única vez, quando os dados não trazem as sequências).
+    """
+    ops = db["operacoes"]
+    if isinstance(ops, OperacoesColunares):
+        ids_op = ops.colunas["id_op"]
+    else:
+        ids_op = [int(op["id_op"]) for op in ops]
+    return {
+        # converte os IDs (chaves do dicionário) para inteiros e pega o maior
+        "talhao": max(map(int, db["talhoes"].keys()), default=0),
+        "op": max(ids_op, default=0),
+    }
+
+
+def proximo_id(db: Dict[str, Any], tipo: str) -> int:
+    """
+    Reserva e retorna o próximo ID da sequência tipo ("talhao" ou "op"). As
+    sequências ficam em db["sequencias"] e são salvas junto com o JSON, então um ID
+    nunca é reaproveitado, nem depois de carregar um arquivo.
+    """
+    if "sequencias" not in db:
+        db["sequencias"] = sequencias_de_carga(db)
+    db["sequencias"][tipo] += 1
+    return db["sequencias"][tipo]
+
+
+def gerar_id_talhao(db: Dict[str, Any]) -> int:
+    """Gera um novo ID para talhão, a partir da sequência de talhões (O(1))."""
+    return proximo_id(db, "talhao")
+
+
+def _ordinal(data) -> int | None:
+    """
+    Converte uma data (date, ordinal ou texto YYYY-MM-DD) para ordinal; None
+    continua None.
+    """
+    if data is None or isinstance(data, int):
+        return data
+    if isinstance(data, datetime.date):
+        return data.toordinal()
+    return datetime.date.fromisoformat(str(data)).toordinal()
+
+
+def consultar_operacoes(
+    db: Dict[str, Any], id_talhao: int | None = None, data_ini=None, data_fim=None
+) -> List[Dict[str, Any]]:
+    """
+    Retorna as operações de um talhão e/ou de um período (datas inclusive), em ordem
+    de registro. Com o armazenamento em colunas usa os índices, sem varrer tudo.
+    """
+    ops = db["operacoes"]
+    ini, fim = _ordinal(data_ini), _ordinal(data_fim)
+    if isinstance(ops, OperacoesColunares):
+        return [OperacaoView(ops, pos) for pos in ops.consultar(id_talhao, ini, fim)]
+    # lista de dicionários: não há índice, então filtra operação por operação
+    resultado = []
+    for op in ops:
+        if id_talhao is not None and op["id_talhao"] != id_talhao:
+            continue
+        if ini is not None or fim is not None:
+            try:
+                dia = _ordinal(op["data"])
+            except ValueError:
+                continue
+            if (ini is not None and dia < ini) or (fim is not None and dia > fim):
+                continue
+        resultado.append(op)
+    return resultado
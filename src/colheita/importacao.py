@@ -0,0 +1,154 @@
+"""
+Importação em lote de talhões e operações de arquivos CSV ou JSON Lines, com a
+validação dos arquivos grandes em pedaços paralelos.
+"""
+
+import csv
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, List
+
+from .estruturas import db_mem, journal_marcar, proximo_id
+from .validacao import validar_operacao, validar_talhao
+from .arquivos import LIMIAR_PARALELO_BYTES, TAMANHO_PEDACO
+
+
+def _ler_registros(caminho: str) -> Iterable[tuple[int, Any]]:
+    """
+    Lê o arquivo e gera (nº da linha, registro). No CSV o registro já é um
+    dicionário; no JSON Lines é a linha em texto (o parse é feito na validação).
+    """
+    with open(caminho, "r", encoding="utf-8", newline="") as f:
+        if caminho.lower().endswith(".csv"):
+            leitor = csv.DictReader(f)
+            for registro in leitor:
+                yield leitor.line_num, registro
+        else:
+            for num, linha in enumerate(f, start=1):
+                if linha.strip():  # ignora linhas em branco
+                    yield num, linha
+
+
+def _validar_pedaco(
+    tipo: str, pedaco: List[tuple[int, Any]], ids_talhoes: set
+) -> tuple[list, list]:
+    """
+    Valida um pedaço de registros (roda em um processo do pool). Retorna os válidos
+    como (linha, registro) e os rejeitados como (linha, motivo).
+    """
+    validos, rejeitados = [], []
+    for num, registro in pedaco:
+        try:
+            if isinstance(registro, str):
+                try:
+                    registro = json.loads(registro)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"JSON inválido: {e.msg}") from None
+                if not isinstance(registro, dict):
+                    raise ValueError("JSON inválido: era esperado um objeto.")
+            if tipo == "talhoes":
+                validos.append((num, validar_talhao(registro)))
+            else:
+                validos.append((num, validar_operacao(registro, ids_talhoes)))
+        except ValueError as e:
+            rejeitados.append((num, str(e)))
+    return validos, rejeitados
+
+
+def validar_arquivo(
+    caminho: str, tipo: str, ids_talhoes: set, processos: int | None = None
+) -> tuple[list, list]:
+    """
+    Valida todos os registros de um arquivo de talhões ou operações (tipo). Arquivos
+    grandes são divididos em pedaços validados em paralelo, com no máximo dois
+    pedaços por processo em espera (o arquivo é lido conforme os pedaços terminam);
+    a ordem das linhas é mantida. Retorna os válidos e os rejeitados.
+    """
+    registros = iter(_ler_registros(caminho))
+    pedacos = iter(lambda: list(itertools.islice(registros, TAMANHO_PEDACO)), [])
+    validos, rejeitados = [], []
+
+    def juntar(futuro) -> None:
+        v, r = futuro.result()
+        validos.extend(v)
+        rejeitados.extend(r)
+
+    if processos != 1 and os.path.getsize(caminho) >= LIMIAR_PARALELO_BYTES:
+        n_processos = processos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=n_processos) as pool:
+            em_espera = deque()
+            for pedaco in pedacos:
+                em_espera.append(
+                    pool.submit(_validar_pedaco, tipo, pedaco, ids_talhoes)
+                )
+                if len(em_espera) >= 2 * n_processos:
+                    juntar(em_espera.popleft())
+            for futuro in em_espera:
+                juntar(futuro)
+    else:
+        for pedaco in pedacos:
+            v, r = _validar_pedaco(tipo, pedaco, ids_talhoes)
+            validos.extend(v)
+            rejeitados.extend(r)
+    return validos, rejeitados
+
+
+def importar_talhoes(caminho: str, processos: int | None = None) -> list:
+    """Importa talhões de um arquivo para db_mem. Retorna os rejeitados."""
+    validos, rejeitados = validar_arquivo(caminho, "talhoes", set(), processos)
+    talhoes = db_mem["talhoes"]
+    importados = 0
+    seq = db_mem["sequencias"]
+    for num, t in validos:
+        if "id_talhao" in t:
+            # ID informado no arquivo: usa se estiver livre e avança a sequência
+            if str(t["id_talhao"]) in talhoes:
+                rejeitados.append((num, "id_talhao: ID de talhão já existe."))
+                continue
+            seq["talhao"] = max(seq["talhao"], t["id_talhao"])
+        else:
+            t["id_talhao"] = proximo_id(db_mem, "talhao")
+        talhoes[str(t["id_talhao"])] = {
+            "id_talhao": t["id_talhao"],
+            "nome": t["nome"],
+            "area_ha": t["area_ha"],
+        }
+        journal_marcar(db_mem, "talhoes", t["id_talhao"])
+        importados += 1
+    print(f"Talhões: {importados} importado(s).")
+    return rejeitados
+
+
+def importar_operacoes(caminho: str, processos: int | None = None) -> list:
+    """Importa operações de um arquivo para db_mem. Retorna os rejeitados."""
+    ids_talhoes = {int(k) for k in db_mem["talhoes"]}
+    validos, rejeitados = validar_arquivo(caminho, "operacoes", ids_talhoes, processos)
+    ops = db_mem["operacoes"]
+    for _, op in validos:
+        op["id_op"] = proximo_id(db_mem, "op")
+        ops.append(op)
+        journal_marcar(db_mem, "operacoes", op["id_op"])
+    print(f"Operações: {len(validos)} importada(s).")
+    return rejeitados
+
+
+def relatar_rejeitados(caminho: str, rejeitados: list, limite: int = 10) -> None:
+    """
+    Mostra os primeiros registros rejeitados e grava a lista completa em
+    <arquivo>.rejeitados.txt.
+    """
+    if not rejeitados:
+        return
+    rejeitados.sort()
+    destino = caminho + ".rejeitados.txt"
+    with open(destino, "w", encoding="utf-8") as f:
+        for num, motivo in rejeitados:
+            f.write(f"linha {num}: {motivo}\n")
+    print(f"⚠️ {len(rejeitados)} linha(s) rejeitada(s) em {caminho}:")
+    for num, motivo in rejeitados[:limite]:
+        print(f"  linha {num}: {motivo}")
+    if len(rejeitados) > limite:
+        print(f"  ... lista completa em {destino}")
@@ -0,0 +1,447 @@
+"""
+Menu interativo: cadastro, listagens, limiares de alerta, análises e as ações de
+arquivos e de sincronização.
+"""
+
+import time
+from typing import Any, Dict, List
+
+from .subalgoritmos import (
+    erro_faixa,
+    formatar_tabela,
+    input_data,
+    input_float,
+    input_int,
+    input_nonempty,
+    input_opcional,
+    limpar_console,
+    paginar,
+    texto_para_data,
+    texto_para_float,
+)
+from .metricas import exportar_metricas, metricas
+from .estruturas import (
+    db_mem,
+    gerar_id_talhao,
+    journal_marcar,
+    MES_INICIO_SAFRA,
+    _ordinal,
+    proximo_id,
+    reclassificar_alertas,
+)
+from .validacao import AREA_MIN_HA, PERDA_MAX, PERDA_MIN, PESO_MIN_T
+from .arquivos import carregar_dados, carregar_no_db_mem, FORMATOS, salvar_dados
+from .analises import analisar_operacoes, formatar_analise
+from .relatorios import exportar_relatorio_txt
+from .backends import backend_ativo
+from .pull import puxar_oracle_para_mem
+from .sincronizacao import sincronizar_mem_para_oracle
+from .autosave import AUTOSAVE_ATIVO, autosave_ativo, iniciar_autosave
+
+
+def definir_limiares_alerta(
+    limites: List[float] | None,
+    id_talhao: int | None = None,
+    safra: int | None = None,
+) -> int:
+    """
+    Define os limiares [média, alta] padrão, de um talhão ou de uma safra (None
+    remove os específicos) e reclassifica o histórico. Retorna quantas operações
+    mudaram de nível. Lança ValueError se os limiares forem inválidos.
+    """
+    limiares = db_mem["limiares_alerta"]
+    if limites is not None:
+        media, alta = (float(v) for v in limites)
+        if not PERDA_MIN <= media <= alta <= PERDA_MAX:
+            raise ValueError(
+                f"Limiares devem estar entre {PERDA_MIN} e {PERDA_MAX}, média <= alta."
+            )
+        limites = [media, alta]
+    if id_talhao is not None:
+        escopo, chave = limiares["talhoes"], str(id_talhao)
+    elif safra is not None:
+        escopo, chave = limiares["safras"], str(safra)
+    else:
+        if limites is None:
+            raise ValueError("Os limiares padrão não podem ser removidos.")
+        escopo, chave = limiares, "padrao"
+    if limites is None:
+        escopo.pop(chave, None)
+    else:
+        escopo[chave] = limites
+    autosave = autosave_ativo()
+    if autosave is not None:  # o log guarda os limiares inteiros (os últimos valem)
+        autosave.registrar(
+            "limiares",
+            {
+                "padrao": limiares["padrao"],
+                "safras": dict(limiares["safras"]),
+                "talhoes": dict(limiares["talhoes"]),
+            },
+        )
+    return reclassificar_alertas()
+
+
+def pedir_filtros_operacoes() -> Dict[str, Any]:
+    """Pergunta os filtros opcionais de operações: talhão e período."""
+    return {
+        "id_talhao": input_opcional("Filtrar pelo ID do talhão (Enter = todos): ", int),
+        "data_ini": input_opcional(
+            "Data inicial YYYY-MM-DD (Enter = sem limite): ", texto_para_data
+        ),
+        "data_fim": input_opcional(
+            "Data final YYYY-MM-DD (Enter = sem limite): ", texto_para_data
+        ),
+    }
+
+
+# =========================
+# MENU/CRUD em memória
+# =========================
+
+
+def menu():
+    """Mostra as opções do sistema."""
+    print("\n=== GESTÃO DE COLHEITA DE CANA ===")
+    print("1) Cadastrar talhão")
+    print("2) Listar talhões")
+    print("3) Registrar operação de colheita")
+    print("4) Listar operações")
+    print("5) Exportar relatório .txt")
+    print("6) Salvar JSON")
+    print("7) Carregar JSON")
+    print("8) Oracle: sincronizar MEM -> Oracle")
+    print("9) Oracle: atualizar MEM a partir do Oracle")
+    print("10) Exportar métricas")
+    print("11) Limiares de alerta de perda")
+    print("12) Análises de perda e produtividade")
+    print("13) Editar talhão")
+    print("0) Sair")
+
+
+# nome de cada opção do menu nas métricas
+ACOES_MENU = {
+    "1": "cadastrar_talhao",
+    "2": "listar_talhoes",
+    "3": "registrar_operacao",
+    "4": "listar_operacoes",
+    "5": "exportar_relatorio",
+    "6": "salvar",
+    "7": "carregar",
+    "8": "sincronizar",
+    "9": "atualizar_do_oracle",
+    "10": "exportar_metricas",
+    "11": "limiares_alerta",
+    "12": "analises",
+    "13": "editar_talhao",
+    "0": "sair",
+}
+
+
+def cadastrar_talhao():
+    """Adiciona um talhão na memória."""
+    # inputs com validação
+    nome = input_nonempty("Nome do talhão: ")
+    area = input_float("Área (ha): ", min_val=AREA_MIN_HA)
+    # gera novo ID e adiciona novo talhão no dicionário de talhões
+    new_id = gerar_id_talhao(db_mem)
+    db_mem["talhoes"][str(new_id)] = {
+        "id_talhao": new_id,
+        "nome": nome,
+        "area_ha": area,
+    }
+    journal_marcar(db_mem, "talhoes", new_id)  # pendente de envio ao Oracle
+    autosave = autosave_ativo()
+    if autosave is not None:  # vai para o log na próxima gravação em grupo
+        autosave.registrar("talhoes", db_mem["talhoes"][str(new_id)])
+    limpar_console()
+    print(f"Talhão {new_id} criado.")
+
+
+def editar_talhao():
+    """
+    Altera o nome e a área de um talhão da memória (Enter mantém o valor atual). O
+    talhão fica pendente de atualização no banco.
+    """
+    id_talhao = input_int("ID do talhão: ", min_val=1)
+    talhao = db_mem["talhoes"].get(str(id_talhao))
+    if talhao is None:
+        limpar_console()
+        print(f"Talhão {id_talhao} não existe.")
+        return
+    print(f"Atual: {talhao['nome']} ({talhao['area_ha']} ha). Enter mantém o valor.")
+    nome = input_opcional("Novo nome: ", str)
+    while True:
+        area = input_opcional("Nova área (ha): ", texto_para_float)
+        erro = None if area is None else erro_faixa(area, AREA_MIN_HA, None)
+        if not erro:
+            break
+        print(erro)
+    if nome is not None:
+        talhao["nome"] = nome
+    if area is not None:
+        talhao["area_ha"] = area
+    # um talhão ainda não enviado continua "novo" (ver journal_marcar())
+    journal_marcar(db_mem, "talhoes", id_talhao, "alterado")
+    autosave = autosave_ativo()
+    if autosave is not None:
+        autosave.registrar("talhao_alterado", talhao)
+    limpar_console()
+    print(f"Talhão {id_talhao} alterado.")
+
+
+def listar_talhoes(pagina: int | None = None):
+    """
+    Mostra os talhões cadastrados na memória, página a página (ver paginar()). Só
+    as linhas da página mostrada são formatadas.
+    """
+    talhoes = db_mem["talhoes"]
+    if not talhoes:
+        print("Nenhum talhão cadastrado.")
+        return
+    valores = list(talhoes.values())
+
+    def montar_pagina(inicio: int, fim: int) -> List[str]:
+        # ID à direita, Nome à esquerda, Área à direita
+        return formatar_tabela(
+            ("ID", "Nome", "Área (ha)"),
+            [
+                (str(t["id_talhao"]), str(t["nome"]), f"{float(t['area_ha']):.2f}")
+                for t in valores[inicio:fim]
+            ],
+            "><>",
+        )
+
+    paginar(len(valores), montar_pagina, pagina=pagina)
+
+
+def registrar_operacao():
+    """Adiciona uma operação de colheita na memória."""
+    if not db_mem["talhoes"]:  # se não houver talhões, avisa e cancela
+        print("Cadastre talhões antes.")
+        return
+    listar_talhoes()  # mostra os talhões para o usuário escolher
+    id_t = input_int("ID do talhão a ser colhido: ", min_val=1)  # qual talhão?
+    if str(id_t) not in db_mem["talhoes"]:  # se o ID não existir, avisa e cancela
+        print("Talhão inexistente.")
+        return
+    # inputs com validação
+    data = input_data("Data (YYYY-MM-DD): ")
+    peso = input_float("Peso colhido (t): ", min_val=PESO_MIN_T)
+    perda = input_float("Perda estimada (%): ", min_val=PERDA_MIN, max_val=PERDA_MAX)
+    # cria o dicionário da operação de colheita
+    op = {
+        "id_op": proximo_id(db_mem, "op"),
+        "id_talhao": id_t,
+        "data": data,
+        "peso_t_colhido": peso,
+        "perda_percent": perda,
+    }
+    # adiciona na lista de operações, que classifica o alerta com os limiares que
+    # valem para o talhão e a safra
+    db_mem["operacoes"].append(op)
+    journal_marcar(db_mem, "operacoes", op["id_op"])  # pendente de envio ao Oracle
+    autosave = autosave_ativo()
+    if autosave is not None:  # vai para o log na próxima gravação em grupo
+        autosave.registrar("operacoes", op)
+    limpar_console()
+    alerta = db_mem["operacoes"][-1]["alerta_perda"]
+    print(f"Operação registrada. Alerta de perda: {alerta.texto}")
+
+
+def configurar_limiares_alerta():
+    """
+    Mostra os limiares de alerta e altera os padrão, os de um talhão ou os de uma
+    safra; o histórico é reclassificado em lote em seguida.
+    """
+    limiares = db_mem["limiares_alerta"]
+    limpar_console()
+    print("Limiares de alerta (média a partir de / alta a partir de, em %):")
+    print(f"  Padrão: {limiares['padrao'][0]:.2f} / {limiares['padrao'][1]:.2f}")
+    for safra, (media, alta) in sorted(limiares["safras"].items()):
+        print(f"  Safra {safra}/{int(safra) + 1}: {media:.2f} / {alta:.2f}")
+    for id_t, (media, alta) in sorted(
+        limiares["talhoes"].items(), key=lambda i: int(i[0])
+    ):
+        print(f"  Talhão {id_t}: {media:.2f} / {alta:.2f}")
+    print("\n1) Padrão  2) Talhão  3) Safra  0) Voltar")
+    escopo = input_int("Escolha: ", min_val=0, max_val=3)
+    if escopo == 0:
+        return
+    id_talhao = safra = None
+    if escopo == 2:
+        id_talhao = input_int("ID do talhão: ", min_val=1)
+        if str(id_talhao) not in db_mem["talhoes"]:
+            print("Talhão inexistente.")
+            return
+    elif escopo == 3:
+        safra = input_int(
+            f"Ano de início da safra (a safra começa no mês {MES_INICIO_SAFRA}): ",
+            min_val=1900,
+            max_val=9999,
+        )
+    vazio = "" if escopo == 1 else " (Enter remove os limiares próprios)"
+    media = input_opcional(f"Média a partir de (%){vazio}: ", texto_para_float)
+    if media is None and escopo == 1:
+        print("Os limiares padrão não podem ser removidos.")
+        return
+    limites = None
+    if media is not None:
+        alta = input_float("Alta a partir de (%): ", min_val=media, max_val=PERDA_MAX)
+        limites = [media, alta]
+    inicio = time.perf_counter()
+    try:
+        mudaram = definir_limiares_alerta(limites, id_talhao=id_talhao, safra=safra)
+    except ValueError as e:
+        print(e)
+        return
+    print(
+        f"✅ Limiares atualizados; {mudaram} operação(ões) mudaram de nível "
+        f"({len(db_mem['operacoes'])} reclassificada(s) em "
+        f"{time.perf_counter() - inicio:.2f}s)."
+    )
+
+
+def listar_operacoes(
+    id_talhao: int | None = None,
+    data_ini=None,
+    data_fim=None,
+    pagina: int | None = None,
+):
+    """
+    Mostra as operações de colheita registradas na memória, opcionalmente filtradas
+    por talhão e/ou período, página a página (ver paginar()). Os filtros devolvem só
+    posições; os valores são lidos das colunas apenas para a página mostrada.
+    """
+    # se a lista de operações estiver vazia, avisa e cancela
+    ops = db_mem["operacoes"]
+    if not ops:
+        print("Nenhuma operação registrada.")
+        return
+    posicoes = ops.consultar(id_talhao, _ordinal(data_ini), _ordinal(data_fim))
+    if not posicoes:
+        print("Nenhuma operação encontrada com esses filtros.")
+        return
+    talhao_map = db_mem.get("talhoes", {})
+
+    def montar_pagina(inicio: int, fim: int) -> List[str]:
+        linhas = []
+        for pos in posicoes[inicio:fim]:
+            id_t = ops.valor(pos, "id_talhao")
+            nome_t = talhao_map.get(str(id_t), {}).get("nome", "?")
+            linhas.append(
+                (
+                    str(ops.valor(pos, "id_op")),
+                    str(ops.valor(pos, "data")),
+                    f"{id_t} ({nome_t})",
+                    f"{ops.valor(pos, 'peso_t_colhido'):.2f}",
+                    f"{ops.valor(pos, 'perda_percent'):.2f}",
+                    ops.valor(pos, "alerta_perda").texto,
+                )
+            )
+        return formatar_tabela(
+            ("ID", "Data", "Talhão", "Peso(t)", "Perda(%)", "Alerta"), linhas, "><<>><"
+        )
+
+    paginar(len(posicoes), montar_pagina, pagina=pagina)
+
+
+def mostrar_analises(pagina: int | None = None):
+    """
+    Mostra os percentis de perda (geral e por mês), os piores talhões e a
+    produtividade por talhão e mês das operações em memória, página a página.
+    """
+    if not db_mem["operacoes"]:
+        print("Nenhuma operação registrada.")
+        return
+    texto = formatar_analise(
+        analisar_operacoes(db_mem["operacoes"]), db_mem.get("talhoes", {})
+    )
+    paginar(len(texto), lambda inicio, fim: texto[inicio:fim], pagina=pagina)
+
+
+def escolher_formato() -> int:
+    """
+    Pergunta o formato do arquivo de dados: 1 = JSON, 2 = JSON Lines,
+    3 = snapshot binário.
+    """
+    print("Formato: 1) JSON (dados.json)")
+    print("         2) JSON Lines (dados.talhoes.json + dados.operacoes.jsonl)")
+    print("         3) Snapshot binário (dados.snap)")
+    return input_int("Escolha o formato: ", min_val=1, max_val=3)
+
+
+def main():
+    """
+    Executa um loop interativo que apresenta um menu de opções para o usuário
+    realizar operações relacionadas ao cadastro e gerenciamento de talhões e
+    operações agrícolas.
+    """
+    # com AUTOSAVE=1, recupera o que ficou no log e liga o salvamento automático
+    if AUTOSAVE_ATIVO:
+        iniciar_autosave()
+
+    while True:
+        menu()  # mostra as opções
+        opcao = input_nonempty("Escolha: ")
+
+        # cada ação do menu é medida (o tempo inclui a digitação do usuário)
+        with metricas.medir(f"menu.{ACOES_MENU.get(opcao, 'invalida')}"):
+            if opcao == "1":
+                cadastrar_talhao()
+            elif opcao == "2":
+                listar_talhoes()
+            elif opcao == "3":
+                registrar_operacao()
+            elif opcao == "4":
+                listar_operacoes(**pedir_filtros_operacoes())
+            elif opcao == "5":
+                exportar_relatorio_txt(db_mem, **pedir_filtros_operacoes())
+            elif opcao == "6":
+                formato = FORMATOS[escolher_formato()]
+                mensagem = salvar_dados(formato, db_mem)
+                autosave = autosave_ativo()
+                if autosave is not None:  # tudo já está no arquivo: log recomeça
+                    autosave.reiniciar(formato)
+                limpar_console()
+                print(mensagem)
+            elif opcao == "7":
+                formato = FORMATOS[escolher_formato()]
+                db = carregar_dados(formato)
+                limpar_console()
+                if carregar_no_db_mem(db):
+                    autosave = autosave_ativo()
+                    if autosave is not None:
+                        autosave.reiniciar(formato)
+                    print("Dados carregados na memória.")
+                else:
+                    print("JSON inválido.")
+            elif opcao == "8":
+                print(f"\n=== Sincronizar MEM -> {backend_ativo().rotulo} ===")
+                if backend_ativo().configurar():  # se a conexão estiver OK
+                    # sobe os dados do dicionário em memória para o banco Oracle
+                    sincronizar_mem_para_oracle()
+            elif opcao == "9":
+                print(f"\n=== Atualizar MEM a partir do {backend_ativo().rotulo} ===")
+                if backend_ativo().configurar():
+                    # traz só o que entrou no Oracle depois da última atualização
+                    puxar_oracle_para_mem()
+            elif opcao == "10":
+                exportar_metricas()
+            elif opcao == "11":
+                configurar_limiares_alerta()
+            elif opcao == "12":
+                mostrar_analises()
+            elif opcao == "13":
+                editar_talhao()
+            elif opcao == "0":
+                backend_ativo().fechar()  # encerra as sessões abertas pelo backend
+                autosave = autosave_ativo()
+                if autosave is not None:  # grava o que ainda estiver na fila
+                    autosave.parar()
+                limpar_console()
+                print("Até mais!")
+                break
+            else:
+                limpar_console()
+                print("Opção inválida.")
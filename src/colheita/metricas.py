@@ -0,0 +1,127 @@
+"""
+Métricas do processo: cronômetros e contadores por etapa (conexões, comandos SQL,
+arquivos, relatórios e ações do menu), exportados em JSON ou no formato do
+Prometheus.
+"""
+
+import datetime
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from .subalgoritmos import _arquivo_atomico
+
+# Cronômetros e contadores por etapa: conexões, comandos SQL, arquivos, relatório e
+# ações do menu. Cada medição custa poucos microssegundos, então ficam sempre
+# ligados; o dump é feito pela opção 10 do menu ou na saída do programa, se a
+# variável METRICAS_ARQUIVO estiver definida (.prom = formato Prometheus, senão JSON).
+
+CAMPOS_METRICAS = ("chamadas", "segundos", "linhas", "bytes", "idas", "erros")
+
+
+class Metricas:
+    """
+    Acumula, por etapa: chamadas, tempo total, linhas processadas, bytes gravados ou
+    lidos, idas ao servidor (round trips) e erros.
+    """
+
+    def __init__(self):
+        self.etapas: Dict[str, list] = {}
+        self.inicio = time.time()
+
+    def _etapa(self, etapa: str) -> list:
+        valores = self.etapas.get(etapa)
+        if valores is None:
+            valores = self.etapas[etapa] = [0, 0.0, 0, 0, 0, 0]
+        return valores
+
+    def contar(self, etapa: str, linhas: int = 0, n_bytes: int = 0, idas: int = 0):
+        """Soma linhas, bytes e idas ao servidor na etapa, sem contar uma chamada."""
+        valores = self._etapa(etapa)
+        valores[2] += linhas
+        valores[3] += n_bytes
+        valores[4] += idas
+
+    @contextmanager
+    def medir(self, etapa: str, linhas: int = 0, n_bytes: int = 0, idas: int = 0):
+        """Cronometra o bloco como uma chamada da etapa; erros são contados e propagados."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self._etapa(etapa)[5] += 1
+            raise
+        finally:
+            valores = self._etapa(etapa)
+            valores[0] += 1
+            valores[1] += time.perf_counter() - inicio
+            valores[2] += linhas
+            valores[3] += n_bytes
+            valores[4] += idas
+
+    def medido(self, etapa: str):
+        """Decorador: cada chamada da função é medida como uma chamada da etapa."""
+
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                with self.medir(etapa):
+                    return funcao(*args, **kwargs)
+
+            return medida
+
+        return decorador
+
+    def para_dict(self) -> Dict[str, Dict[str, float]]:
+        """Retorna as métricas por etapa, em ordem alfabética de etapa."""
+        return {
+            etapa: dict(zip(CAMPOS_METRICAS, valores))
+            for etapa, valores in sorted(self.etapas.items())
+        }
+
+    def para_prometheus(self) -> str:
+        """Retorna as métricas no formato de texto do Prometheus (contadores)."""
+        linhas = []
+        for i, campo in enumerate(CAMPOS_METRICAS):
+            nome = f"colheita_etapa_{campo}_total"
+            linhas.append(f"# HELP {nome} Total de {campo} por etapa.")
+            linhas.append(f"# TYPE {nome} counter")
+            for etapa, valores in sorted(self.etapas.items()):
+                linhas.append(f'{nome}{{etapa="{etapa}"}} {valores[i]}')
+        return "\n".join(linhas) + "\n"
+
+    def salvar(self, caminho: str) -> None:
+        """Grava as métricas em JSON ou, se o arquivo terminar em .prom, em Prometheus."""
+        with _arquivo_atomico(caminho, "w", encoding="utf-8") as f:
+            if caminho.endswith(".prom"):
+                f.write(self.para_prometheus())
+            else:
+                json.dump(
+                    {
+                        "inicio": datetime.datetime.fromtimestamp(
+                            self.inicio
+                        ).isoformat(timespec="seconds"),
+                        "segundos_ativos": round(time.time() - self.inicio, 3),
+                        "etapas": self.para_dict(),
+                    },
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+
+
+# métricas do processo (ver Metricas)
+metricas = Metricas()
+CAMINHO_METRICAS = os.environ.get("METRICAS_ARQUIVO", "metricas.json")
+
+
+def exportar_metricas(caminho: str = CAMINHO_METRICAS) -> None:
+    """Grava as métricas acumuladas até agora (opção 10 do menu e saída)."""
+    try:
+        metricas.salvar(caminho)
+        print(f"Métricas exportadas em: {os.path.abspath(caminho)}")
+    except OSError as e:
+        print(f"Erro exportando métricas: {e}")
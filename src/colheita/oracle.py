@@ -0,0 +1,405 @@
+"""
+Conexão com o Oracle (Cap. 6): driver importado sob demanda, pool de sessões,
+credenciais, criação das tabelas e leitura em fluxo de talhões e operações.
+"""
+
+import datetime
+import os
+from contextlib import contextmanager
+from getpass import getpass
+from typing import Any, Callable, Dict, Iterable, List
+
+from .subalgoritmos import input_nonempty
+from .metricas import metricas
+from .estruturas import _ordinal
+
+
+def oracle_enabled() -> bool:
+    """
+    Verifica se as variáveis de ambiente necessárias para conexão com a Oracle estão definidas.
+    """
+    # checa se ORA_DSN, ORA_USER e ORA_PASS estão definidas em os.environ
+    # retorna True se todas existirem, senão False
+    return all(k in os.environ for k in ["ORA_DSN", "ORA_USER", "ORA_PASS"])
+
+
+# o python-oracledb só é importado quando o Oracle é usado: quem trabalha offline
+# (arquivos ou SQLite) não paga o import nem precisa do pacote instalado
+oracledb = None
+
+
+def _driver_oracle():
+    """Importa o python-oracledb na primeira vez que é preciso e o retorna."""
+    global oracledb
+    if oracledb is None:
+        import oracledb as driver
+
+        oracledb = driver
+    return oracledb
+
+
+# pool de conexões compartilhado por todo o processo: é criado uma única vez, na
+# primeira conexão, a partir das variáveis ORA_*, e fechado ao sair do menu
+_pool_oracle = None
+# tamanho mínimo e máximo do pool (ajustáveis com ORA_POOL_MIN e ORA_POOL_MAX)
+ORA_POOL_MIN = int(os.environ.get("ORA_POOL_MIN", "1"))
+ORA_POOL_MAX = int(os.environ.get("ORA_POOL_MAX", "4"))
+
+
+def oracle_pool():
+    """Retorna o pool de conexões do processo, criando-o na primeira chamada."""
+    global _pool_oracle
+    if _pool_oracle is None:
+        _pool_oracle = _driver_oracle().create_pool(
+            user=os.environ["ORA_USER"],
+            password=os.environ["ORA_PASS"],
+            dsn=os.environ["ORA_DSN"],
+            min=ORA_POOL_MIN,
+            max=max(ORA_POOL_MIN, ORA_POOL_MAX),
+            increment=1,
+            # conexões paradas há mais de 60 s são testadas antes de serem emprestadas
+            ping_interval=60,
+        )
+    return _pool_oracle
+
+
+def oracle_conn():
+    """
+    Empresta uma conexão do pool. Usada com "with", a conexão volta para o pool
+    ao final do bloco, sem novo login no Oracle.
+    """
+    with metricas.medir("oracle.conexao"):
+        return oracle_pool().acquire()
+
+
+@contextmanager
+def oracle_sessao(con=None):
+    """Usa a conexão recebida ou, se não houver, empresta uma do pool pelo bloco."""
+    if con is not None:
+        yield con
+    else:
+        with oracle_conn() as nova:
+            yield nova
+
+
+def oracle_pool_saudavel() -> bool:
+    """Verifica a saúde do pool: empresta uma conexão e faz um ping no servidor."""
+    try:
+        with oracle_conn() as con:
+            con.ping()
+        return True
+    except Exception as e:
+        print(f"[Oracle] Pool indisponível: {e}")
+        return False
+
+
+def oracle_fechar_pool() -> None:
+    """Fecha o pool de conexões (se existir), encerrando as sessões abertas."""
+    global _pool_oracle
+    if _pool_oracle is not None:
+        try:
+            _pool_oracle.close(force=True)
+        except Exception as e:
+            print(f"[Oracle] Erro fechando o pool: {e}")
+        _pool_oracle = None
+
+
+def pedir_credenciais_oracle() -> bool:
+    """
+    Pede ORA_USER / ORA_PASS / ORA_DSN no terminal,
+    testa a conexão e, se OK, guarda em os.environ (apenas nesta execução).
+    """
+    print("\n=== Configuração Oracle ===")
+    print("Informe suas credenciais.")
+
+    user = input_nonempty("Usuário: ")
+    dsn = input_nonempty("DSN: ")
+    passwd = getpass("Senha: ")
+
+    # as credenciais mudaram: o pool antigo (se houver) não serve mais
+    oracle_fechar_pool()
+
+    # coloca nas variáveis de ambiente da sessão atual
+    os.environ["ORA_USER"] = user
+    os.environ["ORA_PASS"] = passwd
+    os.environ["ORA_DSN"] = dsn
+
+    # testa conexão
+    try:
+        with oracle_conn() as con:
+            with con.cursor() as cur:
+                cur.execute("SELECT 'OK' FROM dual")
+                _ = cur.fetchone()
+        print("✅ Conexão Oracle validada com sucesso.")
+        return True
+    except Exception as e:
+        print(f"❌ Não foi possível conectar no Oracle: {e}")
+        # limpa se falhou
+        oracle_fechar_pool()
+        for k in ("ORA_USER", "ORA_PASS", "ORA_DSN"):
+            if k in os.environ:
+                del os.environ[k]
+        return False
+
+
+def oracle_config_ok() -> bool:
+    """
+    Garante que credenciais existam e funcionem.
+    Se não existirem, chama o assistente acima.
+    """
+    if oracle_enabled():
+        # o health check reaproveita o pool em vez de abrir uma nova conexão
+        if oracle_pool_saudavel():
+            return True
+        print("⚠️ Variáveis ORA_* existem, mas a conexão falhou.")
+        print("Vamos tentar configurar novamente…")
+        oracle_fechar_pool()
+        return pedir_credenciais_oracle()
+    else:
+        return pedir_credenciais_oracle()
+
+
+# DDLs para criar as tabelas talhoes e operacoes
+
+DDL_TALHOES = """
+CREATE TABLE talhoes (
+  id_talhao NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  nome VARCHAR2(100) NOT NULL,
+  area_ha NUMBER(10,2) NOT NULL
+)
+"""
+
+DDL_OPERACOES = """
+CREATE TABLE operacoes (
+  id_op NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  id_talhao NUMBER NOT NULL REFERENCES talhoes(id_talhao),
+  data_op DATE NOT NULL,
+  peso_t_colhido NUMBER(12,2) NOT NULL,
+  perda_percent NUMBER(5,2) NOT NULL
+)
+"""
+
+# tabelas temporárias globais usadas como área de preparo (staging) da sincronização
+# por MERGE: cada sessão só enxerga as próprias linhas, que somem no commit
+DDL_TALHOES_STAGE = """
+CREATE GLOBAL TEMPORARY TABLE talhoes_stage (
+  id_talhao NUMBER PRIMARY KEY,
+  nome VARCHAR2(100) NOT NULL,
+  area_ha NUMBER(10,2) NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+DDL_OPERACOES_STAGE = """
+CREATE GLOBAL TEMPORARY TABLE operacoes_stage (
+  id_op NUMBER PRIMARY KEY,
+  id_talhao NUMBER NOT NULL,
+  data_op DATE NOT NULL,
+  peso_t_colhido NUMBER(12,2) NOT NULL,
+  perda_percent NUMBER(5,2) NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+# índice para as leituras filtradas por talhão e período (evita varrer a tabela)
+DDL_IDX_OPERACOES = """
+CREATE INDEX idx_operacoes_talhao_data ON operacoes (id_talhao, data_op)
+"""
+
+# DDLs na ordem de criação
+DDLS = (
+    DDL_TALHOES,
+    DDL_OPERACOES,
+    DDL_IDX_OPERACOES,
+    DDL_TALHOES_STAGE,
+    DDL_OPERACOES_STAGE,
+)
+
+# erros de objeto já existente (nome em uso / colunas já indexadas), ignorados
+ORA_JA_EXISTE = ("ORA-00955", "ORA-01408")
+
+# Funções para criar tabelas, listar talhões e operações (CRUD de leitura)
+
+
+def oracle_criar_tabelas(con=None):
+    """Cria as tabelas talhoes e operacoes, se não existirem."""
+    try:
+        # usa a conexão recebida (ou uma do pool) e cria um cursor
+        with oracle_sessao(con) as con, con.cursor() as cur:
+            for ddl in DDLS:
+                try:
+                    with metricas.medir("oracle.ddl", idas=2):
+                        cur.execute(ddl)  # executa cada DDL
+                        con.commit()  # confirma a transação
+                # se falhar, informa o erro, mas ignora erro de tabela já existente
+                except Exception as e:
+                    if not any(codigo in str(e) for codigo in ORA_JA_EXISTE):
+                        print(f"[Oracle] Erro criando tabela: {e}")
+        print("Tabelas conferidas/criadas.")
+    # se a conexão falhar, mostra o erro
+    except Exception as e:
+        print(f"[Oracle] Erro criando tabelas: {e}")
+
+
+# linhas buscadas por ida ao servidor na leitura em fluxo (ajustáveis com
+# ORA_ARRAYSIZE e ORA_PREFETCHROWS)
+ORA_ARRAYSIZE = int(os.environ.get("ORA_ARRAYSIZE", "1000"))
+ORA_PREFETCHROWS = int(os.environ.get("ORA_PREFETCHROWS", str(ORA_ARRAYSIZE + 1)))
+
+
+def _ler_em_fluxo(
+    con, sql: str, binds: Dict[str, Any], arraysize: int, prefetchrows: int
+) -> Iterable[list]:
+    """
+    Executa a consulta e gera as linhas em lotes de arraysize, buscados sob demanda.
+    prefetchrows linhas já vêm na resposta do execute, sem outra ida ao servidor.
+    """
+    with oracle_sessao(con) as con, con.cursor() as cur:
+        cur.arraysize = arraysize
+        cur.prefetchrows = prefetchrows
+        with metricas.medir("oracle.consulta", idas=1):
+            cur.execute(sql, binds)
+        while True:
+            with metricas.medir("oracle.fetch", idas=1):
+                linhas = cur.fetchmany()
+            if not linhas:
+                break
+            metricas.contar("oracle.fetch", len(linhas))
+            yield linhas
+
+
+def oracle_ler_talhoes(
+    con=None,
+    id_talhao_min: int | None = None,
+    arraysize: int = ORA_ARRAYSIZE,
+    prefetchrows: int = ORA_PREFETCHROWS,
+    lotes: bool = False,
+) -> Iterable:
+    """
+    Gera os talhões do banco Oracle um a um (ou em listas, com lotes=True), sem
+    carregar a tabela inteira. id_talhao_min traz só os talhões com ID maior que ele.
+    Os erros de conexão ou consulta são propagados para quem consome.
+    """
+    sql = "SELECT id_talhao, nome, area_ha FROM talhoes"
+    binds = {}
+    if id_talhao_min is not None:
+        sql += " WHERE id_talhao > :id_talhao_min"
+        binds["id_talhao_min"] = id_talhao_min
+    sql += " ORDER BY id_talhao"
+    for linhas in _ler_em_fluxo(con, sql, binds, arraysize, prefetchrows):
+        talhoes = [
+            {"id_talhao": row[0], "nome": row[1], "area_ha": float(row[2])}
+            for row in linhas
+        ]
+        if lotes:
+            yield talhoes
+        else:
+            yield from talhoes
+
+
+def oracle_ler_operacoes(
+    con=None,
+    id_talhao: int | None = None,
+    data_ini=None,
+    data_fim=None,
+    id_op_min: int | None = None,
+    arraysize: int = ORA_ARRAYSIZE,
+    prefetchrows: int = ORA_PREFETCHROWS,
+    lotes: bool = False,
+) -> Iterable:
+    """
+    Gera as operações do banco Oracle uma a uma (ou em listas, com lotes=True), sem
+    carregar a tabela inteira. Os filtros vão para o WHERE: talhão, período (datas
+    inclusive, date ou texto YYYY-MM-DD) e id_op maior que id_op_min (marca d'água).
+    Os erros de conexão ou consulta são propagados para quem consome.
+    """
+    return _ler_operacoes(
+        con,
+        datetime.datetime.date,  # DATE chega como datetime
+        lambda dia: dia,  # datas vão como DATE
+        id_talhao,
+        data_ini,
+        data_fim,
+        id_op_min,
+        arraysize,
+        prefetchrows,
+        lotes,
+    )
+
+
+def _ler_operacoes(
+    con,
+    data_do_banco: Callable[[Any], datetime.date],
+    valor_data: Callable[[datetime.date], Any],
+    id_talhao: int | None,
+    data_ini,
+    data_fim,
+    id_op_min: int | None,
+    arraysize: int,
+    prefetchrows: int,
+    lotes: bool,
+) -> Iterable:
+    """
+    Leitura em fluxo das operações, comum aos backends: data_do_banco converte a
+    data_op lida do banco em date e valor_data converte as datas dos filtros para o
+    tipo do banco.
+    """
+    filtros, binds = [], {}
+    if id_talhao is not None:
+        filtros.append("id_talhao = :id_talhao")
+        binds["id_talhao"] = id_talhao
+    if data_ini is not None:
+        filtros.append("data_op >= :data_ini")
+        binds["data_ini"] = valor_data(datetime.date.fromordinal(_ordinal(data_ini)))
+    if data_fim is not None:
+        # menor que o dia seguinte: inclui o dia final inteiro
+        filtros.append("data_op < :data_fim")
+        binds["data_fim"] = valor_data(
+            datetime.date.fromordinal(_ordinal(data_fim) + 1)
+        )
+    if id_op_min is not None:
+        filtros.append("id_op > :id_op_min")
+        binds["id_op_min"] = id_op_min
+    sql = (
+        "SELECT id_op, id_talhao, data_op, peso_t_colhido, perda_percent "
+        "FROM operacoes"
+    )
+    if filtros:
+        sql += " WHERE " + " AND ".join(filtros)
+    sql += " ORDER BY id_op"
+    for linhas in _ler_em_fluxo(con, sql, binds, arraysize, prefetchrows):
+        ops = [
+            {
+                "id_op": row[0],
+                "id_talhao": row[1],
+                "data": data_do_banco(row[2]),
+                "peso_t_colhido": float(row[3]),
+                "perda_percent": float(row[4]),
+            }
+            for row in linhas
+        ]
+        if lotes:
+            yield ops
+        else:
+            yield from ops
+
+
+def oracle_listar_talhoes(con=None) -> List[Dict[str, Any]]:
+    """Retorna uma lista de talhões do banco Oracle."""
+    try:
+        return list(oracle_ler_talhoes(con))
+    # se a conexão ou consulta falhar, mostra o erro e retorna lista vazia
+    except Exception as e:
+        print(f"[Oracle] Erro listando talhões: {e}")
+        return []
+
+
+def oracle_listar_operacoes(con=None, **filtros) -> List[Dict[str, Any]]:
+    """
+    Retorna uma lista de operações de colheita do banco Oracle, com os mesmos
+    filtros de oracle_ler_operacoes().
+    """
+    try:
+        return list(oracle_ler_operacoes(con, **filtros))
+    # se a conexão ou consulta falhar, mostra o erro e retorna lista vazia
+    except Exception as e:
+        print(f"[Oracle] Erro listando operações: {e}")
+        return []
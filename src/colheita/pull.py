@@ -0,0 +1,178 @@
+"""
+Atualização da memória a partir do banco (pull): traz só o que entrou depois da
+última atualização e resolve as colisões de IDs com as operações locais.
+"""
+
+import datetime
+from typing import Any, Dict, List
+
+from .metricas import metricas
+from .estruturas import db_mem, OperacoesColunares, proximo_id
+from .oracle import pedir_credenciais_oracle
+from .backends import backend_ativo
+
+# Com vários notebooks gravando no mesmo schema, a memória é atualizada só com o que
+# entrou no Oracle depois da última atualização: a marca d'água db["marca_pull"]
+# guarda os maiores id_talhao e id_op já lidos e é salva junto com os dados.
+
+
+def _chave_pull(id_talhao: int, peso: float, perda: float) -> tuple:
+    """
+    Chave de comparação de uma operação dentro de um dia. Peso e perda são
+    arredondados como nas colunas NUMBER(12,2) e NUMBER(5,2) do Oracle.
+    """
+    return (id_talhao, round(peso, 2), round(perda, 2))
+
+
+def _mesmo_conteudo(ops: OperacoesColunares, pos: int, op: Dict[str, Any]) -> bool:
+    """Diz se a operação da posição pos tem o conteúdo da operação op lida do banco."""
+    return ops.valor(pos, "data") == op["data"] and _chave_pull(
+        ops.valor(pos, "id_talhao"),
+        ops.valor(pos, "peso_t_colhido"),
+        ops.valor(pos, "perda_percent"),
+    ) == _chave_pull(op["id_talhao"], op["peso_t_colhido"], op["perda_percent"])
+
+
+def _renumerar_operacao(db: Dict[str, Any], pos: int) -> int:
+    """
+    Dá um ID novo (da sequência) à operação pendente da posição pos, cujo ID outro
+    cliente já usou no banco; a operação continua pendente com o ID novo.
+    """
+    ops = db["operacoes"]
+    antigo = ops.colunas["id_op"][pos]
+    novo = proximo_id(db, "op")
+    ops.renumerar(pos, novo)
+    pend_op = db["journal"]["operacoes"]
+    pend_op[str(novo)] = pend_op.pop(str(antigo), "novo")
+    print(
+        f"⚠️ O ID {antigo} já existe no banco com outra operação; "
+        f"a operação local passa a ser a {novo}."
+    )
+    return novo
+
+
+def _puxar_talhoes(con, marca: Dict[str, Any], conflitos: List[str]) -> set:
+    """
+    Traz os talhões novos do Oracle. Um ID que já existe na memória com outro nome ou
+    área é um conflito: a versão da memória é mantida. Retorna os IDs em conflito.
+    """
+    talhoes = db_mem["talhoes"]
+    seq = db_mem["sequencias"]
+    em_conflito = set()
+    novos = 0
+    for t in backend_ativo().ler_talhoes(con, id_talhao_min=marca["talhao"]):
+        marca["talhao"] = max(marca["talhao"], t["id_talhao"])
+        local = talhoes.get(str(t["id_talhao"]))
+        if local is None:
+            talhoes[str(t["id_talhao"])] = t
+            # o ID veio de outro notebook: a sequência local passa a continuar dele
+            seq["talhao"] = max(seq["talhao"], t["id_talhao"])
+            novos += 1
+        elif (local["nome"], round(local["area_ha"], 2)) != (
+            t["nome"],
+            round(t["area_ha"], 2),
+        ):
+            em_conflito.add(t["id_talhao"])
+            conflitos.append(
+                f"Talhão {t['id_talhao']}: memória '{local['nome']}' "
+                f"({local['area_ha']} ha) x Oracle '{t['nome']}' ({t['area_ha']} ha)"
+            )
+    print(f"✅ {novos} talhão(ões) novo(s) do {backend_ativo().rotulo}.")
+    return em_conflito
+
+
+def _puxar_operacoes(
+    con, marca: Dict[str, Any], talhoes_em_conflito: set, conflitos: List[str]
+) -> None:
+    """
+    Traz as operações novas do banco com o id_op do banco, que é a identidade da
+    operação em todos os clientes. As que já estão na memória com o mesmo ID e
+    conteúdo (enviadas por este notebook) são ignoradas e saem do diário. Uma
+    operação local ainda não enviada cujo ID outro notebook já usou recebe um ID
+    novo, depois dos IDs do banco, e continua pendente; com uma já enviada, é um
+    conflito. As de talhão em conflito ou inexistente na memória também são
+    conflitos. As trazidas não entram no diário de mudanças (já estão no banco).
+    """
+    remotas = list(backend_ativo().ler_operacoes(con, id_op_min=marca["op"]))
+    if not remotas:
+        print(f"Nenhuma operação nova no {backend_ativo().rotulo}.")
+        return
+    ops = db_mem["operacoes"]
+    talhoes = db_mem["talhoes"]
+    pend_op = db_mem["journal"]["operacoes"]
+    # posições das operações da memória com os IDs das remotas, achadas pelo índice
+    # antes de qualquer mudança (as trazidas só vão para o fim)
+    posicoes = {
+        ops.colunas["id_op"][pos]: pos
+        for pos in ops.posicoes_ids(op["id_op"] for op in remotas)
+    }
+    # os IDs locais novos (das renumeradas e dos próximos cadastros) continuam
+    # depois de todos os IDs do banco
+    seq = db_mem["sequencias"]
+    seq["op"] = max(seq["op"], max(op["id_op"] for op in remotas))
+    novas = ja_na_memoria = 0
+    for op in remotas:
+        marca["op"] = max(marca["op"], op["id_op"])
+        pos = posicoes.get(op["id_op"])
+        if pos is not None:
+            if _mesmo_conteudo(ops, pos, op):
+                pend_op.pop(str(op["id_op"]), None)  # já está no banco
+                ja_na_memoria += 1
+                continue
+            if str(op["id_op"]) not in pend_op:
+                conflitos.append(
+                    f"Operação {op['id_op']}: a da memória e a do "
+                    f"{backend_ativo().rotulo} têm conteúdos diferentes"
+                )
+                continue
+            _renumerar_operacao(db_mem, pos)
+        id_t = op["id_talhao"]
+        if id_t in talhoes_em_conflito or str(id_t) not in talhoes:
+            motivo = "em conflito" if id_t in talhoes_em_conflito else "inexistente"
+            conflitos.append(
+                f"Operação {op['id_op']} do Oracle: talhão {id_t} {motivo} na memória"
+            )
+            continue
+        ops.append(op)  # o alerta é classificado com os limiares locais
+        novas += 1
+    print(
+        f"✅ {novas} operação(ões) nova(s) do {backend_ativo().rotulo}, "
+        f"{ja_na_memoria} já estava(m) na memória."
+    )
+
+
+@metricas.medido("pull")
+def puxar_oracle_para_mem() -> bool:
+    """
+    Atualiza a memória com os talhões e operações que entraram no Oracle depois da
+    última atualização (marca d'água em db["marca_pull"]), lendo só as linhas novas.
+    Conflitos são listados e a versão da memória é mantida. Retorna False se a
+    atualização não puder ser feita.
+    """
+    backend = backend_ativo()
+    if not backend.configurado():
+        print("Defina ORA_DSN / ORA_USER / ORA_PASS nas variáveis de ambiente.")
+        pedir_credenciais_oracle()
+        return False
+    marca = db_mem.setdefault("marca_pull", {"talhao": 0, "op": 0, "ultimo_pull": None})
+    # trabalha numa cópia: se a leitura falhar no meio, a marca d'água não avança
+    nova_marca = dict(marca)
+    conflitos: List[str] = []
+    try:
+        with backend.conexao() as con:
+            print(f"\nAtualizando talhões a partir do {backend.rotulo}...")
+            em_conflito = _puxar_talhoes(con, nova_marca, conflitos)
+            print(f"\nAtualizando operações a partir do {backend.rotulo}...")
+            _puxar_operacoes(con, nova_marca, em_conflito, conflitos)
+    except Exception as e:
+        print(f"[{backend.rotulo}] Erro na atualização: {e}")
+        return False
+    for conflito in conflitos:
+        print(f"⚠️ Conflito: {conflito}")
+    nova_marca["ultimo_pull"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    marca.update(nova_marca)
+    print(
+        f"\nAtualização concluída ({len(conflitos)} conflito(s)). "
+        f"Marca d'água: talhão {marca['talhao']}, operação {marca['op']}."
+    )
+    return True
@@ -0,0 +1,429 @@
+"""
+Relatórios em texto: o relatorio.txt (com filtros e as análises) e os relatórios
+por talhão, escritos em paralelo, com o índice.
+"""
+
+import datetime
+import itertools
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+
+from .subalgoritmos import formatar_tabela, limpar_console
+from .metricas import metricas
+from .estruturas import consultar_operacoes, OperacoesColunares
+from .arquivos import TAMANHO_PEDACO
+from .analises import (
+    analisar_operacoes,
+    AnaliseColheita,
+    _colunas_analise,
+    formatar_analise,
+    QUANTIS_ANALISE,
+)
+
+# tamanho do buffer de escrita do relatório (1 MiB): poucas chamadas de sistema
+# mesmo com milhões de linhas
+TAMANHO_BUFFER_RELATORIO = 1 << 20
+
+
+@metricas.medido("relatorio.txt")
+def exportar_relatorio_txt(
+    db: Dict[str, Any],
+    caminho: str = "relatorio.txt",
+    id_talhao: int | None = None,
+    data_ini=None,
+    data_fim=None,
+) -> None:
+    """
+    Produz um relatório em um arquivo .txt com tabela alinhada, opcionalmente
+    filtrado por talhão e/ou período.
+    """
+    ops = db["operacoes"]
+    talhoes = db.get("talhoes", {})
+    resumo = None
+    if id_talhao is not None or data_ini is not None or data_fim is not None:
+        # filtrado: só as operações selecionadas pelos índices entram no relatório
+        ops = consultar_operacoes(db, id_talhao, data_ini, data_fim)
+    elif isinstance(ops, OperacoesColunares):
+        # com o armazenamento em colunas, totais e larguras vêm dos agregados (sem
+        # pré-varredura) e as análises, dos índices; uma lista simples é percorrida
+        # quantas vezes for preciso
+        resumo = _resumo_colunar(ops, talhoes)
+        resumo["analise"] = analisar_operacoes(ops)
+    exportar_relatorio_txt_stream(lambda: ops, talhoes, caminho, resumo)
+    metricas.contar("relatorio.txt", len(ops), n_bytes=os.path.getsize(caminho))
+
+
+def _prevarrer_operacoes(
+    fonte_ops: Callable[[], Iterable[Dict[str, Any]]], talhoes: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Pré-varredura do relatório: totais, larguras das colunas e análises em uma
+    única passada.
+    """
+    total_ops = 0
+    total_peso = 0.0
+    soma_perda = 0.0
+    # guarda o menor e o maior valor: a maior largura formatada é de um dos extremos,
+    # então cada float não precisa ser formatado aqui
+    min_peso = max_peso = min_perda = max_perda = 0.0
+    w_data = len("Data")
+    # nome de cada id_talhao visto, procurado uma vez por talhão
+    talhoes_vistos = {}
+    # as análises recebem as operações em lotes de TAMANHO_PEDACO
+    analise = AnaliseColheita()
+    lote = []
+    for op in fonte_ops():
+        lote.append(op)
+        if len(lote) == TAMANHO_PEDACO:
+            analise.adicionar(*_colunas_analise(lote))
+            lote.clear()
+        peso = float(op.get("peso_t_colhido", 0.0))
+        perda = float(op.get("perda_percent", 0.0))
+        if total_ops == 0:
+            min_peso = max_peso = peso
+            min_perda = max_perda = perda
+        total_ops += 1
+        total_peso += peso
+        soma_perda += perda
+        if peso < min_peso:
+            min_peso = peso
+        elif peso > max_peso:
+            max_peso = peso
+        if perda < min_perda:
+            min_perda = perda
+        elif perda > max_perda:
+            max_perda = perda
+        w_data = max(w_data, len(str(op.get("data", ""))))
+        id_t = op.get("id_talhao")
+        if id_t not in talhoes_vistos:
+            # Obtém o nome do talhão a partir do id_talhao, ou "?" se não encontrar
+            talhoes_vistos[id_t] = talhoes.get(str(id_t), {}).get("nome", "?")
+    analise.adicionar(*_colunas_analise(lote))
+    return {
+        "total_ops": total_ops,
+        "total_peso": total_peso,
+        "media_perda": soma_perda / total_ops if total_ops else 0.0,
+        "min_peso": min_peso,
+        "max_peso": max_peso,
+        "min_perda": min_perda,
+        "max_perda": max_perda,
+        "w_data": w_data,
+        "talhoes_vistos": talhoes_vistos,
+        "analise": analise,
+    }
+
+
+def _resumo_colunar(ops: OperacoesColunares, talhoes: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Totais e larguras de _prevarrer_operacoes(), lidos dos agregados do
+    armazenamento em colunas: custa O(talhões + dias), não O(operações). As
+    análises não entram (analisar_operacoes() lê as colunas).
+    """
+    geral = ops.resumo()
+    w_data = len("Data")
+    # datas guardadas como ordinal têm sempre 10 caracteres (YYYY-MM-DD); as
+    # datas em texto livre ficam no dia 0
+    if any(dia != 0 for dia in ops.agregados.por_dia):
+        w_data = max(w_data, 10)
+    if ops.datas_livres:
+        w_data = max(w_data, max(len(t) for t in ops.datas_livres.values()))
+    return {
+        "total_ops": geral.n,
+        "total_peso": geral.total_peso,
+        "media_perda": geral.media_perda,
+        "min_peso": geral.min_peso,
+        "max_peso": geral.max_peso,
+        "min_perda": geral.min_perda,
+        "max_perda": geral.max_perda,
+        "w_data": w_data,
+        "talhoes_vistos": {
+            id_t: talhoes.get(str(id_t), {}).get("nome", "?")
+            for id_t in ops.agregados.por_talhao
+        },
+    }
+
+
+def exportar_relatorio_txt_stream(
+    fonte_ops: Callable[[], Iterable[Dict[str, Any]]],
+    talhoes: Dict[str, Any],
+    caminho: str = "relatorio.txt",
+    resumo: Dict[str, Any] | None = None,
+    titulo: str = "RELATÓRIO DE COLHEITA DE CANA",
+    avisar: bool = True,
+) -> Dict[str, Any]:
+    """
+    Produz o relatório .txt em modo streaming. fonte_ops é uma função que devolve um
+    iterador novo de operações a cada chamada (ex.: leitura linha a linha de um
+    arquivo); ela é percorrida duas vezes: uma pré-varredura para totais e larguras
+    (dispensada se o resumo já vier pronto) e a escrita da tabela. Nenhuma lista de
+    linhas é montada, então a memória usada não depende do tamanho do histórico.
+    Retorna o resumo usado; com avisar=False, não mexe na tela.
+    """
+    if resumo is None:
+        resumo = _prevarrer_operacoes(fonte_ops, talhoes)
+    total_ops = resumo["total_ops"]
+    talhoes_vistos = resumo["talhoes_vistos"]
+    # produtividade média: toneladas por hectare dos talhões com operações
+    area_total = sum(
+        float(talhoes.get(str(id_t), {}).get("area_ha", 0.0)) for id_t in talhoes_vistos
+    )
+
+    # escreve o relatório no arquivo, por um buffer grande
+    with open(caminho, "w", encoding="utf-8", buffering=TAMANHO_BUFFER_RELATORIO) as f:
+        f.write("=" * 70 + "\n")
+        f.write(titulo + "\n")
+        f.write("=" * 70 + "\n")
+        f.write(
+            f"Data de geração: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        )
+        f.write("RESUMO GERAL\n")
+        f.write("-" * 70 + "\n")
+        f.write(f"Total de operações: {total_ops}\n")
+        f.write(f"Peso total colhido (t): {resumo['total_peso']:.2f}\n")
+        f.write(f"Média de perda estimada (%): {resumo['media_perda']:.2f}\n")
+        if area_total > 0:
+            f.write(
+                f"Produtividade média (t/ha): {resumo['total_peso'] / area_total:.2f}\n"
+            )
+        f.write("\n")
+        if total_ops and "analise" in resumo:
+            f.write("\n".join(formatar_analise(resumo["analise"], talhoes)) + "\n\n")
+
+        if total_ops:
+            # Larguras das colunas a partir do resumo
+            w_id = max(len("ID"), max(len(str(i)) for i in talhoes_vistos))
+            w_nome = max(len("Talhão"), max(len(n) for n in talhoes_vistos.values()))
+            w_data = resumo["w_data"]
+            w_peso = max(
+                len("Peso(t)"),
+                len(f"{resumo['min_peso']:.2f}"),
+                len(f"{resumo['max_peso']:.2f}"),
+            )
+            w_perda = max(
+                len("Perda(%)"),
+                len(f"{resumo['min_perda']:.2f}"),
+                len(f"{resumo['max_perda']:.2f}"),
+            )
+
+            f.write("OPERAÇÕES DE COLHEITA\n")
+            f.write("-" * 70 + "\n")
+
+            # Cabeçalho da tabela
+            header = f"{{:<{w_data}}} | {{:>{w_id}}} | {{:<{w_nome}}} | {{:>{w_peso}}} | {{:>{w_perda}}}"
+            f.write(header.format("Data", "ID", "Talhão", "Peso(t)", "Perda(%)") + "\n")
+            total_width = w_data + w_id + w_nome + w_peso + w_perda + 12
+            f.write("-" * total_width + "\n")
+
+            # Linhas de dados, escritas direto a partir de cada operação
+            row_fmt = f"{{:<{w_data}}} | {{:>{w_id}}} | {{:<{w_nome}}} | {{:>{w_peso}.2f}} | {{:>{w_perda}.2f}}\n"
+            for op in fonte_ops():
+                id_t = op.get("id_talhao")
+                f.write(
+                    row_fmt.format(
+                        str(op.get("data", "")),
+                        str(id_t),
+                        talhoes_vistos.get(id_t, "?"),
+                        float(op.get("peso_t_colhido", 0.0)),
+                        float(op.get("perda_percent", 0.0)),
+                    )
+                )
+        else:
+            f.write("Nenhuma operação registrada.\n")
+
+        f.write("\n" + "=" * 70 + "\n")
+
+    if avisar:
+        limpar_console()
+        print(f"Relatório exportado em: {os.path.abspath(caminho)}")
+    return resumo
+
+
+# =========================
+# RELATÓRIOS POR TALHÃO (em paralelo)
+# =========================
+# Um relatório por talhão, com o mesmo layout do relatorio.txt, e um índice com o
+# resumo de todos. As operações são divididas por id_talhao pelo índice do
+# armazenamento em colunas, cada talhão é escrito por um processo do pool e o
+# índice é montado só com os totais devolvidos por cada talhão.
+
+DIRETORIO_RELATORIOS = os.environ.get("RELATORIOS_DIR", "relatorios")
+
+
+def _particao_relatorio(ops: OperacoesColunares, id_talhao: int) -> tuple:
+    """
+    Colunas das operações de um talhão (datas em ordinal, pesos e perdas), copiadas
+    em C a partir das posições do índice, e as datas em texto livre por posição.
+    """
+    posicoes = ops.posicoes_talhao(id_talhao)
+    c = ops.colunas
+    datas_livres = {}
+    if ops.datas_livres:
+        datas_livres = {
+            i: ops.datas_livres[pos]
+            for i, pos in enumerate(posicoes)
+            if pos in ops.datas_livres
+        }
+    return (
+        array("i", map(c["data"].__getitem__, posicoes)),
+        array("d", map(c["peso_t_colhido"].__getitem__, posicoes)),
+        array("d", map(c["perda_percent"].__getitem__, posicoes)),
+        datas_livres,
+    )
+
+
+def _relatorio_talhao(
+    caminho: str, id_talhao: int, talhao: Dict[str, Any], particao: tuple
+) -> Dict[str, Any]:
+    """
+    Escreve o relatório de um talhão (roda em um processo do pool) e retorna os
+    totais e a análise do talhão, usados no índice.
+    """
+    dias, pesos, perdas, datas_livres = particao
+    textos: Dict[int, str] = {}  # data em texto, formatada uma vez por dia
+
+    def fonte_ops() -> Iterable[Dict[str, Any]]:
+        for i, (dia, peso, perda) in enumerate(zip(dias, pesos, perdas)):
+            texto = textos.get(dia)
+            if texto is None:
+                texto = textos[dia] = (
+                    datetime.date.fromordinal(dia).isoformat() if dia else ""
+                )
+            yield {
+                "id_talhao": id_talhao,
+                "data": datas_livres.get(i, texto),
+                "peso_t_colhido": peso,
+                "perda_percent": perda,
+            }
+
+    resumo = exportar_relatorio_txt_stream(
+        fonte_ops,
+        {str(id_talhao): talhao},
+        caminho,
+        titulo=f"RELATÓRIO DE COLHEITA DE CANA - TALHÃO {id_talhao} ({talhao['nome']})",
+        avisar=False,
+    )
+    return {
+        "id_talhao": id_talhao,
+        "arquivo": os.path.basename(caminho),
+        "total_ops": resumo["total_ops"],
+        "total_peso": resumo["total_peso"],
+        "media_perda": resumo["media_perda"],
+        "analise": resumo["analise"],
+    }
+
+
+def _escrever_indice(
+    caminho: str, totais: List[Dict[str, Any]], talhoes: Dict[str, Any]
+) -> None:
+    """
+    Escreve o índice dos relatórios por talhão: o resumo consolidado, calculado só
+    com os totais de cada talhão (as análises são mescladas), e uma linha por talhão.
+    """
+    analise = AnaliseColheita()
+    for total in totais:
+        analise.mesclar(total["analise"])
+    total_ops = sum(t["total_ops"] for t in totais)
+    total_peso = sum(t["total_peso"] for t in totais)
+    area_total = sum(float(talhoes[str(t["id_talhao"])]["area_ha"]) for t in totais)
+    linhas = []
+    for t in totais:
+        area = float(talhoes[str(t["id_talhao"])]["area_ha"])
+        linhas.append(
+            (
+                str(t["id_talhao"]),
+                talhoes[str(t["id_talhao"])]["nome"],
+                str(t["total_ops"]),
+                f"{t['total_peso']:.2f}",
+                f"{t['media_perda']:.2f}",
+                f"{t['analise'].geral.quantil(0.9):.2f}",
+                f"{t['total_peso'] / area:.2f}" if area > 0 else "-",
+                t["arquivo"],
+            )
+        )
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("=" * 70 + "\n")
+        f.write("ÍNDICE DOS RELATÓRIOS POR TALHÃO\n")
+        f.write("=" * 70 + "\n")
+        f.write(
+            f"Data de geração: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        )
+        f.write("RESUMO GERAL\n")
+        f.write("-" * 70 + "\n")
+        f.write(f"Talhões com operações: {len(totais)}\n")
+        f.write(f"Total de operações: {total_ops}\n")
+        f.write(f"Peso total colhido (t): {total_peso:.2f}\n")
+        f.write(f"Média de perda estimada (%): {analise.geral.media:.2f}\n")
+        if area_total > 0:
+            f.write(f"Produtividade média (t/ha): {total_peso / area_total:.2f}\n")
+        percentis = ", ".join(
+            f"p{round(q * 100)} {analise.geral.quantil(q):.2f}" for q in QUANTIS_ANALISE
+        )
+        f.write(f"Perda (%): {percentis}\n\n")
+        if linhas:
+            f.write("RELATÓRIOS\n")
+            f.write("-" * 70 + "\n")
+            cabecalho = (
+                "ID",
+                "Talhão",
+                "Operações",
+                "Peso(t)",
+                "Perda média(%)",
+                "p90",
+                "t/ha",
+                "Arquivo",
+            )
+            tabela = formatar_tabela(cabecalho, linhas, "><>>>>><")
+            f.write("\n".join(linha.rstrip() for linha in tabela) + "\n")
+        f.write("\n" + "=" * 70 + "\n")
+
+
+@metricas.medido("relatorio.talhoes")
+def exportar_relatorios_por_talhao(
+    db: Dict[str, Any],
+    diretorio: str = DIRETORIO_RELATORIOS,
+    processos: int | None = None,
+) -> str:
+    """
+    Escreve um relatório por talhão (talhao_<id>.txt) e o índice (indice.txt) no
+    diretório. Os talhões são escritos em paralelo por um pool de processos, os
+    maiores primeiro, para equilibrar a carga, com no máximo duas partições por
+    processo em espera (cada partição é montada só quando entra na janela).
+    Retorna o caminho do índice.
+    """
+    ops = db["operacoes"]
+    if not isinstance(ops, OperacoesColunares):
+        ops = OperacoesColunares.de_dicts(ops)
+    # talhões que só existem nas operações entram com nome "?" e sem área
+    talhoes = {
+        str(id_t): db.get("talhoes", {}).get(str(id_t), {"nome": "?", "area_ha": 0.0})
+        for id_t in ops.agregados.por_talhao
+    }
+    ids = sorted(ops.agregados.por_talhao, key=lambda i: -ops.agregados.por_talhao[i].n)
+    os.makedirs(diretorio, exist_ok=True)
+    caminhos = [os.path.join(diretorio, f"talhao_{id_t}.txt") for id_t in ids]
+    argumentos = zip(
+        caminhos,
+        ids,
+        [talhoes[str(id_t)] for id_t in ids],
+        (_particao_relatorio(ops, id_t) for id_t in ids),
+    )
+    totais = []
+    if processos != 1 and len(ids) > 1:
+        n_processos = processos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=n_processos) as pool:
+            em_espera = deque()
+            for args in argumentos:
+                em_espera.append(pool.submit(_relatorio_talhao, *args))
+                if len(em_espera) >= 2 * n_processos:
+                    totais.append(em_espera.popleft().result())
+            totais.extend(futuro.result() for futuro in em_espera)
+    else:
+        totais.extend(itertools.starmap(_relatorio_talhao, argumentos))
+    totais.sort(key=lambda t: t["id_talhao"])
+    indice = os.path.join(diretorio, "indice.txt")
+    _escrever_indice(indice, totais, talhoes)
+    metricas.contar("relatorio.talhoes", len(ops))
+    return indice
@@ -0,0 +1,1214 @@
+"""
+Sincronização da memória para o banco: modos delta, completa, merge, assíncrono
+e paralelo por talhão, com checkpoint de retomada e novas tentativas diante de
+erros transitórios.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import itertools
+import json
+import operator
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+
+from .subalgoritmos import _arquivo_atomico
+from .metricas import metricas
+from .estruturas import db_mem, OperacaoView, OperacoesColunares
+from .oracle import _driver_oracle, ORA_POOL_MAX, pedir_credenciais_oracle
+from .backends import (
+    Backend,
+    backend_ativo,
+    _erro_transitorio,
+    inserir_em_lotes,
+    ORA_CHAVE_DUPLICADA,
+    _relatar_lotes,
+    SQL_ATUALIZAR_TALHAO,
+    SQL_INSERIR_OPERACAO,
+    SQL_INSERIR_TALHAO,
+    TAMANHO_LOTE,
+    _valores_atualizacao,
+)
+from .pull import _mesmo_conteudo, _renumerar_operacao
+
+# tentativas da sincronização diante de erros transitórios e espera antes da segunda,
+# em segundos, que dobra a cada nova tentativa (ajustáveis com ORA_TENTATIVAS e
+# ORA_ESPERA)
+TENTATIVAS_SYNC = int(os.environ.get("ORA_TENTATIVAS", "3"))
+ESPERA_SYNC = float(os.environ.get("ORA_ESPERA", "1.0"))
+
+# arquivo do checkpoint da sincronização (ajustável com ORA_CHECKPOINT)
+CAMINHO_CHECKPOINT = os.environ.get("ORA_CHECKPOINT", "sync_checkpoint.json")
+
+
+def _espera_retentativa(tentativa: int) -> float:
+    """Espera, em segundos, antes da tentativa seguinte a tentativa (backoff exponencial)."""
+    return ESPERA_SYNC * 2 ** (tentativa - 1)
+
+
+class CheckpointSync:
+    """
+    Ponto de retomada da sincronização, regravado no disco (escrita atômica) a cada
+    lote confirmado. Guarda o ID da execução, os talhões novos já gravados, a maior
+    operação confirmada (as operações são enviadas em ordem de id_op) e, no modo
+    paralelo, a maior operação de cada partição (talhão) confirmada, além das
+    operações que falharam ou ficaram de fora antes dessas marcas. Se a
+    sincronização for interrompida, a próxima aplica o checkpoint ao diário e envia
+    só o que faltou, sem repetir as operações já gravadas. O checkpoint guarda
+    também uma impressão dos registros pendentes no início (impressao_pendentes()):
+    se os dados mudaram (outro arquivo, outra sessão), ele é ignorado.
+    """
+
+    def __init__(self, caminho: str, estado: Dict[str, Any]):
+        self.caminho = caminho
+        self.estado = estado
+        self._trava = threading.Lock()  # as partições confirmam de várias threads
+        # se a sincronização completa desta execução já transformou a comparação
+        # em diário (as próximas tentativas seguem pelo delta)
+        self.comparado = False
+
+    @staticmethod
+    def impressao_pendentes(
+        db: Dict[str, Any],
+        ate_talhao: int | None = None,
+        ate_op: int | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Impressão dos registros pendentes do diário de db com ID até
+        ate_talhao/ate_op (todos, se None): os maiores IDs e um hash do estado e do
+        conteúdo de cada um, junto com a marca d'água da última sincronização. Os
+        registros criados depois (IDs maiores) não mudam a impressão. Só os
+        pendentes são lidos, pelo índice de IDs do armazenamento.
+        """
+        journal = db["journal"]
+        pend_t, pend_op = journal["talhoes"], journal["operacoes"]
+        if ate_talhao is None:
+            ate_talhao = max(map(int, pend_t), default=0)
+        if ate_op is None:
+            ate_op = max(map(int, pend_op), default=0)
+        h = hashlib.sha1(str(journal["ultima_sync"]).encode())
+        for id_t in sorted(map(int, pend_t)):
+            if id_t <= ate_talhao:
+                t = db["talhoes"].get(str(id_t), {})
+                h.update(
+                    repr(
+                        (id_t, pend_t[str(id_t)], t.get("nome"), t.get("area_ha"))
+                    ).encode()
+                )
+        ops = db["operacoes"]
+        ids = sorted(i for i in map(int, pend_op) if i <= ate_op)
+        for pos in ops.posicoes_ids(ids):
+            h.update(repr(tuple(ops.para_registro(pos).values())).encode())
+        return {"talhao": ate_talhao, "op": ate_op, "hash": h.hexdigest()}
+
+    @classmethod
+    def abrir(cls, caminho: str, backend: str, db: Dict[str, Any]) -> "CheckpointSync":
+        """
+        Retoma o checkpoint deixado por uma sincronização interrompida no mesmo
+        backend e com os mesmos registros pendentes ou começa um novo, com um novo
+        ID de execução.
+        """
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                estado = json.load(f)
+            impressao = estado.get("pendentes") or {}
+            if estado.get("backend") != backend:
+                print(f"⚠️ Checkpoint do backend {estado.get('backend')} ignorado.")
+            elif impressao != cls.impressao_pendentes(
+                db, impressao.get("talhao", 0), impressao.get("op", 0)
+            ):
+                print("⚠️ Checkpoint de outros dados ignorado.")
+            else:
+                return cls(caminho, estado)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Checkpoint ilegível ignorado: {e}")
+        return cls(
+            caminho,
+            {
+                "id_execucao": uuid.uuid4().hex[:12],
+                "backend": backend,
+                "inicio": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "lotes": 0,
+                "talhoes": [],
+                "ultima_op": 0,
+                "particoes": {},
+                "falhas_op": [],
+                "pendentes": cls.impressao_pendentes(db),
+            },
+        )
+
+    @property
+    def id_execucao(self) -> str:
+        return self.estado["id_execucao"]
+
+    @property
+    def retomado(self) -> bool:
+        """Se há lotes confirmados por uma execução anterior."""
+        return self.estado["lotes"] > 0
+
+    def _gravar(self) -> None:
+        self.estado["lotes"] += 1
+        with _arquivo_atomico(self.caminho, "w", encoding="utf-8") as f:
+            json.dump(self.estado, f)
+
+    def _marcar_operacoes(self, gravadas: Iterable[int], falhas: Iterable[int]) -> None:
+        # uma operação que falhou antes e agora foi gravada deixa de ser falha
+        pendentes = set(self.estado["falhas_op"]).difference(gravadas)
+        self.estado["falhas_op"] = sorted(pendentes.union(falhas))
+
+    def confirmar_talhoes(self, ids: List[int]) -> None:
+        """Registra talhões novos gravados (ou que já estavam no banco)."""
+        with self._trava:
+            self.estado["talhoes"].extend(ids)
+            self._gravar()
+
+    def confirmar_operacoes(self, gravadas: List[int], falhas: List[int]) -> None:
+        """Registra um lote de operações confirmado (gravadas em ordem de id_op)."""
+        with self._trava:
+            if gravadas:
+                self.estado["ultima_op"] = max(self.estado["ultima_op"], gravadas[-1])
+            self._marcar_operacoes(gravadas, falhas)
+            self._gravar()
+
+    def ignorar_operacoes(self, ids: Iterable[int]) -> None:
+        """Registra operações deixadas de fora (ex.: talhão não enviado)."""
+        with self._trava:
+            self._marcar_operacoes((), ids)
+
+    def confirmar_particao(
+        self, id_talhao: int, gravadas: List[int], falhas: List[int]
+    ) -> None:
+        """Registra uma partição do modo paralelo confirmada."""
+        with self._trava:
+            particoes = self.estado["particoes"]
+            ultima = max(gravadas + falhas, default=0)
+            particoes[str(id_talhao)] = max(particoes.get(str(id_talhao), 0), ultima)
+            self._marcar_operacoes(gravadas, falhas)
+            self._gravar()
+
+    def aplicar(self, db: Dict[str, Any]) -> int:
+        """
+        Tira do diário de db os talhões e operações que o checkpoint registra como
+        gravados. Retorna quantos registros saíram.
+        """
+        with self._trava:
+            estado = self.estado
+            journal = db["journal"]
+            pend_t, pend_op = journal["talhoes"], journal["operacoes"]
+            antes = len(pend_t) + len(pend_op)
+            for id_t in estado["talhoes"]:
+                if pend_t.get(str(id_t)) == "novo":
+                    del pend_t[str(id_t)]
+            particoes = estado["particoes"]
+            for id_t in particoes:
+                # talhão "alterado" continua pendente (a atualização é idempotente)
+                if pend_t.get(id_t) == "novo":
+                    del pend_t[id_t]
+            falhas = set(estado["falhas_op"])
+            # só as operações pendentes são lidas, pelo índice de IDs
+            ops = db["operacoes"]
+            id_talhao = ops.colunas["id_talhao"]
+            for pos in ops.posicoes_ids(sorted(map(int, pend_op))):
+                id_op = ops.colunas["id_op"][pos]
+                if id_op in falhas:
+                    continue
+                limite = max(estado["ultima_op"], particoes.get(str(id_talhao[pos]), 0))
+                if id_op <= limite:
+                    del pend_op[str(id_op)]
+            return antes - len(pend_t) - len(pend_op)
+
+    def concluir(self) -> None:
+        """Apaga o checkpoint no fim de uma sincronização completa."""
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+
+# checkpoint da sincronização em andamento (None fora dela)
+_checkpoint: CheckpointSync | None = None
+
+
+def operacoes_pendentes(
+    ops: OperacoesColunares, journal: Dict[str, Any]
+) -> List[OperacaoView]:
+    """
+    Operações pendentes no diário, em ordem de id_op, achadas pelo índice de IDs do
+    armazenamento: o custo depende das pendentes, não do histórico inteiro.
+    """
+    ids = sorted(map(int, journal["operacoes"]))
+    return [OperacaoView(ops, pos) for pos in ops.posicoes_ids(ids)]
+
+
+def _conferir_ids_pendentes(con, db: Dict[str, Any]) -> int:
+    """
+    Confere com o banco os IDs das operações pendentes antes do envio, lendo só as
+    operações a partir da menor pendente. Uma que já está no banco com o mesmo ID e
+    conteúdo (gravada por um envio que não terminou) sai do diário; um ID que outro
+    cliente já usou com outro conteúdo é trocado por um ID depois do maior do banco.
+    Retorna quantas operações foram renumeradas.
+    """
+    pend_op = db["journal"]["operacoes"]
+    if not pend_op:
+        return 0
+    ops = db["operacoes"]
+    ids = sorted(map(int, pend_op))
+    posicoes = {ops.colunas["id_op"][pos]: pos for pos in ops.posicoes_ids(ids)}
+    colisoes = []
+    maior = 0
+    for op in backend_ativo().ler_operacoes(con, id_op_min=ids[0] - 1):
+        maior = max(maior, op["id_op"])
+        pos = posicoes.get(op["id_op"])
+        if pos is None:
+            continue
+        if _mesmo_conteudo(ops, pos, op):
+            del pend_op[str(op["id_op"])]
+        else:
+            colisoes.append(pos)
+    # os IDs novos continuam depois de todos os IDs do banco
+    db["sequencias"]["op"] = max(db["sequencias"]["op"], maior)
+    for pos in colisoes:
+        _renumerar_operacao(db, pos)
+    return len(colisoes)
+
+
+def _talhoes_confirmados(
+    talhoes: List[Dict[str, Any]], erro_chave_duplicada: str
+) -> Callable[[int, int, List[tuple[int, str]]], None]:
+    """
+    Callback ao_confirmar dos envios de talhões: registra no checkpoint os talhões
+    do lote gravados (ou que já estavam no banco).
+    """
+
+    def confirmados(inicio: int, fim: int, falhas: List[tuple[int, str]]) -> None:
+        # chave duplicada também conta: o talhão já está no banco
+        ruins = {p for p, msg in falhas if erro_chave_duplicada not in msg}
+        if _checkpoint is not None:
+            _checkpoint.confirmar_talhoes(
+                [talhoes[p]["id_talhao"] for p in range(inicio, fim) if p not in ruins]
+            )
+
+    return confirmados
+
+
+def _operacoes_confirmadas(
+    ops: List[Dict[str, Any]],
+) -> Callable[[int, int, List[tuple[int, str]]], None]:
+    """
+    Callback ao_confirmar dos envios de operações (em ordem de id_op): registra no
+    checkpoint as operações do lote gravadas e as que falharam.
+    """
+
+    def confirmados(inicio: int, fim: int, falhas: List[tuple[int, str]]) -> None:
+        ruins = {p for p, _ in falhas}
+        if _checkpoint is not None:
+            _checkpoint.confirmar_operacoes(
+                [ops[p]["id_op"] for p in range(inicio, fim) if p not in ruins],
+                [ops[p]["id_op"] for p in sorted(ruins)],
+            )
+
+    return confirmados
+
+
+def _enviar_talhoes(con, talhoes: List[Dict[str, Any]], tamanho_lote: int) -> set:
+    """Insere os talhões no banco em lotes e retorna os IDs dos que falharam."""
+    if not talhoes:  # se não houver talhões novos, avisa
+        print("Nenhum novo talhão para sincronizar.")
+        return set()
+    backend = backend_ativo()
+    inicio = time.perf_counter()
+    inseridos, falhas = inserir_em_lotes(
+        con,
+        backend.SQL_INSERIR_TALHAO,
+        [[t["id_talhao"], t["nome"], t["area_ha"]] for t in talhoes],
+        tamanho_lote,
+        ao_confirmar=_talhoes_confirmados(talhoes, backend.ERRO_CHAVE_DUPLICADA),
+    )
+    # chave duplicada significa que o talhão já está no banco, então não é falha
+    falhas = [
+        (pos, msg) for pos, msg in falhas if backend.ERRO_CHAVE_DUPLICADA not in msg
+    ]
+    _relatar_lotes(
+        "talhão(ões)",
+        [f"talhão '{t['nome']}' (ID {t['id_talhao']})" for t in talhoes],
+        inseridos,
+        falhas,
+        time.perf_counter() - inicio,
+    )
+    return {talhoes[pos]["id_talhao"] for pos, _ in falhas}
+
+
+def _atualizar_talhoes(con, talhoes: List[Dict[str, Any]], tamanho_lote: int) -> set:
+    """
+    Atualiza no banco o nome e a área dos talhões alterados, em lotes, e retorna os
+    IDs dos que falharam.
+    """
+    if not talhoes:
+        return set()
+    _, falhas = inserir_em_lotes(
+        con,
+        backend_ativo().SQL_ATUALIZAR_TALHAO,
+        [_valores_atualizacao(t) for t in talhoes],
+        tamanho_lote,
+    )
+    print(f"✅ {len(talhoes) - len(falhas)} talhão(ões) atualizado(s).")
+    return {talhoes[pos]["id_talhao"] for pos, _ in falhas}
+
+
+def _enviar_operacoes(con, ops: List[Dict[str, Any]], tamanho_lote: int) -> set:
+    """
+    Insere as operações no banco em lotes, em ordem de id_op (a ordem do checkpoint),
+    e retorna os id_op das que falharam.
+    """
+    if not ops:
+        print("Nenhuma nova operação para sincronizar.")
+        return set()
+    ops = sorted(ops, key=operator.itemgetter("id_op"))
+    inicio = time.perf_counter()
+    inseridos, falhas = inserir_em_lotes(
+        con,
+        backend_ativo().SQL_INSERIR_OPERACAO,
+        [
+            [
+                op["id_op"],
+                op["id_talhao"],
+                op["data"],
+                op["peso_t_colhido"],
+                op["perda_percent"],
+            ]
+            for op in ops
+        ],
+        tamanho_lote,
+        ao_confirmar=_operacoes_confirmadas(ops),
+    )
+    _relatar_lotes(
+        "operação(ões)",
+        [f"operação {op['id_op']}" for op in ops],
+        inseridos,
+        falhas,
+        time.perf_counter() - inicio,
+    )
+    return {ops[pos]["id_op"] for pos, _ in falhas}
+
+
+def _comparacao_para_diario(
+    falhas_t: set, falhas_op: set, novas_operacoes: List[Dict[str, Any]]
+) -> None:
+    """
+    Transforma o resultado da comparação da sincronização completa no diário (o que
+    falhou e as operações a enviar): se o envio for interrompido, a retomada
+    continua dele, pelo checkpoint e pelo delta, sem ler as tabelas de novo.
+    """
+    journal = db_mem["journal"]
+    journal["talhoes"] = {
+        str(id_t): journal["talhoes"].get(str(id_t), "novo") for id_t in falhas_t
+    }
+    journal["operacoes"] = {
+        str(id_op): "novo"
+        for id_op in falhas_op.union(op["id_op"] for op in novas_operacoes)
+    }
+    journal["reconciliar"] = False
+    if _checkpoint is not None:
+        _checkpoint.comparado = True
+        _checkpoint.ignorar_operacoes(falhas_op)
+
+
+def _sincronizar_completo(con, tamanho_lote: int) -> tuple[set, set]:
+    """
+    Sincronização completa: lê as tabelas do Oracle inteiras e envia o que falta.
+    Usada quando o diário de mudanças não é confiável (ex.: JSON antigo carregado).
+    Retorna os IDs de talhões e de operações que falharam.
+    """
+    print("\nSincronizando talhões...")
+    # cria um conjunto com os IDs dos talhões já existentes no Oracle
+    # (lidos em fluxo; um erro na leitura interrompe a sincronização)
+    existentes_oracle = {t["id_talhao"] for t in backend_ativo().ler_talhoes(con)}
+    # cria uma lista com os talhões que estão na memória, mas não no Oracle, iteraando
+    # sobre os talhões na memória e filtrando pelos que não estão no conjunto acima
+    novos_talhoes = [
+        t for t in db_mem["talhoes"].values() if t["id_talhao"] not in existentes_oracle
+    ]
+    falhas_t = _enviar_talhoes(con, novos_talhoes, tamanho_lote)
+    # talhões editados na memória que já estão no Oracle são atualizados
+    pend_t = db_mem["journal"]["talhoes"]
+    alterados = [
+        t
+        for t in db_mem["talhoes"].values()
+        if pend_t.get(str(t["id_talhao"])) == "alterado"
+        and t["id_talhao"] in existentes_oracle
+    ]
+    falhas_t |= _atualizar_talhoes(con, alterados, tamanho_lote)
+    # Atualiza o conjunto de existentes para a etapa das operações, sem os talhões
+    # que falharam
+    existentes_oracle |= {t["id_talhao"] for t in novos_talhoes} - falhas_t
+
+    print("\nSincronizando operações...")
+    # lê em fluxo as operações já existentes no banco Oracle e cria um conjunto de tuplas
+    # (id_talhao, data, peso_t_colhido, perda_percent)
+    # cada tupla representa uma operação de colheita única
+    conjunto_op_oracle = {
+        (
+            op["id_talhao"],
+            op["data"],
+            float(op["peso_t_colhido"]),
+            float(op["perda_percent"]),
+        )
+        for op in backend_ativo().ler_operacoes(con)
+    }
+
+    # cria uma lista com as operações que estão na memória, mas não no Oracle e cujo
+    # talhão existe no Oracle
+    novas_operacoes = []
+    falhas_op = set()
+    for op in db_mem["operacoes"]:  # itera sobre as operações de colheita na memória
+        # se o talhão da colheita não existir no Oracle, avisa e ignora
+        if op["id_talhao"] not in existentes_oracle:
+            print(
+                f"⚠️ Operação {op['id_op']} ignorada. Talhão {op['id_talhao']} não existe no Oracle."
+            )
+            falhas_op.add(op["id_op"])
+            continue
+        # cria uma tupla que representa uma operação de colheita
+        op_na_memoria = (
+            op["id_talhao"],
+            op["data"],
+            float(op["peso_t_colhido"]),
+            float(op["perda_percent"]),
+        )
+        # se a tupla acima não existir no conjunto de operações do Oracle, adiciona na
+        # lista de novas operações
+        if op_na_memoria not in conjunto_op_oracle:
+            novas_operacoes.append(op)
+
+    _comparacao_para_diario(falhas_t, falhas_op, novas_operacoes)
+    falhas_op |= _enviar_operacoes(con, novas_operacoes, tamanho_lote)
+    return falhas_t, falhas_op
+
+
+def _sincronizar_delta(
+    con, journal: Dict[str, Any], tamanho_lote: int
+) -> tuple[set, set]:
+    """
+    Sincronização incremental: envia somente o que está no diário de mudanças, sem
+    ler as tabelas do Oracle. Retorna os IDs de talhões e de operações que falharam.
+    """
+    print("\nSincronizando talhões (somente mudanças)...")
+    pend_t = journal["talhoes"]
+    talhoes = db_mem["talhoes"]
+    # talhões novos são inseridos; talhões alterados são atualizados
+    novos = [talhoes[k] for k, e in pend_t.items() if e == "novo" and k in talhoes]
+    alterados = [talhoes[k] for k, e in pend_t.items() if e != "novo" and k in talhoes]
+    falhas_t = _enviar_talhoes(con, novos, tamanho_lote)
+    falhas_t |= _atualizar_talhoes(con, alterados, tamanho_lote)
+
+    print("\nSincronizando operações (somente mudanças)...")
+    novas_operacoes = []
+    falhas_op = set()
+    for op in operacoes_pendentes(db_mem["operacoes"], journal):
+        # talhão que acabou de falhar: a operação fica pendente para a próxima vez
+        if op["id_talhao"] in falhas_t:
+            print(
+                f"⚠️ Operação {op['id_op']} adiada. Talhão {op['id_talhao']} não foi enviado."
+            )
+            falhas_op.add(op["id_op"])
+            continue
+        novas_operacoes.append(op)
+    if _checkpoint is not None:
+        _checkpoint.ignorar_operacoes(falhas_op)
+    falhas_op |= _enviar_operacoes(con, novas_operacoes, tamanho_lote)
+    return falhas_t, falhas_op
+
+
+# =========================
+# SINCRONIZAÇÃO ASSÍNCRONA
+# =========================
+# Variante da sincronização sobre a API asyncio do python-oracledb (modo thin). Em
+# links com latência alta quase todo o tempo é espera de rede, então as etapas se
+# sobrepõem: as chaves do Oracle são lidas enquanto as linhas locais são preparadas,
+# e os lotes são enviados por várias conexões enquanto os próximos são montados.
+
+# máximo de lotes em voo ao mesmo tempo (ajustável com ORA_LOTES_EM_VOO)
+LOTES_EM_VOO = int(os.environ.get("ORA_LOTES_EM_VOO", "4"))
+
+SQL_CHAVES_TALHOES = "SELECT id_talhao FROM talhoes"
+SQL_CHAVES_OPERACOES = (
+    "SELECT id_talhao, data_op, peso_t_colhido, perda_percent " "FROM operacoes"
+)
+
+
+def progresso_padrao(etapa: str, feitos: int, total: int) -> None:
+    """Callback de progresso padrão: mostra a etapa e a porcentagem na mesma linha."""
+    pct = 100 * feitos / total if total else 100.0
+    fim = "\n" if feitos >= total else ""
+    print(f"\r{etapa}: {feitos}/{total} ({pct:.0f}%)", end=fim, flush=True)
+
+
+async def _coletar_cedendo(itens: Iterable, a_cada: int = 10000) -> list:
+    """
+    Monta uma lista a partir de itens, cedendo a vez ao loop a cada a_cada itens,
+    para que consultas e envios em andamento continuem enquanto o trabalho local anda.
+    """
+    saida = []
+    for i, item in enumerate(itens, start=1):
+        saida.append(item)
+        if i % a_cada == 0:
+            await asyncio.sleep(0)
+    return saida
+
+
+async def _produzir_lotes(
+    linhas: Iterable[list], tamanho_lote: int, fila: asyncio.Queue, consumidores: int
+) -> None:
+    """Monta os lotes e os coloca na fila; a fila limitada segura o produtor."""
+    linhas = iter(linhas)
+    inicio = 0
+    while lote := list(itertools.islice(linhas, tamanho_lote)):
+        await fila.put((inicio, lote))  # espera se já houver lotes demais na fila
+        inicio += len(lote)
+        await asyncio.sleep(0)  # deixa os envios andarem antes de montar o próximo
+    for _ in range(consumidores):
+        await fila.put(None)  # um aviso de fim para cada consumidor
+
+
+async def _consumir_lotes(
+    pool,
+    sql: str,
+    fila: asyncio.Queue,
+    falhas: List[tuple[int, str]],
+    concluido: Callable[[int, int, List[tuple[int, str]]], None],
+) -> None:
+    """
+    Envia os lotes da fila por uma conexão própria do pool, com um commit por lote,
+    e passa cada lote resolvido (início, fim, falhas do lote) para concluido. Se a
+    conexão não puder ser obtida, os lotes recebidos são marcados como falha. Um
+    erro transitório (conexão caída) é propagado, como em inserir_em_lotes().
+    """
+    con, erro_con = None, None
+    try:
+        con = await pool.acquire()
+    except Exception as e:
+        erro_con = e
+    try:
+        while (item := await fila.get()) is not None:
+            inicio, lote = item
+            try:
+                if con is None:
+                    raise erro_con
+                with metricas.medir("oracle.lote", len(lote), idas=2):
+                    with con.cursor() as cur:
+                        await cur.executemany(sql, lote, batcherrors=True)
+                        erros = cur.getbatcherrors()
+                    await con.commit()  # um commit por lote
+            # se o lote inteiro falhar, marca todas as linhas dele
+            except Exception as e:
+                if con is not None:
+                    try:
+                        await con.rollback()
+                    except Exception:
+                        pass
+                if _erro_transitorio(e):
+                    raise
+                falhas_lote = [(i, str(e)) for i in range(inicio, inicio + len(lote))]
+            else:
+                falhas_lote = [(inicio + erro.offset, erro.message) for erro in erros]
+            falhas.extend(falhas_lote)
+            concluido(inicio, inicio + len(lote), falhas_lote)
+    finally:
+        if con is not None:
+            await pool.release(con)
+
+
+async def inserir_em_lotes_async(
+    pool,
+    sql: str,
+    linhas: Iterable[list],
+    total: int,
+    tamanho_lote: int,
+    em_voo: int = LOTES_EM_VOO,
+    progresso: Callable[[str, int, int], None] | None = None,
+    etapa: str = "",
+    ao_confirmar: Callable[[int, int, List[tuple[int, str]]], None] | None = None,
+) -> tuple[int, List[tuple[int, str]]]:
+    """
+    Versão assíncrona de inserir_em_lotes(): um produtor monta os lotes (consumindo
+    linhas sob demanda) numa fila limitada a em_voo lotes, e em_voo consumidores, cada
+    um com sua conexão do pool, os enviam com executemany e um commit por lote. No
+    máximo em_voo lotes ficam em voo. Os lotes terminam fora de ordem, mas chegam a
+    ao_confirmar(inicio, fim, falhas do lote) na ordem das linhas, como no
+    inserir_em_lotes() (o checkpoint conta com isso): um lote só é confirmado depois
+    dos anteriores. Um erro transitório cancela os lotes em voo e é propagado.
+    Retorna a quantidade inserida e as falhas (posição, mensagem).
+    """
+    if total == 0:
+        return 0, []
+    em_voo = max(1, min(em_voo, -(-total // tamanho_lote)))  # não passa do nº de lotes
+    fila = asyncio.Queue(maxsize=em_voo)
+    falhas = []
+    feitos = 0
+    proximo = 0  # início do próximo lote a confirmar
+    resolvidos: Dict[int, tuple[int, List[tuple[int, str]]]] = {}
+
+    def concluido(inicio: int, fim: int, falhas_lote: List[tuple[int, str]]) -> None:
+        nonlocal feitos, proximo
+        feitos += fim - inicio
+        if progresso is not None:
+            progresso(etapa, feitos, total)
+        resolvidos[inicio] = (fim, falhas_lote)
+        while proximo in resolvidos:
+            fim, falhas_lote = resolvidos.pop(proximo)
+            if ao_confirmar is not None:
+                ao_confirmar(proximo, fim, falhas_lote)
+            proximo = fim
+
+    tarefas = [
+        asyncio.create_task(_produzir_lotes(linhas, tamanho_lote, fila, em_voo)),
+        *(
+            asyncio.create_task(_consumir_lotes(pool, sql, fila, falhas, concluido))
+            for _ in range(em_voo)
+        ),
+    ]
+    try:
+        await asyncio.gather(*tarefas)
+    except BaseException:
+        # um consumidor caiu: os outros param e o erro segue para a retentativa
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        raise
+    falhas.sort()
+    return total - len(falhas), falhas
+
+
+async def _listar_async(pool, sql: str) -> List[tuple]:
+    """Executa uma consulta numa conexão própria do pool e retorna as linhas."""
+    async with pool.acquire() as con:
+        with metricas.medir("oracle.consulta", idas=2), con.cursor() as cur:
+            await cur.execute(sql)
+            linhas = await cur.fetchall()
+        metricas.contar("oracle.consulta", len(linhas))
+        return linhas
+
+
+async def _enviar_talhoes_async(
+    pool, talhoes: List[Dict[str, Any]], tamanho_lote: int, em_voo: int, progresso
+) -> set:
+    """Versão assíncrona de _enviar_talhoes()."""
+    if not talhoes:
+        print("Nenhum novo talhão para sincronizar.")
+        return set()
+    inicio = time.perf_counter()
+    inseridos, falhas = await inserir_em_lotes_async(
+        pool,
+        SQL_INSERIR_TALHAO,
+        ([t["id_talhao"], t["nome"], t["area_ha"]] for t in talhoes),
+        len(talhoes),
+        tamanho_lote,
+        em_voo,
+        progresso,
+        "Talhões",
+        _talhoes_confirmados(talhoes, ORA_CHAVE_DUPLICADA),
+    )
+    # chave duplicada significa que o talhão já está no Oracle, então não é falha
+    falhas = [(pos, msg) for pos, msg in falhas if ORA_CHAVE_DUPLICADA not in msg]
+    _relatar_lotes(
+        "talhão(ões)",
+        [f"talhão '{t['nome']}' (ID {t['id_talhao']})" for t in talhoes],
+        inseridos,
+        falhas,
+        time.perf_counter() - inicio,
+    )
+    return {talhoes[pos]["id_talhao"] for pos, _ in falhas}
+
+
+async def _enviar_operacoes_async(
+    pool, ops: List[Dict[str, Any]], tamanho_lote: int, em_voo: int, progresso
+) -> set:
+    """Versão assíncrona de _enviar_operacoes()."""
+    if not ops:
+        print("Nenhuma nova operação para sincronizar.")
+        return set()
+    ops = sorted(ops, key=operator.itemgetter("id_op"))
+    inicio = time.perf_counter()
+    inseridos, falhas = await inserir_em_lotes_async(
+        pool,
+        SQL_INSERIR_OPERACAO,
+        (
+            [
+                op["id_op"],
+                op["id_talhao"],
+                op["data"],
+                op["peso_t_colhido"],
+                op["perda_percent"],
+            ]
+            for op in ops
+        ),
+        len(ops),
+        tamanho_lote,
+        em_voo,
+        progresso,
+        "Operações",
+        _operacoes_confirmadas(ops),
+    )
+    _relatar_lotes(
+        "operação(ões)",
+        [f"operação {op['id_op']}" for op in ops],
+        inseridos,
+        falhas,
+        time.perf_counter() - inicio,
+    )
+    return {ops[pos]["id_op"] for pos, _ in falhas}
+
+
+async def _atualizar_talhoes_async(
+    pool, talhoes: List[Dict[str, Any]], tamanho_lote: int, em_voo: int
+) -> set:
+    """Versão assíncrona de _atualizar_talhoes()."""
+    if not talhoes:
+        return set()
+    _, falhas = await inserir_em_lotes_async(
+        pool,
+        SQL_ATUALIZAR_TALHAO,
+        map(_valores_atualizacao, talhoes),
+        len(talhoes),
+        tamanho_lote,
+        em_voo,
+    )
+    print(f"✅ {len(talhoes) - len(falhas)} talhão(ões) atualizado(s).")
+    return {talhoes[pos]["id_talhao"] for pos, _ in falhas}
+
+
+def _chave_operacao(id_talhao, data, peso, perda) -> tuple:
+    """
+    Chave de comparação de uma operação entre a memória e o Oracle (o DATE do Oracle
+    chega como datetime e vira date).
+    """
+    if isinstance(data, datetime.datetime):
+        data = data.date()
+    return (id_talhao, data, float(peso), float(perda))
+
+
+async def _sincronizar_completo_async(
+    pool, tamanho_lote: int, em_voo: int, progresso
+) -> tuple[set, set]:
+    """
+    Versão assíncrona de _sincronizar_completo(). As chaves de talhões e de operações
+    são lidas do Oracle em paralelo, em duas conexões, enquanto as chaves das
+    operações da memória são montadas; a leitura das operações continua enquanto os
+    talhões são enviados.
+    """
+    leitura_t = asyncio.create_task(_listar_async(pool, SQL_CHAVES_TALHOES))
+    leitura_op = asyncio.create_task(_listar_async(pool, SQL_CHAVES_OPERACOES))
+    ops = await _coletar_cedendo(db_mem["operacoes"])
+    chaves_locais = await _coletar_cedendo(
+        _chave_operacao(
+            op["id_talhao"], op["data"], op["peso_t_colhido"], op["perda_percent"]
+        )
+        for op in ops
+    )
+
+    print("\nSincronizando talhões...")
+    existentes_oracle = {row[0] for row in await leitura_t}
+    novos_talhoes = [
+        t for t in db_mem["talhoes"].values() if t["id_talhao"] not in existentes_oracle
+    ]
+    envio_alterados = asyncio.create_task(
+        _atualizar_talhoes_async(
+            pool,
+            [
+                t
+                for t in db_mem["talhoes"].values()
+                if db_mem["journal"]["talhoes"].get(str(t["id_talhao"])) == "alterado"
+                and t["id_talhao"] in existentes_oracle
+            ],
+            tamanho_lote,
+            em_voo,
+        )
+    )
+    falhas_t = await _enviar_talhoes_async(
+        pool, novos_talhoes, tamanho_lote, em_voo, progresso
+    )
+    falhas_t |= await envio_alterados
+    existentes_oracle |= {t["id_talhao"] for t in novos_talhoes} - falhas_t
+
+    print("\nSincronizando operações...")
+    conjunto_op_oracle = {_chave_operacao(*row) for row in await leitura_op}
+    novas_operacoes = []
+    falhas_op = set()
+    for op, chave in zip(ops, chaves_locais):
+        if op["id_talhao"] not in existentes_oracle:
+            print(
+                f"⚠️ Operação {op['id_op']} ignorada. Talhão {op['id_talhao']} não existe no Oracle."
+            )
+            falhas_op.add(op["id_op"])
+        elif chave not in conjunto_op_oracle:
+            novas_operacoes.append(op)
+    _comparacao_para_diario(falhas_t, falhas_op, novas_operacoes)
+    falhas_op |= await _enviar_operacoes_async(
+        pool, novas_operacoes, tamanho_lote, em_voo, progresso
+    )
+    return falhas_t, falhas_op
+
+
+async def _sincronizar_delta_async(
+    pool, journal: Dict[str, Any], tamanho_lote: int, em_voo: int, progresso
+) -> tuple[set, set]:
+    """
+    Versão assíncrona de _sincronizar_delta(). Talhões novos e alterados são
+    enviados em paralelo, e as operações pendentes são separadas enquanto isso.
+    """
+    print("\nSincronizando talhões (somente mudanças)...")
+    pend_t = journal["talhoes"]
+    talhoes = db_mem["talhoes"]
+    novos = [talhoes[k] for k, e in pend_t.items() if e == "novo" and k in talhoes]
+    alterados = [talhoes[k] for k, e in pend_t.items() if e != "novo" and k in talhoes]
+    envio_novos = asyncio.create_task(
+        _enviar_talhoes_async(pool, novos, tamanho_lote, em_voo, progresso)
+    )
+    envio_alterados = asyncio.create_task(
+        _atualizar_talhoes_async(pool, alterados, tamanho_lote, em_voo)
+    )
+    # enquanto os talhões vão para o Oracle, separa as operações pendentes
+    pendentes = await _coletar_cedendo(
+        operacoes_pendentes(db_mem["operacoes"], journal)
+    )
+    falhas_t = await envio_novos
+    falhas_t |= await envio_alterados
+
+    print("\nSincronizando operações (somente mudanças)...")
+    novas_operacoes = []
+    falhas_op = set()
+    for op in pendentes:
+        # talhão que acabou de falhar: a operação fica pendente para a próxima vez
+        if op["id_talhao"] in falhas_t:
+            print(
+                f"⚠️ Operação {op['id_op']} adiada. Talhão {op['id_talhao']} não foi enviado."
+            )
+            falhas_op.add(op["id_op"])
+        else:
+            novas_operacoes.append(op)
+    if _checkpoint is not None:
+        _checkpoint.ignorar_operacoes(falhas_op)
+    falhas_op |= await _enviar_operacoes_async(
+        pool, novas_operacoes, tamanho_lote, em_voo, progresso
+    )
+    return falhas_t, falhas_op
+
+
+async def _sincronizar_async(
+    journal: Dict[str, Any], tamanho_lote: int, em_voo: int, progresso
+) -> tuple[set, set]:
+    """
+    Sincronização assíncrona completa ou incremental (conforme o diário), com um pool
+    assíncrono próprio: em_voo conexões para os lotes e duas para as leituras. As
+    tabelas já foram criadas e os IDs pendentes conferidos por
+    _executar_sincronizacao(); o checkpoint, as retentativas e o diário são os
+    mesmos dos outros modos.
+    """
+    pool = _driver_oracle().create_pool_async(
+        user=os.environ["ORA_USER"],
+        password=os.environ["ORA_PASS"],
+        dsn=os.environ["ORA_DSN"],
+        min=1,
+        max=em_voo + 2,
+        increment=1,
+    )
+    try:
+        if journal["reconciliar"]:
+            return await _sincronizar_completo_async(
+                pool, tamanho_lote, em_voo, progresso
+            )
+        return await _sincronizar_delta_async(
+            pool, journal, tamanho_lote, em_voo, progresso
+        )
+    finally:
+        await pool.close(force=True)
+
+
+# =========================
+# SINCRONIZAÇÃO PARALELA POR TALHÃO
+# =========================
+# As mudanças pendentes são divididas em partições por id_talhao (o talhão, se
+# pendente, e as suas operações) e enviadas ao mesmo tempo por uma pool de threads,
+# cada uma com a sua conexão do pool. Cada partição é uma transação: o talhão entra
+# antes das suas operações e o commit é da partição, então um talhão com problema
+# não segura os demais.
+
+# quantidade de conexões usadas em paralelo (ajustável com ORA_CONEXOES_SYNC)
+CONEXOES_SYNC = int(os.environ.get("ORA_CONEXOES_SYNC", str(ORA_POOL_MAX)))
+
+
+def _enviar_particao(
+    id_talhao: int,
+    talhao: Dict[str, Any] | None,
+    estado: str | None,
+    ops: List[Dict[str, Any]],
+    tamanho_lote: int,
+) -> tuple[bool, set, str | None]:
+    """
+    Envia uma partição (o talhão pendente, se houver, e as suas operações) numa
+    conexão própria, com um único commit no final, registrado no checkpoint. Erros
+    transitórios são tentados de novo, com espera crescente. Retorna se o talhão
+    falhou, os id_op que falharam e a mensagem de erro da partição (ou None).
+    """
+    backend = backend_ativo()
+    for tentativa in range(1, TENTATIVAS_SYNC + 1):
+        try:
+            return _enviar_particao_uma_vez(
+                backend, id_talhao, talhao, estado, ops, tamanho_lote
+            )
+        except Exception as e:
+            if tentativa < TENTATIVAS_SYNC and _erro_transitorio(e):
+                time.sleep(_espera_retentativa(tentativa))
+                continue
+            # se a conexão ou o commit falharem, a partição inteira fica pendente
+            return talhao is not None, {op["id_op"] for op in ops}, str(e)
+
+
+def _enviar_particao_uma_vez(
+    backend: Backend,
+    id_talhao: int,
+    talhao: Dict[str, Any] | None,
+    estado: str | None,
+    ops: List[Dict[str, Any]],
+    tamanho_lote: int,
+) -> tuple[bool, set, str | None]:
+    """Uma tentativa de _enviar_particao(); erros de conexão são propagados."""
+    with backend.conexao() as con:
+        if talhao is not None:
+            if estado == "novo":
+                sql = backend.SQL_INSERIR_TALHAO
+                valores = [talhao["id_talhao"], talhao["nome"], talhao["area_ha"]]
+            else:
+                sql = backend.SQL_ATUALIZAR_TALHAO
+                valores = _valores_atualizacao(talhao)
+            _, falhas = inserir_em_lotes(
+                con, sql, [valores], tamanho_lote, confirmar=False
+            )
+            # chave duplicada significa que o talhão já está no banco
+            falhas = [
+                msg for _, msg in falhas if backend.ERRO_CHAVE_DUPLICADA not in msg
+            ]
+            if falhas:
+                con.rollback()
+                return True, {op["id_op"] for op in ops}, falhas[0]
+        _, falhas = inserir_em_lotes(
+            con,
+            backend.SQL_INSERIR_OPERACAO,
+            [
+                [
+                    op["id_op"],
+                    op["id_talhao"],
+                    op["data"],
+                    op["peso_t_colhido"],
+                    op["perda_percent"],
+                ]
+                for op in ops
+            ],
+            tamanho_lote,
+            confirmar=False,
+        )
+        con.commit()  # um commit por partição
+    falhas_op = [ops[pos]["id_op"] for pos, _ in falhas]
+    if _checkpoint is not None:
+        ruins = set(falhas_op)
+        _checkpoint.confirmar_particao(
+            id_talhao,
+            [op["id_op"] for op in ops if op["id_op"] not in ruins],
+            falhas_op,
+        )
+    erro = falhas[0][1] if falhas else None
+    return False, set(falhas_op), erro
+
+
+def _sincronizar_paralelo(
+    journal: Dict[str, Any], tamanho_lote: int, conexoes: int
+) -> tuple[set, set]:
+    """
+    Sincronização incremental particionada por id_talhao, com até conexoes
+    partições sendo enviadas ao mesmo tempo. Os erros são informados por partição.
+    Retorna os IDs de talhões e de operações que falharam.
+    """
+    pend_t = journal["talhoes"]
+    talhoes = db_mem["talhoes"]
+    # monta as partições: talhão pendente (se houver) + operações pendentes dele
+    particoes: Dict[int, List[Dict[str, Any]]] = {}
+    for k in pend_t:
+        if k in talhoes:
+            particoes.setdefault(int(k), [])
+    for op in operacoes_pendentes(db_mem["operacoes"], journal):
+        particoes.setdefault(op["id_talhao"], []).append(dict(op.items()))
+    if not particoes:
+        print("Nenhuma mudança para sincronizar.")
+        return set(), set()
+
+    print(
+        f"\nSincronizando {len(particoes)} partição(ões) por talhão "
+        f"com {conexoes} conexão(ões)..."
+    )
+    inicio = time.perf_counter()
+    falhas_t, falhas_op = set(), set()
+    n_ops = 0
+    with ThreadPoolExecutor(max_workers=conexoes) as pool:
+        # as partições maiores vão primeiro, para equilibrar as threads
+        tarefas = {
+            id_t: pool.submit(
+                _enviar_particao,
+                id_t,
+                talhoes.get(str(id_t)) if str(id_t) in pend_t else None,
+                pend_t.get(str(id_t)),
+                ops,
+                tamanho_lote,
+            )
+            for id_t, ops in sorted(particoes.items(), key=lambda p: -len(p[1]))
+        }
+        for id_t, tarefa in tarefas.items():
+            falhou_t, falhas, erro = tarefa.result()
+            ops = particoes[id_t]
+            n_ops += len(ops)
+            if falhou_t:
+                falhas_t.add(id_t)
+                print(
+                    f"❌ Talhão {id_t}: partição não enviada ({len(ops)} operação(ões)): {erro}"
+                )
+            elif falhas:
+                print(
+                    f"⚠️ Talhão {id_t}: {len(falhas)} de {len(ops)} operação(ões) com falha: {erro}"
+                )
+            falhas_op |= falhas
+    segundos = time.perf_counter() - inicio
+    enviadas = n_ops - len(falhas_op)
+    vazao = enviadas / segundos if segundos > 0 else 0.0
+    print(
+        f"✅ {len(particoes) - len(falhas_t)} de {len(particoes)} partição(ões), "
+        f"{enviadas} operação(ões) enviada(s), {len(falhas_op)} falha(s) "
+        f"em {segundos:.2f}s ({vazao:.0f} linhas/s)."
+    )
+    return falhas_t, falhas_op
+
+
+def _executar_sincronizacao(
+    backend: Backend,
+    journal: Dict[str, Any],
+    modo: str,
+    tamanho_lote: int,
+    progresso: Callable[[str, int, int], None] | None,
+) -> tuple[set, set]:
+    """
+    Uma tentativa de sincronização no modo pedido. Retorna os IDs de talhões e de
+    operações que falharam; erros de conexão são propagados.
+    """
+    # empresta uma única conexão do pool para toda a sincronização
+    with backend.conexao() as con:
+        # se as credenciais estão registradas, cria as tabelas
+        backend.criar_esquema(con)
+        # em todos os modos, IDs pendentes que outro cliente já usou são trocados
+        # antes do envio (senão a chave duplicada se repetiria a cada sincronização)
+        _conferir_ids_pendentes(con, db_mem)
+        if modo == "merge":
+            return backend.sincronizar_merge(con, tamanho_lote)
+        # a assíncrona tem a sua completa; a paralela é incremental e, com
+        # reconciliação pendente, vale a completa
+        if modo != "assincrona" and (modo == "completa" or journal["reconciliar"]):
+            return _sincronizar_completo(con, tamanho_lote)
+        if modo == "delta":
+            return _sincronizar_delta(con, journal, tamanho_lote)
+    if modo == "assincrona":
+        return asyncio.run(
+            _sincronizar_async(journal, tamanho_lote, LOTES_EM_VOO, progresso)
+        )
+    return _sincronizar_paralelo(journal, tamanho_lote, CONEXOES_SYNC)
+
+
+# modos de sincronização aceitos por sincronizar_mem_para_oracle() e o modo padrão
+# (ajustável com ORA_MODO_SYNC)
+MODOS_SINCRONIZACAO = ("delta", "completa", "merge", "assincrona", "paralela")
+MODO_SINCRONIZACAO = os.environ.get("ORA_MODO_SYNC", "delta")
+
+
+@metricas.medido("sincronizacao")
+def sincronizar_mem_para_oracle(
+    tamanho_lote: int = TAMANHO_LOTE,
+    modo: str = MODO_SINCRONIZACAO,
+    progresso: Callable[[str, int, int], None] | None = progresso_padrao,
+):
+    """
+    Sincroniza os dados da memória para o banco Oracle, enviando as linhas em lotes
+    de tamanho_lote com executemany. O modo "delta" envia só o que está no diário de
+    mudanças; "completa" (usado também após carregar um JSON sem diário) compara com
+    as tabelas inteiras do Oracle; "merge" deixa a deduplicação para o servidor.
+    Todas as etapas usam a mesma conexão do pool. O modo "assincrona" faz o delta (ou
+    a completa) pela API asyncio, sobrepondo as etapas, e informa o andamento dos
+    lotes ao callback progresso(etapa, feitos, total). O modo "paralela" envia as mudanças
+    particionadas por talhão, em CONEXOES_SYNC conexões ao mesmo tempo. O destino é
+    o backend ativo (backend_ativo()); o modo "assincrona" só existe no Oracle e,
+    nos outros backends, vira "delta".
+    Cada lote confirmado é registrado no checkpoint (CheckpointSync, no arquivo
+    CAMINHO_CHECKPOINT). Erros transitórios são tentados de novo até TENTATIVAS_SYNC
+    vezes, com espera crescente, a partir do checkpoint; se a sincronização não
+    terminar, a próxima retoma dele.
+    """
+    if modo not in MODOS_SINCRONIZACAO:
+        raise ValueError(f"Modo de sincronização inválido: {modo}")
+    backend = backend_ativo()
+    # se as credenciais não foram declaradas como variáveis de ambiente, avisa e pede
+    if not backend.configurado():
+        print("Defina ORA_DSN / ORA_USER / ORA_PASS nas variáveis de ambiente.")
+        pedir_credenciais_oracle()
+        return
+    if modo == "assincrona" and backend.nome != "oracle":
+        print(f"⚠️ Modo assíncrono indisponível no {backend.rotulo}; usando delta.")
+        modo = "delta"
+
+    journal = db_mem["journal"]
+    global _checkpoint
+    _checkpoint = CheckpointSync.abrir(CAMINHO_CHECKPOINT, backend.nome, db_mem)
+    if _checkpoint.retomado:
+        retirados = _checkpoint.aplicar(db_mem)
+        print(
+            f"Retomando a sincronização {_checkpoint.id_execucao}: "
+            f"{retirados} registro(s) já gravado(s) não serão reenviados."
+        )
+    else:
+        print(f"Sincronização {_checkpoint.id_execucao}.")
+    try:
+        for tentativa in range(1, TENTATIVAS_SYNC + 1):
+            try:
+                falhas_t, falhas_op = _executar_sincronizacao(
+                    backend, journal, modo, tamanho_lote, progresso
+                )
+                break
+            # o que já foi confirmado sai do diário; o resto continua pendente
+            except Exception as e:
+                _checkpoint.aplicar(db_mem)
+                if tentativa < TENTATIVAS_SYNC and _erro_transitorio(e):
+                    espera = _espera_retentativa(tentativa)
+                    print(f"⚠️ {e}\nNova tentativa em {espera:.1f}s...")
+                    time.sleep(espera)
+                    # a comparação da completa já virou o diário: segue pelo delta
+                    if modo == "completa" and _checkpoint.comparado:
+                        modo = "delta"
+                    continue
+                print(f"[{backend.rotulo}] Erro na sincronização: {e}")
+                if _checkpoint.retomado:
+                    print(
+                        f"A próxima sincronização retoma de {CAMINHO_CHECKPOINT} "
+                        f"(execução {_checkpoint.id_execucao})."
+                    )
+                return
+        _checkpoint.concluir()
+    finally:
+        _checkpoint = None
+
+    # o diário fica só com o que falhou e a marca d'água avança
+    journal["talhoes"] = {
+        str(id_t): journal["talhoes"].get(str(id_t), "novo") for id_t in falhas_t
+    }
+    journal["operacoes"] = {str(id_op): "novo" for id_op in falhas_op}
+    journal["ultima_sync"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    journal["reconciliar"] = False
+    print("\nSincronização concluída.")
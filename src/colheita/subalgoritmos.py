@@ -0,0 +1,236 @@
+"""
+Subalgoritmos de uso geral (Cap. 3): conversão e leitura validada de números e
+datas digitadas, escrita na tela, tabelas de texto, paginação das listagens e
+escrita atômica de arquivos.
+"""
+
+import datetime
+import functools
+import os
+import sys
+from contextlib import contextmanager
+from typing import Any, Callable, List
+
+
+def erro_faixa(v: float, min_val: float | None, max_val: float | None) -> str | None:
+    """
+    Confere se v está na faixa [min_val, max_val] (limites opcionais). Retorna a
+    mensagem de erro, ou None se estiver dentro da faixa.
+    """
+    if min_val is not None and v < min_val:  # checa se é menor que o mínimo
+        return f"Valor deve ser >= {min_val}."
+    if max_val is not None and v > max_val:  # checa se é maior que o máximo
+        return f"Valor deve ser <= {max_val}."
+    return None
+
+
+def texto_para_float(texto: str) -> float:
+    """Converte texto em float, aceitando vírgula como separador decimal."""
+    # limpa espaços em branco antes e depois, converte possível vírgula em ponto
+    return float(texto.replace(",", ".").strip())
+
+
+def texto_para_data(texto: str) -> datetime.date:
+    """
+    Converte texto no formato YYYY-MM-DD em date (só esse formato). Lança
+    ValueError se o texto não for uma data válida nesse formato.
+    """
+    texto = texto.strip()
+    data = datetime.date.fromisoformat(texto)
+    if data.isoformat() != texto:  # fromisoformat aceita outros formatos ISO
+        raise ValueError(f"Data fora do formato YYYY-MM-DD: {texto!r}")
+    return data
+
+
+def input_int(
+    prompt: str, min_val: int | None = None, max_val: int | None = None
+) -> int:
+    """Lê um inteiro do terminal, com validação opcional de faixa."""
+    while True:  # loop até receber input válido
+        try:
+            # limpa espaços em branco antes e depois do input e tenta converter para int
+            v = int(input(prompt).strip())
+            erro = erro_faixa(v, min_val, max_val)
+            if erro:  # fora da faixa: avisa e repete
+                print(erro)
+                continue
+            return v
+        except ValueError:  # se a conversão para int falhar
+            print("Digite um número inteiro válido.")
+
+
+def input_float(
+    prompt: str, min_val: float | None = None, max_val: float | None = None
+) -> float:
+    """Lê um float do terminal, com validação opcional de faixa."""
+    while True:  # loop até receber input válido
+        try:
+            # tenta converter para float (aceita . ou , como separador decimal)
+            v = texto_para_float(input(prompt))
+            erro = erro_faixa(v, min_val, max_val)
+            if erro:  # fora da faixa: avisa e repete
+                print(erro)
+                continue
+            return v
+        except ValueError:  # se a conversão para float falhar
+            print("Digite um número decimal válido (use . ou ,).")
+
+
+def input_data(prompt: str) -> datetime.date:
+    """Lê uma data YYYY-MM-DD do terminal, validada (ex.: 2024-02-30 é recusada)."""
+    while True:  # loop até receber input válido
+        try:
+            return texto_para_data(input(prompt))
+        except ValueError:  # formato errado ou data inexistente
+            print("Digite uma data válida no formato YYYY-MM-DD.")
+
+
+def input_nonempty(prompt: str) -> str:
+    """Lê uma string não vazia do terminal."""
+    while True:  # loop até receber input válido
+        # limpa espaços em branco antes e depois do input
+        v = input(prompt).strip()
+        if v:  # checa se não está vazio
+            return v
+        print("Campo obrigatório.")  # se vazio, avisa e repete
+
+
+def input_opcional(prompt: str, conversor: Callable[[str], Any]):
+    """
+    Lê um valor opcional do terminal: Enter vazio retorna None; senão, o texto é
+    convertido por conversor, repetindo a pergunta se a conversão falhar.
+    """
+    while True:  # loop até receber input válido ou vazio
+        v = input(prompt).strip()
+        if not v:
+            return None
+        try:
+            return conversor(v)
+        except ValueError:  # se a conversão falhar, avisa e repete
+            print("Valor inválido.")
+
+
+# sequência ANSI que volta o cursor ao início e limpa a tela e a rolagem
+ANSI_LIMPAR = "\033[H\033[2J\033[3J"
+
+
+@functools.cache
+def _ativar_ansi() -> None:
+    """No Windows, liga o processamento de sequências ANSI do console (uma vez)."""
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        saida = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        modo = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(saida, ctypes.byref(modo)):
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            kernel32.SetConsoleMode(saida, modo.value | 0x0004)
+    except (AttributeError, OSError):
+        pass
+
+
+def escrever_tela(texto: str, limpar: bool = False) -> None:
+    """
+    Escreve texto no terminal de uma vez só (uma escrita e um flush), limpando a
+    tela antes se limpar=True. Fora de um terminal, a limpeza é omitida.
+    """
+    if limpar and sys.stdout.isatty():
+        _ativar_ansi()
+        texto = ANSI_LIMPAR + texto
+    sys.stdout.write(texto)
+    sys.stdout.flush()
+
+
+def limpar_console():
+    """Limpa o console/terminal com sequências ANSI, sem abrir um shell."""
+    escrever_tela("", limpar=True)
+
+
+# linhas por página nas listagens (ajustável com LINHAS_PAGINA)
+LINHAS_PAGINA = int(os.environ.get("LINHAS_PAGINA", "20"))
+
+
+def formatar_tabela(
+    cabecalho: tuple[str, ...], linhas: List[tuple[str, ...]], alinhamentos: str
+) -> List[str]:
+    """
+    Monta as linhas de texto de uma tabela (cabeçalho, separador e linhas), com as
+    colunas dimensionadas só pelas linhas recebidas, ou seja, pela página mostrada.
+    alinhamentos tem um caractere por coluna: ">" (direita) ou "<" (esquerda).
+    """
+    larguras = [
+        max(len(titulo), *(len(linha[i]) for linha in linhas))
+        for i, titulo in enumerate(cabecalho)
+    ]
+    modelo = " | ".join(f"{{:{a}{w}}}" for a, w in zip(alinhamentos, larguras))
+    texto = [modelo.format(*cabecalho), "-" * (sum(larguras) + 3 * (len(larguras) - 1))]
+    texto.extend(modelo.format(*linha) for linha in linhas)
+    return texto
+
+
+def paginar(
+    total: int,
+    montar_pagina: Callable[[int, int], List[str]],
+    tamanho_pagina: int = LINHAS_PAGINA,
+    pagina: int | None = None,
+) -> None:
+    """
+    Mostra uma listagem de total linhas página a página. montar_pagina(inicio, fim)
+    monta só as linhas de texto daquela página, e cada página vai para a tela numa
+    única escrita. Num terminal, o usuário navega (Enter, a, número, s); com a saída
+    redirecionada, as páginas são escritas em sequência. Com pagina, mostra só ela.
+    """
+    n_paginas = max(1, -(-total // tamanho_pagina))
+
+    def mostrar(n: int, limpar: bool) -> None:
+        inicio = (n - 1) * tamanho_pagina
+        texto = montar_pagina(inicio, min(inicio + tamanho_pagina, total))
+        if n_paginas > 1:
+            texto.append(f"Página {n}/{n_paginas} ({total} linha(s))")
+        escrever_tela("\n".join(texto) + "\n", limpar)
+
+    if pagina is not None:
+        mostrar(min(max(pagina, 1), n_paginas), limpar=True)
+        return
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        for n in range(1, n_paginas + 1):
+            mostrar(n, limpar=n == 1)
+        return
+    n = 1
+    while True:
+        mostrar(n, limpar=True)
+        if n_paginas == 1:
+            return
+        comando = input(
+            "[Enter] próxima  [a] anterior  [número] ir para a página  [s] sair: "
+        ).strip()
+        if comando.lower() == "s" or (not comando and n == n_paginas):
+            return
+        if comando.lower() == "a":
+            n = max(n - 1, 1)
+        elif comando.isdigit():
+            n = min(max(int(comando), 1), n_paginas)
+        elif not comando:
+            n += 1
+
+
+@contextmanager
+def _arquivo_atomico(caminho: str, modo: str = "w", **kwargs):
+    """
+    Abre um arquivo temporário ao lado de caminho e, se o bloco terminar sem erro,
+    o renomeia por cima do destino (os.replace é atômico). Se algo falhar no meio, o
+    arquivo antigo continua intacto.
+    """
+    temporario = caminho + ".tmp"
+    try:
+        with open(temporario, modo, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())  # garante que os dados estão no disco antes do rename
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
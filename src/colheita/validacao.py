@@ -0,0 +1,90 @@
+"""
+Regras de validação (Cap. 2) dos talhões e operações lidos de arquivos, as mesmas
+do cadastro pelo menu.
+"""
+
+import datetime
+from typing import Any, Dict
+
+from .subalgoritmos import erro_faixa, texto_para_data, texto_para_float
+
+# limites das entradas, os mesmos no menu e na importação em lote
+AREA_MIN_HA = 0.1
+PESO_MIN_T = 0.0
+PERDA_MIN, PERDA_MAX = 0.0, 100.0
+
+
+def _campo_int(registro: Dict[str, Any], campo: str, min_val: int | None) -> int:
+    """Lê um campo inteiro de um registro importado, com as regras de input_int."""
+    try:
+        v = int(str(registro.get(campo, "")).strip())
+    except ValueError:
+        raise ValueError(f"{campo}: Digite um número inteiro válido.") from None
+    erro = erro_faixa(v, min_val, None)
+    if erro:
+        raise ValueError(f"{campo}: {erro}")
+    return v
+
+
+def _campo_float(
+    registro: Dict[str, Any], campo: str, min_val: float, max_val: float | None
+) -> float:
+    """Lê um campo decimal de um registro importado, com as regras de input_float."""
+    try:
+        v = texto_para_float(str(registro.get(campo, "")))
+    except ValueError:
+        raise ValueError(
+            f"{campo}: Digite um número decimal válido (use . ou ,)."
+        ) from None
+    erro = erro_faixa(v, min_val, max_val)
+    if erro:
+        raise ValueError(f"{campo}: {erro}")
+    return v
+
+
+def _campo_texto(registro: Dict[str, Any], campo: str) -> str:
+    """Lê um campo de texto obrigatório de um registro importado."""
+    v = str(registro.get(campo) or "").strip()
+    if not v:
+        raise ValueError(f"{campo}: Campo obrigatório.")
+    return v
+
+
+def _campo_data(registro: Dict[str, Any], campo: str) -> datetime.date:
+    """Lê um campo de data (YYYY-MM-DD) obrigatório de um registro importado."""
+    v = _campo_texto(registro, campo)
+    try:
+        return texto_para_data(v)
+    except ValueError:
+        raise ValueError(f"{campo}: Data inválida {v!r} (use YYYY-MM-DD).") from None
+
+
+def validar_talhao(registro: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida um talhão lido de arquivo com as mesmas regras de cadastrar_talhao().
+    O id_talhao é opcional. Lança ValueError se o registro for inválido.
+    """
+    talhao = {
+        "nome": _campo_texto(registro, "nome"),
+        "area_ha": _campo_float(registro, "area_ha", AREA_MIN_HA, None),
+    }
+    if str(registro.get("id_talhao") or "").strip():
+        talhao["id_talhao"] = _campo_int(registro, "id_talhao", 1)
+    return talhao
+
+
+def validar_operacao(registro: Dict[str, Any], ids_talhoes: set) -> Dict[str, Any]:
+    """
+    Valida uma operação lida de arquivo com as mesmas regras de registrar_operacao()
+    (o talhão precisa existir). Lança ValueError se o registro for inválido.
+    """
+    id_t = _campo_int(registro, "id_talhao", 1)
+    if id_t not in ids_talhoes:
+        raise ValueError("Talhão inexistente.")
+    perda = _campo_float(registro, "perda_percent", PERDA_MIN, PERDA_MAX)
+    return {
+        "id_talhao": id_t,
+        "data": _campo_data(registro, "data"),
+        "peso_t_colhido": _campo_float(registro, "peso_t_colhido", PESO_MIN_T, None),
+        "perda_percent": perda,
+    }
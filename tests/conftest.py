@@ -0,0 +1,28 @@
+"""Configuração comum dos testes: o código fica em src/ (app.py e o pacote colheita)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from colheita.estruturas import db_mem  # noqa: E402
+
+
+@pytest.fixture
+def usar_db():
+    """
+    Põe o conteúdo de um db em db_mem e o devolve. db_mem é um dicionário só,
+    importado pelos módulos, então é esvaziado e preenchido (não trocado); no fim do
+    teste volta ao conteúdo anterior.
+    """
+    anterior = dict(db_mem)
+
+    def usar(db: dict) -> dict:
+        db_mem.clear()
+        db_mem.update(db)
+        return db_mem
+
+    yield usar
+    db_mem.clear()
+    db_mem.update(anterior)
@@ -0,0 +1,119 @@
+"""
+Testes dos limiares de alerta: precedência talhão > safra > padrão, limites da
+safra, validação e reclassificação do histórico ao mudar os limiares.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import datetime
+
+import pytest
+
+from colheita import autosave
+from colheita.autosave import aplicar_registros_autosave, Autosave
+from colheita.estruturas import (
+    codigo_alerta,
+    limites_alerta,
+    NIVEIS_ALERTA,
+    NivelAlerta,
+    novo_db,
+    novos_limiares_alerta,
+    _ordinal,
+    perda_alerta,
+    periodo_safra,
+)
+from colheita.menu import definir_limiares_alerta
+
+
+def _dia(ano: int, mes: int, dia: int) -> int:
+    return datetime.date(ano, mes, dia).toordinal()
+
+
+def test_nivel_muda_exatamente_no_limiar():
+    limiares = novos_limiares_alerta()
+    media, alta = limiares["padrao"]
+
+    niveis = [
+        codigo_alerta(perda, limiares=limiares)
+        for perda in (media - 0.01, media, alta - 0.01, alta)
+    ]
+    baixa, media_, alta_ = NIVEIS_ALERTA
+    assert niveis == [baixa, media_, media_, alta_]
+    assert codigo_alerta(media) is NivelAlerta.MEDIA
+
+
+def test_talhao_vale_mais_que_safra_e_safra_mais_que_padrao():
+    limiares = novos_limiares_alerta()
+    limiares["safras"]["2024"] = [1.0, 2.0]
+    limiares["talhoes"]["7"] = [50.0, 60.0]
+
+    # a safra 2024 começa em abril de 2024 e termina em março de 2025
+    assert limites_alerta(limiares, 1, _dia(2024, 4, 1)) == [1.0, 2.0]
+    assert limites_alerta(limiares, 1, _dia(2025, 3, 31)) == [1.0, 2.0]
+    assert limites_alerta(limiares, 1, _dia(2024, 3, 31)) == limiares["padrao"]
+    assert limites_alerta(limiares, 7, _dia(2024, 5, 1)) == [50.0, 60.0]
+    assert limites_alerta(limiares, None, None) == limiares["padrao"]
+    assert periodo_safra(2024) == (_dia(2024, 4, 1), _dia(2025, 3, 31))
+
+
+def _db_com_perdas(perdas) -> dict:
+    db = novo_db()
+    for i, perda in enumerate(perdas, start=1):
+        db["operacoes"].append(
+            {
+                "id_op": i,
+                "id_talhao": 1 + i % 2,
+                "data": "2024-05-01",
+                "perda_percent": perda,
+            }
+        )
+    return db
+
+
+def test_definir_limiares_reclassifica_o_historico(usar_db, monkeypatch):
+    db = usar_db(_db_com_perdas([1.0, 5.0, 9.0, 12.0, 20.0, 30.0]))
+    monkeypatch.setattr(autosave, "_autosave", None)
+
+    assert definir_limiares_alerta([10.0, 25.0], id_talhao=2) == 2
+    assert [op["alerta_perda"].texto for op in db["operacoes"]] == [
+        perda_alerta(p, id_t, _ordinal("2024-05-01"), db["limiares_alerta"])
+        for p, id_t in zip((1.0, 5.0, 9.0, 12.0, 20.0, 30.0), (2, 1, 2, 1, 2, 1))
+    ]
+    # sem os limiares próprios, o talhão volta a seguir os da safra e os padrão
+    definir_limiares_alerta([0.0, 100.0], safra=2024)
+    assert definir_limiares_alerta(None, id_talhao=2) == 2
+    assert {op["alerta_perda"] for op in db["operacoes"]} == {NivelAlerta.MEDIA}
+    assert "2" not in db["limiares_alerta"]["talhoes"]
+
+
+def test_limiares_invalidos_nao_mudam_nada(usar_db):
+    db = usar_db(_db_com_perdas([10.0]))
+    antes = novos_limiares_alerta()
+
+    for limites, escopo in (
+        ([20.0, 10.0], {}),
+        ([-1.0, 10.0], {}),
+        ([10.0, 101.0], {"safra": 2024}),
+        (None, {}),
+    ):
+        with pytest.raises(ValueError):
+            definir_limiares_alerta(limites, **escopo)
+    assert db["limiares_alerta"] == antes
+
+
+def test_mudanca_de_limiares_vai_para_o_autosave(usar_db, tmp_path, monkeypatch):
+    db = usar_db(_db_com_perdas([10.0]))
+    caminho = str(tmp_path / "autosave.log")
+    salvamento = Autosave(caminho)
+    monkeypatch.setattr(autosave, "_autosave", salvamento)
+
+    definir_limiares_alerta([1.0, 2.0], safra=2023)
+    definir_limiares_alerta([3.0, 4.0])
+    salvamento.parar()
+
+    _, registros = Autosave.ler(caminho)
+    novo = _db_com_perdas([10.0])
+    aplicar_registros_autosave(novo, registros)
+    assert novo["limiares_alerta"] == db["limiares_alerta"]
+    assert novo["operacoes"][0]["alerta_perda"] is NivelAlerta.ALTA
@@ -0,0 +1,155 @@
+"""
+Testes das análises: erro relativo dos percentis do SketchQuantis, mescla de
+sketches e de análises e o mesmo resultado pelas colunas, por dicionários e pelo
+log JSON Lines em pedaços.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from colheita import analises
+from colheita.analises import (
+    analisar_jsonl,
+    analisar_operacoes,
+    AnaliseColheita,
+    MES_SEM_DATA,
+    SketchQuantis,
+)
+from colheita.arquivos import salvar_jsonl
+from colheita.estruturas import OperacoesColunares, _ordinal
+
+
+def _valores(n: int, semente: int = 7) -> list:
+    sorteio = random.Random(semente)
+    return [0.0] * (n // 20) + [
+        round(sorteio.lognormvariate(1.5, 0.8), 3) for _ in range(n)
+    ]
+
+
+def _conferir_quantis(sketch: "SketchQuantis", valores: list) -> None:
+    ordenados = sorted(valores)
+    for q in (0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 1.0):
+        exato = ordenados[int(q * (len(ordenados) - 1))]
+        assert abs(sketch.quantil(q) - exato) <= sketch.erro * exato + 1e-9, q
+
+
+def test_quantis_ficam_dentro_do_erro_relativo():
+    valores = _valores(5000)
+    sketch = SketchQuantis(erro=0.01)
+    sketch.adicionar(valores)
+
+    _conferir_quantis(sketch, valores)
+    assert sketch.n == len(valores)
+    assert sketch.zeros == 250
+    assert sketch.media == pytest.approx(sum(valores) / len(valores))
+    assert SketchQuantis().quantil(0.5) == 0.0
+    with pytest.raises(ValueError):
+        sketch.adicionar([1.0, -0.5])
+
+
+def test_sketch_mesclado_e_igual_ao_de_uma_vez():
+    valores = _valores(3000)
+    inteiro = SketchQuantis()
+    inteiro.adicionar(valores)
+    partes = [SketchQuantis() for _ in range(3)]
+    for i, parte in enumerate(partes):
+        parte.adicionar(valores[i::3])
+
+    mesclado = partes[0].mesclar(partes[1]).mesclar(partes[2])
+    assert mesclado.baldes == inteiro.baldes
+    assert (mesclado.n, mesclado.zeros) == (inteiro.n, inteiro.zeros)
+    assert (mesclado.minimo, mesclado.maximo) == (inteiro.minimo, inteiro.maximo)
+    with pytest.raises(ValueError):
+        inteiro.mesclar(SketchQuantis(erro=0.05))
+
+
+def test_baldes_limitados_so_perdem_precisao_nos_menores():
+    valores = [10.0**expoente for expoente in range(-6, 7)] * 10
+    sketch = SketchQuantis(erro=0.001, max_baldes=5)
+    sketch.adicionar(valores)
+
+    assert len(sketch.baldes) == 5
+    assert sum(sketch.baldes.values()) == len(valores)
+    assert sketch.quantil(1.0) == pytest.approx(1e6, rel=0.001)
+    assert sketch.quantil(0.9) == pytest.approx(1e5, rel=0.001)
+    # os valores até 100 foram juntados no balde do 100
+    assert sketch.quantil(0.0) == pytest.approx(1e2, rel=0.001)
+
+
+def _ops(n: int) -> "OperacoesColunares":
+    sorteio = random.Random(3)
+    ops = OperacoesColunares()
+    for i in range(1, n + 1):
+        ops.append(
+            {
+                "id_op": i,
+                "id_talhao": 1 + i % 4,
+                "data": "sem registro" if i % 50 == 0 else f"2024-{1 + i % 3:02d}-10",
+                "peso_t_colhido": float(i % 9),
+                "perda_percent": round(sorteio.uniform(0.0, 25.0), 2),
+            }
+        )
+    return ops
+
+
+def _mesmo_resultado(a: "AnaliseColheita", b: "AnaliseColheita") -> None:
+    assert a.talhao_mes == pytest.approx(b.talhao_mes)
+    assert a.geral.baldes == b.geral.baldes
+    for grupos_a, grupos_b in ((a.por_talhao, b.por_talhao), (a.por_mes, b.por_mes)):
+        assert grupos_a.keys() == grupos_b.keys()
+        for chave, sketch in grupos_a.items():
+            assert sketch.baldes == grupos_b[chave].baldes, chave
+
+
+def test_analise_pelas_colunas_e_por_dicionarios_coincidem():
+    ops = _ops(2000)
+
+    pelas_colunas = analisar_operacoes(ops)
+    por_dicionarios = analisar_operacoes(iter(ops.para_dicts()))
+
+    _mesmo_resultado(pelas_colunas, por_dicionarios)
+    assert set(pelas_colunas.por_mes) == {
+        "2024-01",
+        "2024-02",
+        "2024-03",
+        MES_SEM_DATA,
+    }
+    _conferir_quantis(pelas_colunas.geral, list(ops.colunas["perda_percent"]))
+
+
+def test_produtividade_e_piores_talhoes():
+    analise = AnaliseColheita()
+    analise.adicionar(
+        [1, 1, 2, 3],
+        [_ordinal("2024-05-01")] * 3 + [0],
+        [10.0, 20.0, 5.0, 7.0],
+        [2.0, 4.0, 30.0, 15.0],
+    )
+    talhoes = {"1": {"area_ha": 10.0}, "2": {"area_ha": 0.0}}
+
+    assert analise.produtividade(talhoes) == {(1, "2024-05"): 3.0}
+    assert analise.piores_talhoes(2) == [2, 3]
+    assert analise.talhao_mes[(3, MES_SEM_DATA)] == [1, 7.0]
+
+
+def test_log_jsonl_em_pedacos_e_em_paralelo_da_o_mesmo_resultado(tmp_path, monkeypatch):
+    ops = _ops(1000)
+    base = str(tmp_path / "dados")
+    salvar_jsonl(base, {"talhoes": {}, "operacoes": ops})
+    monkeypatch.setattr(analises, "TAMANHO_PEDACO", 64)
+    em_serie = analisar_jsonl(base, processos=1)
+
+    # o pool de processos troca de lugar com um de threads: a mescla é a mesma
+    monkeypatch.setattr(analises, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(analises, "LIMIAR_PARALELO_BYTES", 0)
+    em_paralelo = analisar_jsonl(base, processos=3)
+
+    referencia = analisar_operacoes(iter(ops.para_dicts()))
+    _mesmo_resultado(em_serie, referencia)
+    _mesmo_resultado(em_paralelo, referencia)
+    assert em_paralelo.geral.n == 1000
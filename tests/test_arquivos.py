@@ -0,0 +1,157 @@
+"""
+Testes dos formatos de arquivo: JSON Lines com log de operações só acrescentado e
+snapshot binário aberto com mmap.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import json
+
+import pytest
+
+from colheita.arquivos import (
+    caminhos_jsonl,
+    carregar_jsonl,
+    carregar_snapshot,
+    salvar_json,
+    salvar_jsonl,
+    salvar_snapshot,
+    SNAPSHOT_CABECALHO,
+    SnapshotBinario,
+)
+from colheita.estruturas import journal_marcar, novo_db
+from colheita.subalgoritmos import _arquivo_atomico
+
+
+def _db(n: int) -> dict:
+    db = novo_db()
+    db["talhoes"] = {
+        "1": {"id_talhao": 1, "nome": "Norte", "area_ha": 12.5},
+        "2": {"id_talhao": 2, "nome": "Norte", "area_ha": 3.0, "cultura": "cana"},
+    }
+    for i in range(1, n + 1):
+        db["operacoes"].append(
+            {
+                "id_op": i,
+                "id_talhao": 1 + i % 2,
+                "data": f"2024-05-{1 + i % 28:02d}",
+                "peso_t_colhido": float(i),
+                "perda_percent": float(i % 20),
+            }
+        )
+    db["operacoes"].append(
+        {
+            "id_op": n + 1,
+            "id_talhao": 1,
+            "data": "safra antiga",
+            "peso_t_colhido": 1.0,
+            "perda_percent": 0.5,
+        }
+    )
+    return db
+
+
+def test_jsonl_acrescenta_so_as_operacoes_novas(tmp_path):
+    base = str(tmp_path / "dados")
+    db = _db(50)
+    assert salvar_jsonl(base, db) == 51
+    assert salvar_jsonl(base, db) == 0
+
+    carregado = carregar_jsonl(base)
+    carregado["operacoes"].append(
+        {"id_op": 52, "id_talhao": 2, "data": "2024-06-01", "peso_t_colhido": 2.0}
+    )
+    assert salvar_jsonl(base, carregado) == 1
+
+    relido = carregar_jsonl(base)
+    assert relido["talhoes"] == db["talhoes"]
+    assert relido["operacoes"].para_dicts()[:51] == db["operacoes"].para_dicts()
+    assert relido["operacoes"][-1]["id_op"] == 52
+    assert relido["operacoes"].resumo().n == 52
+
+
+def test_jsonl_ignora_acrescimo_interrompido(tmp_path):
+    base = str(tmp_path / "dados")
+    db = _db(10)
+    salvar_jsonl(base, db)
+    _, caminho_log = caminhos_jsonl(base)
+    # acréscimo que não chegou a atualizar o cabeçalho
+    with open(caminho_log, "ab") as f:
+        f.write(b'{"id_op": 99, "id_talh')
+
+    carregado = carregar_jsonl(base)
+    assert len(carregado["operacoes"]) == 11
+    carregado["operacoes"].append({"id_op": 12, "id_talhao": 1})
+    assert salvar_jsonl(base, carregado) == 1
+    with open(caminho_log, "rb") as f:
+        linhas = f.read().splitlines()
+    assert [json.loads(linha)["id_op"] for linha in linhas][-2:] == [11, 12]
+
+
+def test_jsonl_migra_do_json_antigo(tmp_path):
+    antigo = str(tmp_path / "dados.json")
+    salvar_json(antigo, _db(3))
+    base = str(tmp_path / "dados")
+
+    assert len(carregar_jsonl(base, antigo)["operacoes"]) == 4
+    assert carregar_jsonl(base) == {"talhoes": {}, "operacoes": []}
+
+
+def test_escrita_atomica_preserva_o_arquivo_antigo(tmp_path):
+    caminho = tmp_path / "dados.json"
+    caminho.write_text("antigo", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with _arquivo_atomico(str(caminho), "w", encoding="utf-8") as f:
+            f.write("novo pela metade")
+            raise RuntimeError("queda no meio da escrita")
+
+    assert caminho.read_text(encoding="utf-8") == "antigo"
+    assert [p.name for p in tmp_path.iterdir()] == ["dados.json"]
+
+
+def test_snapshot_volta_sem_perdas(tmp_path):
+    caminho = str(tmp_path / "dados.snap")
+    db = _db(100)
+    db["limiares_alerta"]["padrao"] = [2.0, 8.0]
+    journal_marcar(db, "operacoes", 7)
+    salvar_snapshot(caminho, db)
+
+    carregado = carregar_snapshot(caminho)
+    ops = carregado["operacoes"]
+    assert carregado["talhoes"] == db["talhoes"]
+    assert carregado["limiares_alerta"] == db["limiares_alerta"]
+    assert carregado["journal"] == json.loads(json.dumps(db["journal"]))
+    assert ops.para_dicts() == db["operacoes"].para_dicts()
+    assert ops[-1]["data"] == "safra antiga"
+    for campo in ("n", "total_peso", "soma_perda", "max_peso", "min_perda"):
+        assert getattr(ops.resumo(id_talhao=2), campo) == getattr(
+            db["operacoes"].resumo(id_talhao=2), campo
+        )
+    assert ops.consultar(id_talhao=1) == db["operacoes"].consultar(id_talhao=1)
+
+
+def test_snapshot_mapeado_soma_as_colunas_do_arquivo(tmp_path):
+    caminho = str(tmp_path / "dados.snap")
+    db = _db(100)
+    salvar_snapshot(caminho, db)
+
+    with SnapshotBinario(caminho) as snap:
+        assert len(snap) == 101
+        assert snap.soma("peso_t_colhido") == db["operacoes"].soma("peso_t_colhido")
+        assert snap.media("perda_percent") == db["operacoes"].media("perda_percent")
+        assert list(snap.colunas["id_op"]) == list(range(1, 102))
+    assert snap.colunas == {}
+
+
+def test_snapshot_recusa_arquivo_de_outro_formato(tmp_path):
+    caminho = tmp_path / "dados.snap"
+    caminho.write_bytes(b"\0" * SNAPSHOT_CABECALHO.size)
+
+    with pytest.raises(ValueError):
+        SnapshotBinario(str(caminho))
+    assert carregar_snapshot(str(tmp_path / "nao_existe.snap")) == {
+        "talhoes": {},
+        "operacoes": [],
+    }
@@ -0,0 +1,154 @@
+"""
+Testes do salvamento automático: gravação do log em grupo (por tamanho e por
+prazo), falhas de gravação e reaplicação dos registros depois de uma queda.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import builtins
+import time
+
+from colheita import autosave
+from colheita.autosave import aplicar_registros_autosave, Autosave
+from colheita.estruturas import novo_db
+
+
+def _talhao(id_talhao: int, nome: str, area: float = 10.0) -> dict:
+    return {"id_talhao": id_talhao, "nome": nome, "area_ha": area}
+
+
+def test_edicao_de_talhao_e_reaplicada_no_proprio_talhao():
+    # o log partiu de um arquivo com o talhão 1; os dados carregados têm também o 2
+    db = novo_db()
+    db["talhoes"]["1"] = _talhao(1, "Norte")
+    db["talhoes"]["2"] = _talhao(2, "Leste")
+    registros = [
+        {"tipo": "talhao_alterado", "registro": _talhao(1, "Norte 2", 11.0)},
+        # o talhão 2 do log colide com o dos dados: é recuperado como 3, e a
+        # edição dele vai junto
+        {"tipo": "talhoes", "registro": _talhao(2, "Sul")},
+        {"tipo": "talhao_alterado", "registro": _talhao(2, "Sul 2", 5.0)},
+    ]
+
+    assert aplicar_registros_autosave(db, registros) == (1, 0)
+
+    assert db["talhoes"]["1"] == _talhao(1, "Norte 2", 11.0)
+    assert db["talhoes"]["2"] == _talhao(2, "Leste")
+    assert db["talhoes"]["3"] == _talhao(3, "Sul 2", 5.0)
+    assert db["journal"]["talhoes"] == {"1": "alterado", "3": "novo"}
+
+
+class _Gravacoes:
+    """Conta os grupos gravados por um Autosave, delegando a gravação real."""
+
+    def __init__(self, salvamento: "Autosave"):
+        self.grupos = []
+        self._original = salvamento._gravar
+        salvamento._gravar = self
+
+    def __call__(self, grupo):
+        if grupo:
+            self.grupos.append(len(grupo))
+        return self._original(grupo)
+
+
+def _op(id_op: int, id_talhao: int = 1) -> dict:
+    return {
+        "id_op": id_op,
+        "id_talhao": id_talhao,
+        "data": "2024-05-01",
+        "peso_t_colhido": 10.0,
+        "perda_percent": 4.0,
+    }
+
+
+def test_registros_sao_gravados_em_grupos_do_tamanho_do_lote(tmp_path):
+    caminho = str(tmp_path / "autosave.log")
+    salvamento = Autosave(caminho, lote=10, intervalo=60.0)
+    gravacoes = _Gravacoes(salvamento)
+
+    for id_op in range(1, 26):
+        salvamento.registrar("operacoes", _op(id_op))
+    salvamento.parar()
+
+    # dois grupos cheios; o resto vai quando a thread termina
+    assert gravacoes.grupos == [10, 10, 5]
+    base, registros = Autosave.ler(caminho)
+    assert base is None
+    assert [r["registro"]["id_op"] for r in registros] == list(range(1, 26))
+
+
+def test_grupo_incompleto_e_gravado_no_prazo(tmp_path):
+    caminho = str(tmp_path / "autosave.log")
+    salvamento = Autosave(caminho, lote=1000, intervalo=0.05)
+    gravacoes = _Gravacoes(salvamento)
+
+    salvamento.registrar("operacoes", _op(1))
+    salvamento.registrar("operacoes", _op(2))
+    for _ in range(100):  # espera a thread sem depender de parar()
+        if gravacoes.grupos:
+            break
+        time.sleep(0.01)
+
+    assert gravacoes.grupos == [2]
+    assert len(Autosave.ler(caminho)[1]) == 2
+    salvamento.descarregar()
+    salvamento.parar()
+    assert gravacoes.grupos == [2]
+
+
+def test_falha_de_gravacao_guarda_o_grupo_para_a_proxima(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "autosave.log")
+    salvamento = Autosave(caminho, lote=2, intervalo=60.0)
+
+    def sem_espaco(arquivo, modo="r", *args, **kwargs):
+        if arquivo == caminho and "a" in modo:
+            raise OSError(28, "No space left on device")
+        return builtins.open(arquivo, modo, *args, **kwargs)
+
+    with monkeypatch.context() as m:
+        m.setattr(autosave, "open", sem_espaco, raising=False)
+        salvamento.registrar("operacoes", _op(1))
+        salvamento.registrar("operacoes", _op(2))
+        salvamento.descarregar()
+        assert salvamento.erro is not None
+    salvamento.registrar("operacoes", _op(3))
+    salvamento.parar()
+
+    assert salvamento.erro is None
+    assert [r["registro"]["id_op"] for r in Autosave.ler(caminho)[1]] == [1, 2, 3]
+
+
+def test_log_reiniciado_e_linha_interrompida(tmp_path):
+    caminho = str(tmp_path / "autosave.log")
+    salvamento = Autosave(caminho)
+    salvamento.registrar("operacoes", _op(1))
+    salvamento.reiniciar("jsonl", [{"tipo": "operacoes", "registro": _op(2)}])
+    salvamento.parar()
+    with open(caminho, "ab") as f:
+        f.write(b'{"tipo": "operacoes", "regis')
+
+    base, registros = Autosave.ler(caminho)
+    assert base == "jsonl"
+    assert registros == [{"tipo": "operacoes", "registro": _op(2)}]
+
+
+def test_operacoes_do_log_ja_salvas_sao_ignoradas_e_colisoes_renumeradas():
+    db = novo_db()
+    db["talhoes"]["1"] = _talhao(1, "Norte")
+    db["operacoes"].append(_op(1))
+    db["operacoes"].append(_op(2))
+    outra = dict(_op(2), peso_t_colhido=99.0)
+    registros = [
+        {"tipo": "operacoes", "registro": _op(1)},  # já está nos dados
+        {"tipo": "operacoes", "registro": outra},  # mesmo ID, outro conteúdo
+        {"tipo": "operacoes", "registro": _op(7)},
+    ]
+
+    assert aplicar_registros_autosave(db, registros) == (0, 2)
+
+    ops = db["operacoes"]
+    assert [op["id_op"] for op in ops] == [1, 2, 8, 7]
+    assert ops[2]["peso_t_colhido"] == 99.0
+    assert set(db["journal"]["operacoes"]) == {"7", "8"}
@@ -0,0 +1,185 @@
+"""
+Testes do armazenamento das operações em colunas (OperacoesColunares): leitura
+pela OperacaoView, agregados mantidos nas inclusões e remoções, índices de
+talhão, data e id_op e alertas classificados com os limiares do armazenamento.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import datetime
+
+from colheita.arquivos import carregar_no_db_mem
+from colheita.estruturas import (
+    journal_marcar,
+    NivelAlerta,
+    novo_db,
+    novos_limiares_alerta,
+    OperacoesColunares,
+)
+from colheita.sincronizacao import CheckpointSync
+
+
+def _op(id_op: int, id_talhao: int = 1, perda: float = 4.0, data="2024-05-01"):
+    return {
+        "id_op": id_op,
+        "id_talhao": id_talhao,
+        "data": data,
+        "peso_t_colhido": 10.0,
+        "perda_percent": perda,
+    }
+
+
+def test_alerta_usa_os_limiares_do_armazenamento(usar_db):
+    limiares = novos_limiares_alerta()
+    limiares["padrao"] = [1.0, 2.0]
+    ops = OperacoesColunares(limiares)
+    # os limiares globais não entram na classificação
+    usar_db({})
+
+    ops.append(_op(1, perda=1.5))
+    ops.append(_op(2, perda=1.5, id_talhao=2))
+    limiares["talhoes"]["2"] = [5.0, 10.0]
+    ops.append(_op(3, perda=1.5, id_talhao=2))
+
+    niveis = [op["alerta_perda"] for op in ops]
+    assert niveis == [NivelAlerta.MEDIA] * 2 + [NivelAlerta.BAIXA]
+    assert ops.reclassificar_alertas(limiares) == 1
+    assert ops.limiares is limiares
+
+
+def test_db_novo_compartilha_os_limiares_com_as_operacoes(usar_db):
+    db = novo_db()
+    db_mem = usar_db(novo_db())
+    assert db["operacoes"].limiares is db["limiares_alerta"]
+    carregado = {"talhoes": {}, "operacoes": [_op(1, perda=9.0)]}
+    carregado["limiares_alerta"] = novos_limiares_alerta()
+    carregado["limiares_alerta"]["padrao"] = [10.0, 20.0]
+    assert carregar_no_db_mem(carregado)
+    ops = db_mem["operacoes"]
+    assert ops.limiares is db_mem["limiares_alerta"]
+    assert ops[0]["alerta_perda"] == NivelAlerta.BAIXA
+
+
+def test_posicoes_ids_acha_pelo_indice_mesmo_fora_de_ordem():
+    ops = OperacoesColunares()
+    for id_op in (5, 1, 9, 3):
+        ops.append(_op(id_op))
+    assert ops.posicoes_ids([1, 3, 4, 9]) == [1, 3, 2]
+    ops.remover(1)  # as posições andam: o índice é reconstruído
+    assert ops.posicoes_ids([1, 3, 5]) == [2, 0]
+
+
+def test_impressao_pendentes_le_so_os_pendentes(monkeypatch):
+    db = novo_db()
+    for id_op in range(1, 1001):
+        db["operacoes"].append(_op(id_op))
+    for id_op in (10, 500):
+        journal_marcar(db, "operacoes", id_op)
+    lidas = []
+    original = OperacoesColunares.para_registro
+
+    def para_registro(self, pos):
+        lidas.append(pos)
+        return original(self, pos)
+
+    monkeypatch.setattr(OperacoesColunares, "para_registro", para_registro)
+    impressao = CheckpointSync.impressao_pendentes(db)
+
+    assert sorted(lidas) == [9, 499]
+    assert impressao["op"] == 500
+    # uma operação nova (ID maior) não muda a impressão até o ID 500
+    db["operacoes"].append(_op(1001))
+    journal_marcar(db, "operacoes", 1001)
+    assert CheckpointSync.impressao_pendentes(db, 0, 500) == impressao
+
+
+def test_operacao_view_le_as_colunas_como_um_dicionario():
+    ops = OperacoesColunares()
+    ops.append(_op(1, id_talhao=3, perda=20.0, data="2024-05-01"))
+    ops.append(_op(2, data="safra antiga"))  # texto livre de arquivo antigo
+
+    op = ops[0]
+    assert op["data"] == datetime.date(2024, 5, 1)
+    assert op["alerta_perda"] is NivelAlerta.ALTA
+    assert op.get("inexistente", "x") == "x"
+    assert dict(op.items())["id_talhao"] == 3
+    assert ops[-1]["data"] == "safra antiga"
+    assert ops.para_registro(0)["data"] == datetime.date(2024, 5, 1).toordinal()
+    assert ops.para_registro(1)["data"] == "safra antiga"
+    # o formato dos arquivos volta para as mesmas colunas
+    copia = OperacoesColunares.de_dicts(ops.para_registros())
+    assert copia.para_dicts() == ops.para_dicts()
+    try:
+        ops[2]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("posição fora do intervalo deveria falhar")
+
+
+def _amostra(n: int) -> "OperacoesColunares":
+    ops = OperacoesColunares()
+    for i in range(1, n + 1):
+        ops.append(
+            _op(
+                i,
+                id_talhao=1 + i * 7 % 5,
+                perda=float(i * 13 % 17),
+                data=f"2024-{1 + i % 6:02d}-{1 + i * 3 % 28:02d}",
+            )
+        )
+    return ops
+
+
+def test_agregados_acompanham_inclusoes_e_remocoes():
+    ops = _amostra(300)
+    for pos in (0, 5, 5, 100):  # inclui extremos de peso e de perda
+        ops.remover(pos)
+
+    linhas = list(ops)
+    geral = ops.resumo()
+    assert geral.n == len(linhas) == 296
+    assert geral.total_peso == sum(op["peso_t_colhido"] for op in linhas)
+    perdas = [op["perda_percent"] for op in linhas]
+    assert (geral.min_perda, geral.max_perda) == (min(perdas), max(perdas))
+    for id_t in range(1, 6):
+        do_talhao = [op["perda_percent"] for op in linhas if op["id_talhao"] == id_t]
+        resumo = ops.resumo(id_talhao=id_t)
+        assert resumo.n == len(do_talhao)
+        assert resumo.media_perda == sum(do_talhao) / len(do_talhao)
+        assert resumo.max_perda == max(do_talhao)
+    dia = ops.colunas["data"][0]
+    assert ops.resumo(dia=dia).n == sum(1 for d in ops.colunas["data"] if d == dia)
+    assert ops.resumo(id_talhao=99).n == 0
+
+
+def test_consultar_combina_os_indices_de_talhao_e_de_data():
+    ops = _amostra(500)
+    ops.remover(10)
+    ini = datetime.date(2024, 2, 10).toordinal()
+    fim = datetime.date(2024, 4, 5).toordinal()
+
+    def esperado(id_talhao=None, data_ini=None, data_fim=None):
+        return [
+            pos
+            for pos, op in enumerate(ops)
+            if (id_talhao is None or op["id_talhao"] == id_talhao)
+            and (data_ini is None or ops.colunas["data"][pos] >= data_ini)
+            and (data_fim is None or ops.colunas["data"][pos] <= data_fim)
+        ]
+
+    for filtros in (
+        {},
+        {"id_talhao": 2},
+        {"data_ini": ini},
+        {"data_fim": fim},
+        {"data_ini": ini, "data_fim": fim},
+        {"id_talhao": 4, "data_ini": ini, "data_fim": fim},
+    ):
+        assert ops.consultar(**filtros) == esperado(**filtros), filtros
+    subconjunto = ops.selecionar(ops.consultar(id_talhao=3))
+    assert subconjunto.resumo().n == len(esperado(id_talhao=3))
+    assert ops.filtrar("perda_percent", minimo=5.0, maximo=6.0) == [
+        pos for pos, op in enumerate(ops) if 5.0 <= op["perda_percent"] <= 6.0
+    ]
@@ -0,0 +1,146 @@
+"""
+Testes da importação em lote: validação linha a linha de CSV e JSON Lines (em
+série e em pedaços paralelos, na ordem do arquivo) e o comando "importar".
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from colheita import arquivos, autosave, importacao
+from colheita.arquivos import carregar_json
+from colheita.cli import cli
+from colheita.estruturas import novo_db
+from colheita.importacao import validar_arquivo
+
+
+@pytest.fixture
+def _isolado(usar_db, tmp_path, monkeypatch):
+    """Dados em memória vazios e arquivo de dados num diretório temporário."""
+    usar_db(novo_db())
+    monkeypatch.setattr(arquivos, "CAMINHO_JSON", str(tmp_path / "dados.json"))
+    monkeypatch.setattr(autosave, "_autosave", None)
+    return tmp_path
+
+
+def test_csv_valida_cada_linha_com_as_regras_do_menu(tmp_path):
+    caminho = tmp_path / "operacoes.csv"
+    caminho.write_text(
+        "id_talhao,data,peso_t_colhido,perda_percent\n"
+        '1,2024-05-01,"10,5",3\n'
+        "9,2024-05-01,10,3\n"
+        "1,01/05/2024,10,3\n"
+        "1,2024-05-02,10,101\n"
+        "1,2024-05-03,12.0,0\n",
+        encoding="utf-8",
+    )
+
+    validos, rejeitados = validar_arquivo(str(caminho), "operacoes", {1})
+
+    assert [num for num, _ in validos] == [2, 6]
+    assert validos[0][1]["peso_t_colhido"] == 10.5
+    assert validos[0][1]["data"] == datetime.date(2024, 5, 1)
+    assert [num for num, _ in rejeitados] == [3, 4, 5]
+    assert rejeitados[0][1] == "Talhão inexistente."
+    assert rejeitados[1][1].startswith("data: Data inválida")
+    assert rejeitados[2][1].startswith("perda_percent:")
+
+
+def test_jsonl_rejeita_linhas_que_nao_sao_objetos(tmp_path):
+    caminho = tmp_path / "talhoes.jsonl"
+    caminho.write_text(
+        '{"nome": "Norte", "area_ha": 10}\n'
+        "\n"
+        '{"nome": "Sul", "area_ha": 5, "id_talhao": 4}\n'
+        "[1, 2]\n"
+        '{"nome": "Leste", "area_ha": \n'
+        '{"nome": "", "area_ha": 3}\n',
+        encoding="utf-8",
+    )
+
+    validos, rejeitados = validar_arquivo(str(caminho), "talhoes", set())
+
+    assert validos == [
+        (1, {"nome": "Norte", "area_ha": 10.0}),
+        (3, {"nome": "Sul", "area_ha": 5.0, "id_talhao": 4}),
+    ]
+    assert [num for num, _ in rejeitados] == [4, 5, 6]
+    assert rejeitados[0][1] == "JSON inválido: era esperado um objeto."
+    assert rejeitados[1][1].startswith("JSON inválido:")
+    assert rejeitados[2][1] == "nome: Campo obrigatório."
+
+
+def test_pedacos_paralelos_mantem_a_ordem_do_arquivo(tmp_path, monkeypatch):
+    caminho = tmp_path / "operacoes.jsonl"
+    with open(caminho, "w", encoding="utf-8") as f:
+        for i in range(1, 1001):
+            op = {
+                "id_talhao": 1 + i % 3,  # o talhão 3 não existe: linha rejeitada
+                "data": "2024-05-01",
+                "peso_t_colhido": i,
+                "perda_percent": 1,
+            }
+            f.write(json.dumps(op) + "\n")
+    monkeypatch.setattr(importacao, "TAMANHO_PEDACO", 37)
+    em_serie = validar_arquivo(str(caminho), "operacoes", {1, 2}, processos=1)
+
+    monkeypatch.setattr(importacao, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(importacao, "LIMIAR_PARALELO_BYTES", 0)
+    em_paralelo = validar_arquivo(str(caminho), "operacoes", {1, 2}, processos=4)
+
+    assert em_paralelo == em_serie
+    validos, rejeitados = em_paralelo
+    assert [op["peso_t_colhido"] for _, op in validos] == [
+        float(i) for i in range(1, 1001) if i % 3 != 2
+    ]
+    assert len(rejeitados) == 333
+
+
+def test_comando_importar_numera_marca_e_salva(_isolado, capsys):
+    talhoes = _isolado / "talhoes.csv"
+    talhoes.write_text(
+        "nome,area_ha,id_talhao\nNorte,10,\nSul,5,7\nOeste,2,7\n", encoding="utf-8"
+    )
+    operacoes = _isolado / "operacoes.jsonl"
+    operacoes.write_text(
+        '{"id_talhao": 7, "data": "2024-05-01", "peso_t_colhido": 3, '
+        '"perda_percent": 2}\n'
+        '{"id_talhao": 8, "data": "2024-05-01", "peso_t_colhido": 3, '
+        '"perda_percent": 2}\n',
+        encoding="utf-8",
+    )
+
+    assert (
+        cli(
+            [
+                "importar",
+                "--talhoes",
+                str(talhoes),
+                "--operacoes",
+                str(operacoes),
+                "--processos",
+                "1",
+            ]
+        )
+        == 0
+    )
+
+    salvo = carregar_json(arquivos.CAMINHO_JSON)
+    assert {k: t["nome"] for k, t in salvo["talhoes"].items()} == {
+        "1": "Norte",
+        "7": "Sul",
+    }
+    assert [(op["id_op"], op["id_talhao"]) for op in salvo["operacoes"]] == [(1, 7)]
+    assert salvo["journal"]["operacoes"] == {"1": "novo"}
+    assert salvo["sequencias"]["talhao"] == 7
+    # cada arquivo ganha a lista dos seus rejeitados
+    assert (_isolado / "talhoes.csv.rejeitados.txt").read_text(
+        encoding="utf-8"
+    ) == "linha 4: id_talhao: ID de talhão já existe.\n"
+    assert "linha 2: Talhão inexistente." in capsys.readouterr().out
+    assert cli(["importar"]) == 2
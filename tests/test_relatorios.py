@@ -0,0 +1,104 @@
+"""
+Testes dos relatórios .txt: o resumo lido dos agregados e o relatório completo.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+from colheita import relatorios
+from colheita.analises import AnaliseColheita
+from colheita.estruturas import OperacoesColunares
+from colheita.relatorios import (
+    exportar_relatorio_txt,
+    exportar_relatorios_por_talhao,
+    _prevarrer_operacoes,
+    _resumo_colunar,
+)
+
+
+def _ops(n: int) -> "OperacoesColunares":
+    ops = OperacoesColunares()
+    for i in range(1, n + 1):
+        ops.append(
+            {
+                "id_op": i,
+                "id_talhao": 1 + i % 3,
+                "data": f"2024-05-{1 + i % 28:02d}",
+                "peso_t_colhido": float(i),
+                "perda_percent": float(i % 20),
+            }
+        )
+    return ops
+
+
+def test_resumo_colunar_nao_percorre_as_operacoes(monkeypatch):
+    ops = _ops(200)
+    talhoes = {str(i): {"nome": f"T{i}", "area_ha": 10.0} for i in (1, 2, 3)}
+    esperado = _prevarrer_operacoes(lambda: ops, talhoes)
+
+    def proibido(*args, **kwargs):
+        raise AssertionError("o resumo não deve analisar as operações")
+
+    monkeypatch.setattr(relatorios, "analisar_operacoes", proibido)
+    monkeypatch.setattr(AnaliseColheita, "de_colunas", proibido)
+    monkeypatch.setattr(OperacoesColunares, "__iter__", proibido)
+    resumo = _resumo_colunar(ops, talhoes)
+
+    assert "analise" not in resumo
+    for chave in ("total_ops", "min_peso", "max_peso", "min_perda", "max_perda"):
+        assert resumo[chave] == esperado[chave]
+    assert resumo["talhoes_vistos"] == esperado["talhoes_vistos"]
+
+
+def test_relatorio_txt_traz_totais_e_analises(tmp_path):
+    db = {"talhoes": {"1": {"nome": "Norte", "area_ha": 5.0}}, "operacoes": _ops(3)}
+    caminho = tmp_path / "relatorio.txt"
+
+    exportar_relatorio_txt(db, str(caminho))
+
+    texto = caminho.read_text(encoding="utf-8")
+    assert "Total de operações: 3" in texto
+    assert "Peso total colhido (t): 6.00" in texto
+    assert "ANÁLISE DE PERDAS E PRODUTIVIDADE" in texto
+    assert "| Norte " in texto
+
+
+class _PoolPreguicoso:
+    """Pool de mentira: cada tarefa só roda quando o resultado é pedido."""
+
+    def __init__(self, max_workers):
+        self.em_voo = 0
+        self.maximo = 0
+        _PoolPreguicoso.ultimo = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, funcao, *args):
+        self.em_voo += 1
+        self.maximo = max(self.maximo, self.em_voo)
+        pool = self
+
+        class Futuro:
+            def result(self):
+                pool.em_voo -= 1
+                return funcao(*args)
+
+        return Futuro()
+
+
+def test_relatorios_por_talhao_limitam_as_particoes_em_espera(tmp_path, monkeypatch):
+    ops = OperacoesColunares()
+    for i in range(1, 401):
+        ops.append({"id_op": i, "id_talhao": i % 40, "peso_t_colhido": 1.0})
+    db = {"talhoes": {}, "operacoes": ops}
+    monkeypatch.setattr(relatorios, "ProcessPoolExecutor", _PoolPreguicoso)
+
+    indice = exportar_relatorios_por_talhao(db, str(tmp_path), processos=3)
+
+    assert _PoolPreguicoso.ultimo.maximo == 6
+    assert len(list(tmp_path.glob("talhao_*.txt"))) == 40
+    assert "Total de operações: 400" in open(indice, encoding="utf-8").read()
@@ -0,0 +1,424 @@
+"""
+Testes da sincronização memória -> banco (envio em lotes, MERGE/upsert, delta e
+retomada pelo checkpoint), sem Oracle: o backend Oracle roda sobre o substituto do
+oracledb feito em SQLite (benchmark._oracledb_sqlite()) e o backend SQLite, sobre
+um arquivo temporário.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import benchmark  # noqa: E402  (instala o substituto do oracledb)
+from colheita import backends, oracle, sincronizacao  # noqa: E402
+from colheita.arquivos import (  # noqa: E402
+    carregar_json,
+    carregar_no_db_mem,
+    salvar_json,
+)
+from colheita.backends import BackendOracle, BackendSQLite, _CursorSQLite  # noqa: E402
+from colheita.estruturas import (  # noqa: E402
+    db_mem,
+    journal_marcar,
+    novo_db,
+    proximo_id,
+    sequencias_de_carga,
+)
+from colheita.menu import editar_talhao  # noqa: E402
+from colheita.pull import puxar_oracle_para_mem  # noqa: E402
+from colheita.sincronizacao import (  # noqa: E402
+    LOTES_EM_VOO,
+    sincronizar_mem_para_oracle,
+)
+
+
+def _novo_cliente(usar_db, talhoes=(), ops=()) -> dict:
+    """Troca db_mem por um db novo (outro notebook), com tudo pendente no diário."""
+    db = usar_db(novo_db())
+    for id_t in talhoes:
+        db["talhoes"][str(id_t)] = {
+            "id_talhao": id_t,
+            "nome": f"Talhão {id_t}",
+            "area_ha": 10.0,
+        }
+        journal_marcar(db, "talhoes", id_t)
+    for id_op, id_t, peso in ops:
+        db["operacoes"].append(
+            {
+                "id_op": id_op,
+                "id_talhao": id_t,
+                "data": "2024-05-01",
+                "peso_t_colhido": peso,
+                "perda_percent": 4.0,
+            }
+        )
+        journal_marcar(db, "operacoes", id_op)
+    db["sequencias"] = sequencias_de_carga(db)
+    return db
+
+
+def _remotas(backend) -> list:
+    """(id_op, id_talhao, data, peso) de todas as operações gravadas no banco."""
+    with backend.conexao() as con:
+        return [
+            (op["id_op"], op["id_talhao"], op["data"], op["peso_t_colhido"])
+            for op in backend.ler_operacoes(con)
+        ]
+
+
+def _locais(db) -> list:
+    return [
+        (op["id_op"], op["id_talhao"], op["data"], op["peso_t_colhido"])
+        for op in db["operacoes"]
+    ]
+
+
+@pytest.fixture(autouse=True)
+def _isolado(usar_db, tmp_path, monkeypatch):
+    """Cada teste roda num diretório próprio, com checkpoint e db_mem novos."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sincronizacao, "CAMINHO_CHECKPOINT", str(tmp_path / "checkpoint.json")
+    )
+    monkeypatch.setattr(sincronizacao, "ESPERA_SYNC", 0.0)
+    usar_db(novo_db())
+
+
+@pytest.fixture(params=["oracle", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    """Backend ativo: Oracle sobre o substituto em SQLite ou o backend SQLite."""
+    if request.param == "oracle":
+        driver = benchmark._oracledb_sqlite(str(tmp_path / "oracle.db"))
+        monkeypatch.setattr(oracle, "oracledb", driver)
+        monkeypatch.setattr(oracle, "_pool_oracle", None)
+        for var in ("ORA_USER", "ORA_PASS", "ORA_DSN"):
+            monkeypatch.setenv(var, "teste")
+        atual = BackendOracle()
+    else:
+        atual = BackendSQLite(str(tmp_path / "colheita.db"))
+    monkeypatch.setattr(backends, "_backend", atual)
+    yield atual
+    atual.fechar()
+
+
+def test_delta_envia_em_lotes_com_os_ids_locais(usar_db, backend):
+    db = usar_db(benchmark.gerar_dados(1200, n_talhoes=5))
+
+    sincronizar_mem_para_oracle(tamanho_lote=500, modo="delta", progresso=None)
+
+    assert _remotas(backend) == _locais(db)
+    assert db["journal"]["talhoes"] == db["journal"]["operacoes"] == {}
+    assert not os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
+
+
+def test_linha_ruim_nao_derruba_o_lote(usar_db, backend):
+    # a operação 3 aponta para um talhão que não existe (chave estrangeira)
+    db = _novo_cliente(
+        usar_db,
+        talhoes=[1],
+        ops=[(1, 1, 10.0), (2, 1, 11.0), (3, 99, 12.0), (4, 1, 13.0)],
+    )
+
+    sincronizar_mem_para_oracle(tamanho_lote=10, modo="delta", progresso=None)
+
+    assert [op[0] for op in _remotas(backend)] == [1, 2, 4]
+    assert db["journal"]["operacoes"] == {"3": "novo"}
+
+
+@pytest.mark.parametrize("modo", ["delta", "merge", "paralela"])
+def test_ids_ja_usados_por_outro_cliente_sao_trocados(usar_db, backend, modo):
+    # cliente A grava as operações 1 a 3
+    _novo_cliente(
+        usar_db, talhoes=[1], ops=[(1, 1, 100.0), (2, 1, 100.0), (3, 1, 100.0)]
+    )
+    sincronizar_mem_para_oracle(modo="delta", progresso=None)
+    # cliente B, sem atualizar antes, criou as suas com os mesmos IDs 1 e 2
+    b = _novo_cliente(usar_db, talhoes=[1], ops=[(1, 1, 7.0), (2, 1, 7.0)])
+    sincronizar_mem_para_oracle(modo=modo, progresso=None)
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+
+    # as de A não são sobrescritas e as de B entram com IDs depois dos do banco
+    assert [(op[0], op[3]) for op in _remotas(backend)] == [
+        (1, 100.0),
+        (2, 100.0),
+        (3, 100.0),
+        (4, 7.0),
+        (5, 7.0),
+    ]
+    assert [op[0] for op in _locais(b)] == [4, 5]
+    assert b["journal"]["operacoes"] == {}
+
+
+def test_atualizar_e_fazer_merge_nao_duplica(usar_db, backend):
+    # A grava 1 a 3; B, sem atualizar, criou a operação 1 com outro conteúdo
+    _novo_cliente(
+        usar_db, talhoes=[1], ops=[(1, 1, 100.0), (2, 1, 100.0), (3, 1, 100.0)]
+    )
+    sincronizar_mem_para_oracle(modo="delta", progresso=None)
+    b = _novo_cliente(usar_db, talhoes=[1], ops=[(1, 1, 7.0)])
+    sincronizar_mem_para_oracle(modo="delta", progresso=None)
+    b["operacoes"].append(
+        {"id_op": 5, "id_talhao": 1, "data": "2024-05-02", "peso_t_colhido": 8.0}
+    )
+    journal_marcar(b, "operacoes", 5)
+    b["sequencias"]["op"] = 5
+
+    # B atualiza: as remotas entram com o ID do banco, e a sua 4 (já enviada) é
+    # reconhecida; a 5 continua pendente
+    assert puxar_oracle_para_mem()
+    assert [(op[0], op[3]) for op in _locais(b)] == [
+        (4, 7.0),
+        (5, 8.0),
+        (1, 100.0),
+        (2, 100.0),
+        (3, 100.0),
+    ]
+    assert b["journal"]["operacoes"] == {"5": "novo"}
+
+    for _ in range(2):
+        sincronizar_mem_para_oracle(modo="merge", progresso=None)
+        assert sorted(_remotas(backend)) == sorted(_locais(b))
+        assert b["journal"]["operacoes"] == {}
+
+
+def test_atualizar_troca_o_id_de_operacao_pendente_ja_usado(usar_db, backend):
+    _novo_cliente(usar_db, talhoes=[1], ops=[(1, 1, 100.0), (2, 1, 100.0)])
+    sincronizar_mem_para_oracle(modo="delta", progresso=None)
+    # B tem o talhão 1 (já no banco) e criou a operação 1 sem atualizar antes
+    b = _novo_cliente(usar_db, talhoes=[1], ops=[(1, 1, 7.0)])
+    b["journal"]["talhoes"] = {}
+
+    assert puxar_oracle_para_mem()
+    assert [(op[0], op[3]) for op in _locais(b)] == [
+        (3, 7.0),
+        (1, 100.0),
+        (2, 100.0),
+    ]
+    assert b["journal"]["operacoes"] == {"3": "novo"}
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+    assert [op[0] for op in _remotas(backend)] == [1, 2, 3]
+    assert b["journal"]["operacoes"] == {}
+
+
+def test_merge_repetido_nao_duplica_nem_falha(usar_db, backend):
+    db = _novo_cliente(
+        usar_db, talhoes=[1, 2], ops=[(i, 1 + i % 2, float(i)) for i in range(1, 8)]
+    )
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+    db["journal"]["operacoes"] = {str(i): "novo" for i in range(1, 8)}
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+
+    assert _remotas(backend) == _locais(db)
+    assert db["journal"]["operacoes"] == {}
+
+
+@pytest.mark.parametrize("backend", ["oracle"], indirect=True)
+def test_merge_nao_roda_ddl(usar_db, backend, monkeypatch):
+    _novo_cliente(usar_db, talhoes=[1], ops=[(1, 1, 10.0), (2, 1, 11.0)])
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+    with backend.conexao() as con, con.cursor() as cur:
+        classe = type(cur)
+    comandos = []
+    original = classe.execute
+
+    def execute(self, sql, *args, **kwargs):
+        comandos.append(sql)
+        return original(self, sql, *args, **kwargs)
+
+    monkeypatch.setattr(classe, "execute", execute)
+    journal_marcar(db_mem, "operacoes", 2)
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+
+    assert any("MERGE" in sql for sql in comandos)
+    assert not [sql for sql in comandos if sql.lstrip().startswith("ALTER")]
+
+
+def test_cliente_atualizado_continua_os_ids_do_banco(usar_db, backend):
+    _novo_cliente(usar_db, talhoes=[1], ops=[(1, 1, 100.0), (2, 1, 100.0)])
+    sincronizar_mem_para_oracle(modo="delta", progresso=None)
+    b = _novo_cliente(usar_db)
+    puxar_oracle_para_mem()
+    op = {"id_talhao": 1, "data": "2024-06-01", "peso_t_colhido": 7.0}
+    op.update(id_op=proximo_id(b, "op"), perda_percent=1.0)
+    b["operacoes"].append(op)
+    journal_marcar(b, "operacoes", op["id_op"])
+    sincronizar_mem_para_oracle(modo="merge", progresso=None)
+
+    assert [(o[0], o[3]) for o in _remotas(backend)] == [
+        (1, 100.0),
+        (2, 100.0),
+        (3, 7.0),
+    ]
+
+
+@pytest.mark.parametrize("modo", ["delta", "completa", "paralela", "merge"])
+def test_talhao_editado_e_atualizado_no_banco(usar_db, backend, monkeypatch, modo):
+    db = _novo_cliente(usar_db, talhoes=[1, 2], ops=[(1, 1, 10.0)])
+    sincronizar_mem_para_oracle(modo="delta", progresso=None)
+    respostas = iter(["2", "Talhão Sul", "12,5"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(respostas))
+    editar_talhao()
+    assert db["journal"]["talhoes"] == {"2": "alterado"}
+
+    sincronizar_mem_para_oracle(modo=modo, progresso=None)
+
+    with backend.conexao() as con:
+        gravados = {
+            t["id_talhao"]: (t["nome"], t["area_ha"]) for t in backend.ler_talhoes(con)
+        }
+    assert gravados == {1: ("Talhão 1", 10.0), 2: ("Talhão Sul", 12.5)}
+    assert db["journal"]["talhoes"] == {}
+
+
+def _falhar_no_lote(monkeypatch, n: int) -> None:
+    """Faz o n-ésimo envio de operações do backend SQLite cair (erro transitório)."""
+    original = _CursorSQLite.executemany
+    enviados = {"n": 0}
+
+    def executemany(self, sql, linhas, batcherrors=False):
+        if "operacoes" in sql:
+            enviados["n"] += 1
+            if enviados["n"] >= n:
+                raise sqlite3.OperationalError("disk I/O error")
+        return original(self, sql, linhas, batcherrors)
+
+    monkeypatch.setattr(_CursorSQLite, "executemany", executemany)
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    atual = BackendSQLite(str(tmp_path / "colheita.db"))
+    monkeypatch.setattr(backends, "_backend", atual)
+    monkeypatch.setattr(sincronizacao, "TENTATIVAS_SYNC", 1)
+    yield atual
+    atual.fechar()
+
+
+def test_delta_retoma_do_checkpoint_sem_reenviar(usar_db, sqlite_backend, monkeypatch):
+    ops = [(i, 1 + i % 3, float(i)) for i in range(1, 26)]
+    _novo_cliente(usar_db, talhoes=[1, 2, 3], ops=ops)
+    salvar_json("dados.json", db_mem)
+    with monkeypatch.context() as m:
+        _falhar_no_lote(m, 3)
+        sincronizar_mem_para_oracle(tamanho_lote=5, modo="delta", progresso=None)
+    assert len(_remotas(sqlite_backend)) == 10
+    assert os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
+
+    # o programa foi reaberto e o mesmo arquivo, carregado de novo
+    usar_db(novo_db())
+    assert carregar_no_db_mem(carregar_json("dados.json"))
+    sincronizar_mem_para_oracle(tamanho_lote=5, modo="delta", progresso=None)
+
+    assert _remotas(sqlite_backend) == _locais(db_mem)
+    assert db_mem["journal"]["operacoes"] == {}
+    assert not os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
+
+
+def test_checkpoint_de_outros_dados_e_ignorado(usar_db, sqlite_backend, monkeypatch):
+    ops = [(i, 1, float(i)) for i in range(1, 16)]
+    _novo_cliente(usar_db, talhoes=[1], ops=ops)
+    with monkeypatch.context() as m:
+        _falhar_no_lote(m, 2)
+        sincronizar_mem_para_oracle(tamanho_lote=5, modo="delta", progresso=None)
+    assert os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
+
+    # sessão nova, sem carregar o arquivo: os IDs 1 a 3 foram reaproveitados
+    nova = _novo_cliente(usar_db, talhoes=[2], ops=[(1, 2, 1.0), (2, 2, 2.0)])
+    sincronizar_mem_para_oracle(tamanho_lote=5, modo="delta", progresso=None)
+
+    # nada some do diário como "já enviado": os IDs repetidos ganham IDs novos
+    assert nova["journal"]["operacoes"] == {}
+    remotas = [op[:2] for op in _remotas(sqlite_backend)]
+    assert remotas[:5] == [(i, 1) for i in range(1, 6)]
+    assert remotas[-2:] == [(6, 2), (7, 2)]
+
+
+@pytest.fixture
+def oracle_async(tmp_path, monkeypatch):
+    """Backend Oracle sobre o substituto, com o modo assíncrono e uma falha a injetar."""
+    driver = benchmark._oracledb_sqlite(str(tmp_path / "oracle.db"))
+    monkeypatch.setattr(oracle, "oracledb", driver)
+    monkeypatch.setattr(oracle, "_pool_oracle", None)
+    for var in ("ORA_USER", "ORA_PASS", "ORA_DSN"):
+        monkeypatch.setenv(var, "teste")
+    atual = BackendOracle()
+    monkeypatch.setattr(backends, "_backend", atual)
+    # os cursores assíncronos do substituto usam os síncronos por baixo
+    classe = type(driver.connect().cursor())
+    original = classe.executemany
+    falha = {"lote": None, "lotes": 0, "linhas": 0}
+
+    def executemany(self, sql, linhas, batcherrors=False):
+        if "INTO operacoes" in sql:
+            falha["lotes"] += 1
+            falha["linhas"] += len(linhas)
+            if falha["lotes"] == falha["lote"]:
+                raise driver.DatabaseError(
+                    "DPY-4011: the database closed the connection"
+                )
+        return original(self, sql, linhas, batcherrors)
+
+    monkeypatch.setattr(classe, "executemany", executemany)
+    yield atual, falha
+    atual.fechar()
+
+
+@pytest.mark.parametrize("reconciliar", [False, True])
+def test_assincrona_tenta_de_novo_a_partir_do_checkpoint(
+    usar_db, oracle_async, monkeypatch, reconciliar
+):
+    backend, falha = oracle_async
+    db = _novo_cliente(
+        usar_db,
+        talhoes=[1, 2],
+        ops=[(i, 1 + i % 2, float(i)) for i in range(1, 41)],
+    )
+    db["journal"]["reconciliar"] = reconciliar
+    falha["lote"] = 3
+
+    sincronizar_mem_para_oracle(tamanho_lote=5, modo="assincrona", progresso=None)
+
+    assert _remotas(backend) == _locais(db)
+    assert db["journal"] == {
+        **db["journal"],
+        "talhoes": {},
+        "operacoes": {},
+        "reconciliar": False,
+    }
+    assert not os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
+    # a queda aconteceu, e só os lotes em voo nela são enviados de novo
+    assert falha["lotes"] > 8
+    assert falha["linhas"] < 40 + 5 * LOTES_EM_VOO
+
+
+def test_assincrona_interrompida_retoma_na_proxima(usar_db, oracle_async, monkeypatch):
+    backend, falha = oracle_async
+    monkeypatch.setattr(sincronizacao, "TENTATIVAS_SYNC", 1)
+    db = _novo_cliente(
+        usar_db, talhoes=[1], ops=[(i, 1, float(i)) for i in range(1, 41)]
+    )
+    falha["lote"] = 4
+
+    sincronizar_mem_para_oracle(tamanho_lote=5, modo="assincrona", progresso=None)
+
+    # o checkpoint fica no disco e as confirmadas (em ordem de ID) saem do diário
+    assert os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
+    gravadas = {op[0] for op in _remotas(backend)}
+    pendentes = set(map(int, db["journal"]["operacoes"]))
+    assert pendentes and pendentes | gravadas == set(range(1, 41))
+    assert min(pendentes) == max(set(range(1, 41)) - pendentes) + 1
+
+    # na mesma sessão o diário já está sem as confirmadas: só o resto é enviado
+    falha["lote"], falha["linhas"] = None, 0
+    sincronizar_mem_para_oracle(tamanho_lote=5, modo="assincrona", progresso=None)
+    assert falha["linhas"] == len(pendentes - gravadas)
+
+    assert _remotas(backend) == _locais(db)
+    assert db["journal"]["operacoes"] == {}
+    assert not os.path.exists(sincronizacao.CAMINHO_CHECKPOINT)
@@ -0,0 +1,87 @@
+"""
+Testes da paginação das listagens: páginas montadas sob demanda, escritas em
+sequência fora do terminal e navegação por comandos num terminal.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+
+import sys
+
+from colheita.estruturas import novo_db, OperacoesColunares
+from colheita.menu import listar_operacoes
+from colheita.subalgoritmos import ANSI_LIMPAR, LINHAS_PAGINA, paginar
+
+
+class _Montador:
+    """Monta as linhas de uma página e lembra quais intervalos foram pedidos."""
+
+    def __init__(self):
+        self.pedidos = []
+
+    def __call__(self, inicio: int, fim: int):
+        self.pedidos.append((inicio, fim))
+        return [f"linha {i}" for i in range(inicio, fim)]
+
+
+def test_fora_do_terminal_escreve_as_paginas_em_sequencia(capsys):
+    montar = _Montador()
+
+    paginar(25, montar, tamanho_pagina=10)
+
+    saida = capsys.readouterr().out
+    assert montar.pedidos == [(0, 10), (10, 20), (20, 25)]
+    assert saida.count("linha ") == 25
+    assert "Página 3/3 (25 linha(s))" in saida
+    assert ANSI_LIMPAR not in saida
+
+
+def test_pagina_pedida_monta_so_aquela_pagina(capsys):
+    montar = _Montador()
+
+    paginar(25, montar, tamanho_pagina=10, pagina=9)
+
+    assert montar.pedidos == [(20, 25)]
+    assert "Página 3/3" in capsys.readouterr().out
+    paginar(0, montar, tamanho_pagina=10, pagina=1)
+    assert montar.pedidos[-1] == (0, 0)
+    assert "Página" not in capsys.readouterr().out
+
+
+def test_no_terminal_navega_pelos_comandos(capsys, monkeypatch):
+    comandos = iter(["", "a", "3", "99", ""])
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: True, raising=False)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: True, raising=False)
+    monkeypatch.setattr("builtins.input", lambda prompt: next(comandos))
+    montar = _Montador()
+
+    paginar(45, montar, tamanho_pagina=10)
+
+    assert [inicio // 10 + 1 for inicio, _ in montar.pedidos] == [1, 2, 1, 3, 5]
+    # cada página é escrita numa tela limpa
+    assert capsys.readouterr().out.count(ANSI_LIMPAR) == 5
+
+
+def test_listar_operacoes_le_so_a_pagina_mostrada(usar_db, capsys, monkeypatch):
+    db = novo_db()
+    db["talhoes"] = {"1": {"id_talhao": 1, "nome": "Norte", "area_ha": 1.0}}
+    for i in range(1, 101):
+        db["operacoes"].append(
+            {"id_op": i, "id_talhao": 1 + i % 2, "data": "2024-05-01"}
+        )
+    db = usar_db(db)
+    lidas = set()
+    original = OperacoesColunares.valor
+
+    def valor(self, pos, chave):
+        lidas.add(pos)
+        return original(self, pos, chave)
+
+    monkeypatch.setattr(OperacoesColunares, "valor", valor)
+    listar_operacoes(id_talhao=1, pagina=2)
+
+    saida = capsys.readouterr().out
+    n = LINHAS_PAGINA
+    assert lidas == set(range(2 * n + 1, 4 * n, 2))
+    assert f"Página 2/{-(-50 // n)} (50 linha(s))" in saida
+    assert "1 (Norte)" in saida